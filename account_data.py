@@ -0,0 +1,130 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+from loguru import logger
+from order_scheduler import DATA
+
+# Account summary tags streamed by reqAccountSummary
+ACCOUNT_TAGS = ('NetLiquidation', 'TotalCashValue', 'BuyingPower', 'AvailableFunds', 'ExcessLiquidity',
+                'GrossPositionValue', 'InitMarginReq', 'MaintMarginReq')
+PNL_TAGS = ('DailyPnL', 'UnrealizedPnL', 'RealizedPnL')
+
+class AccountManager:
+    """Streaming account summary and P&L for a TradingBot.
+
+    One reqAccountSummary subscription for group 'All' (TWS pushes a tag
+    whenever its value changes, about every three minutes) and one reqPnL
+    subscription for the primary account. The primary account is the first
+    one in managedAccounts, so the P&L stream waits for that callback if it
+    has not arrived by the time the bot subscribes. Values are kept per
+    (account, tag) in `values`; the primary account's are also written into
+    `bot.account_summary` in place, so readers holding that dict always see
+    current values without a re-pull. Unchanged values are skipped. A changed
+    primary NetLiquidation is passed to each listener, e.g.
+    RiskManager.on_net_liquidation. Subscriptions end with the session, so the
+    bot subscribes again after every (re)connect.
+    """
+
+    def __init__(self, bot, tags=ACCOUNT_TAGS):
+        self.bot = bot
+        self.tags = tags
+        self.account = ''
+        self.values: Dict[Tuple[str, str], float] = {}  # (account, tag) -> value
+        self.listeners: List[Callable[[float], None]] = []
+        self.updates = 0
+        self.unchanged = 0  # Pushed values equal to the stored one
+        self._summary_request: Optional[int] = None
+        self._pnl_request: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Start the account summary stream, and the P&L stream once the primary account is known"""
+        with self._lock:
+            summary_request = self._summary_request = next(self.bot._request_ids)
+        self.bot.scheduler.submit(lambda: self.bot.reqAccountSummary(summary_request, 'All', ','.join(self.tags)),
+                                  DATA)
+        self.on_accounts(self.bot.accounts)
+
+    def on_accounts(self, accounts: List[str]):
+        """Take the first managed account as the primary one and start its P&L stream"""
+        account = accounts[0] if accounts else ''
+        with self._lock:
+            if not account or self._summary_request is None or (account == self.account and self._pnl_request):
+                return
+            self.account = account
+            old_request, pnl_request = self._pnl_request, next(self.bot._request_ids)
+            self._pnl_request = pnl_request
+            # Values already streamed for this account become the primary ones
+            primary = {tag: value for (owner, tag), value in self.values.items() if owner == account}
+        if old_request is not None:
+            self.bot.scheduler.submit(lambda: self.bot.cancelPnL(old_request), DATA)
+        self.bot.scheduler.submit(lambda: self.bot.reqPnL(pnl_request, account, ''), DATA)
+        for tag, value in primary.items():
+            self._set_primary(tag, value)
+
+    def unsubscribe(self):
+        """Cancel both streams"""
+        with self._lock:
+            summary_request, self._summary_request = self._summary_request, None
+            pnl_request, self._pnl_request = self._pnl_request, None
+        if summary_request is not None:
+            self.bot.scheduler.submit(lambda: self.bot.cancelAccountSummary(summary_request), DATA)
+        if pnl_request is not None:
+            self.bot.scheduler.submit(lambda: self.bot.cancelPnL(pnl_request), DATA)
+
+    def owns(self, request_id: int) -> bool:
+        return request_id in (self._summary_request, self._pnl_request)
+
+    def on_error(self, request_id: int, error_code: int):
+        """Forget a subscription IB refused"""
+        with self._lock:
+            if request_id == self._summary_request:
+                self._summary_request = None
+            elif request_id == self._pnl_request:
+                self._pnl_request = None
+        logger.warning(f"Account stream {request_id} stopped (error {error_code})")
+
+    def _set(self, account: str, tag: str, value: float) -> bool:
+        """Store one value; True if it changed"""
+        if self.values.get((account, tag)) == value:
+            self.unchanged += 1
+            return False
+        self.values[account, tag] = value
+        self.updates += 1
+        if account == self.account:
+            self._set_primary(tag, value)
+        return True
+
+    def _set_primary(self, tag: str, value: float):
+        self.bot.account_summary[tag] = value
+        if tag != 'NetLiquidation':
+            return
+        for listener in self.listeners:
+            try:
+                listener(value)
+            except Exception as e:
+                logger.error(f"Error in account listener: {e}")
+
+    def on_account_summary(self, request_id: int, account: str, tag: str, value: str, currency: str):
+        if request_id != self._summary_request:
+            return
+        try:
+            number = float(value)
+        except ValueError:
+            return
+        self._set(account, tag, number)
+
+    def on_pnl(self, request_id: int, daily_pnl: float, unrealized_pnl: float, realized_pnl: float):
+        if request_id != self._pnl_request:
+            return
+        for tag, value in zip(PNL_TAGS, (daily_pnl, unrealized_pnl, realized_pnl)):
+            # IB sends Double.MAX_VALUE for values it does not have yet
+            if abs(value) < 1e300:
+                self._set(self.account, tag, float(value))
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            'account': self.account,
+            'subscribed': self._summary_request is not None,
+            'updates': self.updates,
+            'unchanged': self.unchanged
+        }
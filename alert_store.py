@@ -0,0 +1,84 @@
+from collections import deque
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Hashable, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from market_analyzer import MarketAlert
+
+class AlertStore:
+    """Bounded store of market alerts indexed by symbol and priority.
+
+    Alerts are kept in arrival order. Every index is a deque in the same order, so the
+    oldest alert is always at the left of each index it belongs to and eviction (by
+    retention cap or TTL) is O(1) per alert. Queries cost time proportional to the
+    number of alerts returned.
+    """
+
+    def __init__(self, max_alerts: int = 10000, ttl: Optional[timedelta] = None):
+        self.max_alerts = max_alerts
+        self.ttl = ttl
+        self.evicted = 0
+        self._alerts: Deque['MarketAlert'] = deque()
+        self._indexes: Dict[Hashable, Deque['MarketAlert']] = {}
+        # Called with every alert as it is added
+        self.listeners: List[Callable[['MarketAlert'], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __iter__(self) -> Iterator['MarketAlert']:
+        return iter(self._alerts)
+
+    @staticmethod
+    def _keys(alert: 'MarketAlert'):
+        return (('symbol', alert.symbol), ('priority', alert.priority),
+                ('symbol_priority', alert.symbol, alert.priority))
+
+    def add(self, alert: 'MarketAlert'):
+        """Record an alert, evicting the oldest ones past the retention limits"""
+        self._alerts.append(alert)
+        for key in self._keys(alert):
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = deque()
+            index.append(alert)
+        while len(self._alerts) > self.max_alerts:
+            self._evict_oldest()
+        self.expire(alert.timestamp)
+        for listener in self.listeners:
+            listener(alert)
+
+    def _evict_oldest(self):
+        alert = self._alerts.popleft()
+        for key in self._keys(alert):
+            index = self._indexes[key]
+            index.popleft()
+            if not index:
+                del self._indexes[key]
+        self.evicted += 1
+
+    def expire(self, now: Optional[datetime] = None):
+        """Evict alerts older than the TTL"""
+        if self.ttl is None:
+            return
+        cutoff = (now or datetime.now()) - self.ttl
+        while self._alerts and self._alerts[0].timestamp < cutoff:
+            self._evict_oldest()
+
+    def query(self, symbol: Optional[str] = None, priority: Optional[str] = None) -> List['MarketAlert']:
+        """Get alerts, optionally filtered by symbol and/or priority, oldest first"""
+        self.expire()
+        if symbol and priority:
+            index = self._indexes.get(('symbol_priority', symbol, priority))
+        elif symbol:
+            index = self._indexes.get(('symbol', symbol))
+        elif priority:
+            index = self._indexes.get(('priority', priority))
+        else:
+            index = self._alerts
+        return list(index) if index else []
+
+    def clear(self):
+        """Drop all alerts"""
+        self._alerts.clear()
+        self._indexes.clear()
@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from tick_store import to_epoch_seconds
+
+@dataclass
+class Bar:
+    symbol: str
+    interval: int  # Bar length in seconds
+    start: float   # Epoch seconds of the bar open
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    ticks: int
+    first_tick: float  # Timestamps of the ticks that set open and close,
+    last_tick: float   # so out-of-order ticks inside the bar land correctly
+
+    @property
+    def end(self) -> float:
+        return self.start + self.interval
+
+class BarBuilder:
+    """Streaming tick to OHLCV bar aggregation at one or more intervals.
+
+    Bars are bucketed by tick time. A bar closes once a tick for the same symbol
+    arrives at or after its end plus `allowed_lateness`, or when `flush` is called
+    with a clock past that point. Ticks that are out of order but still fall in an
+    open bar are folded in correctly; ticks for a bar that has already closed are
+    dropped and counted in `late_ticks`.
+    """
+
+    def __init__(self, intervals: Iterable[int] = (1, 60, 300), allowed_lateness: float = 0.0):
+        self.intervals = tuple(sorted(set(int(interval) for interval in intervals)))
+        if not self.intervals or self.intervals[0] <= 0:
+            raise ValueError("Bar intervals must be positive numbers of seconds")
+        self.allowed_lateness = allowed_lateness
+        self.late_ticks: Dict[int, int] = {interval: 0 for interval in self.intervals}
+        self._open: Dict[Tuple[str, int], Dict[float, Bar]] = {}
+        self._closed_until: Dict[Tuple[str, int], float] = {}
+        self._watermark: Dict[str, float] = {}
+
+    def add_tick(self, symbol: str, timestamp, price: float, volume: float) -> List[Bar]:
+        """Add a tick and return any bars it closes, oldest first"""
+        ts = to_epoch_seconds(timestamp)
+        watermark = max(self._watermark.get(symbol, ts), ts)
+        self._watermark[symbol] = watermark
+
+        closed = []
+        for interval in self.intervals:
+            key = (symbol, interval)
+            start = ts - ts % interval
+            if start + interval <= self._closed_until.get(key, float('-inf')):
+                self.late_ticks[interval] += 1
+                continue
+
+            bars = self._open.setdefault(key, {})
+            bar = bars.get(start)
+            if bar is None:
+                bars[start] = Bar(symbol, interval, start, price, price, price, price, volume, 1, ts, ts)
+            else:
+                if ts < bar.first_tick:
+                    bar.open, bar.first_tick = price, ts
+                if ts >= bar.last_tick:
+                    bar.close, bar.last_tick = price, ts
+                bar.high = max(bar.high, price)
+                bar.low = min(bar.low, price)
+                bar.volume += volume
+                bar.ticks += 1
+            closed.extend(self._close(key, watermark))
+        return closed
+
+    def _close(self, key: Tuple[str, int], now: float) -> List[Bar]:
+        """Close the open bars for a key whose end plus lateness is at or before `now`"""
+        bars = self._open.get(key)
+        if not bars:
+            return []
+        cutoff = now - self.allowed_lateness
+        done = sorted(start for start, bar in bars.items() if bar.end <= cutoff)
+        closed = [bars.pop(start) for start in done]
+        if closed:
+            self._closed_until[key] = max(self._closed_until.get(key, float('-inf')), closed[-1].end)
+        return closed
+
+    def flush(self, now: Optional[float] = None) -> List[Bar]:
+        """Close bars for every symbol by clock time (defaults to the current time)"""
+        now = to_epoch_seconds(datetime.now() if now is None else now)
+        closed = []
+        for key in list(self._open):
+            closed.extend(self._close(key, now))
+        return closed
+
+    def open_bar(self, symbol: str, interval: int) -> Optional[Bar]:
+        """Most recent bar still being built for a symbol"""
+        bars = self._open.get((symbol, interval))
+        if not bars:
+            return None
+        return bars[max(bars)]
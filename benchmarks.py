@@ -0,0 +1,233 @@
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+from loguru import logger
+
+# The dashboard benchmarks import dashboard.py; keep it off the real archive and in-process
+os.environ['MARKET_DATA_ARCHIVE'] = 'false'
+os.environ['ANALYZER_SHARDS'] = '0'
+
+from config import BASE_DIR
+from market_analyzer import MarketAnalyzer
+from risk_manager import RiskManager
+import synthetic_data
+
+BASELINE_FILE = BASE_DIR / "benchmark_baseline.json"
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    ops: int
+    ops_per_sec: float
+    p50_us: float
+    p99_us: float
+    peak_memory_kb: float
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[], Any]           # Builds fresh state for a run
+    op: Callable[[Any, int], None]     # One timed operation on that state
+    ops: int
+
+def run_benchmark(benchmark: Benchmark, memory_ops: int = 100) -> BenchmarkResult:
+    """Time every operation individually, then measure peak memory in a separate short run"""
+    state = benchmark.setup()
+    latencies = np.empty(benchmark.ops)
+    started = time.perf_counter()
+    for i in range(benchmark.ops):
+        t = time.perf_counter_ns()
+        benchmark.op(state, i)
+        latencies[i] = time.perf_counter_ns() - t
+    elapsed = time.perf_counter() - started
+
+    # tracemalloc slows allocation down, so it stays out of the timed run
+    state = benchmark.setup()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(min(memory_ops, benchmark.ops)):
+        benchmark.op(state, i)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return BenchmarkResult(
+        name=benchmark.name,
+        ops=benchmark.ops,
+        ops_per_sec=benchmark.ops / elapsed,
+        p50_us=float(np.percentile(latencies, 50)) / 1000,
+        p99_us=float(np.percentile(latencies, 99)) / 1000,
+        peak_memory_kb=max(peak, 0) / 1024
+    )
+
+def _analyzer_benchmark(n_symbols: int) -> Benchmark:
+    ticks = synthetic_data.generate_ticks(n_symbols, n_symbols * 200, seed=n_symbols)
+    warm, live = ticks.iloc[:n_symbols * 100], ticks.iloc[n_symbols * 100:]
+    symbols = live['symbol'].tolist()
+    prices = live['price'].tolist()
+    volumes = live['volume'].tolist()
+    timestamps = live['timestamp'].dt.to_pydatetime().tolist()
+
+    def setup():
+        # Analyze every tick so the indicator and alert path is always exercised
+        analyzer = MarketAnalyzer(analysis_interval=0)
+        analyzer.update_market_data_batch(warm['symbol'].tolist(), warm['price'], warm['volume'], warm['timestamp'])
+        return analyzer
+
+    def op(analyzer, i):
+        i %= len(symbols)
+        analyzer.update_market_data(symbols[i], prices[i], volumes[i], timestamps[i])
+
+    return Benchmark(f"market_analyzer.update_market_data[{n_symbols}]", setup, op, 2000)
+
+def _risk_manager(n_positions: int) -> RiskManager:
+    risk_manager = RiskManager()
+    risk_manager.portfolio_value = 1e9
+    for position in synthetic_data.generate_positions(n_positions):
+        risk_manager.add_position(position)
+    return risk_manager
+
+def _risk_benchmarks(n_positions: int) -> List[Benchmark]:
+    extra = synthetic_data.generate_positions(n_positions + 500, seed=1)[n_positions:]
+    symbols = synthetic_data.symbols(n_positions)
+    prices = np.random.default_rng(n_positions).uniform(10, 500, 1000).tolist()
+    ops = int(min(2000, max(50, 200000 // n_positions)))
+
+    def add(risk_manager, i):
+        risk_manager.add_position(extra[i % len(extra)])
+
+    def update(risk_manager, i):
+        risk_manager.update_position(symbols[i % n_positions], prices[i % len(prices)])
+
+    candidates = synthetic_data.generate_positions(500, seed=2)
+
+    burst = symbols[:300]
+    burst_prices = np.random.default_rng(1).uniform(10, 500, len(burst))
+
+    def update_prices(risk_manager, i):
+        risk_manager.update_prices(burst, burst_prices * (1 + 0.001 * (i % 7)))
+
+    def check_batch(risk_manager, i):
+        risk_manager.check_positions_batch(candidates)
+
+    def stress(risk_manager, i):
+        risk_manager.stress_grid()
+
+    return [
+        Benchmark(f"risk_manager.check_positions_batch[{n_positions}+500]", lambda: _risk_manager(n_positions),
+                  check_batch, 100),
+        Benchmark(f"risk_manager.add_position[{n_positions}]", lambda: _risk_manager(n_positions), add, min(ops, 500)),
+        Benchmark(f"risk_manager.update_position[{n_positions}]", lambda: _risk_manager(n_positions), update, ops),
+        Benchmark(f"risk_manager.update_prices[{n_positions}]", lambda: _risk_manager(n_positions), update_prices, 200),
+        Benchmark(f"risk_manager.stress_grid[{n_positions}]", lambda: _risk_manager(n_positions), stress, 100)
+    ]
+
+def _signal_benchmark() -> Benchmark:
+    signals = synthetic_data.generate_signals(1000)
+    return Benchmark("trade_signal.validate", lambda: signals, lambda signals, i: signals[i % len(signals)].validate(), 20000)
+
+def _dashboard_benchmarks() -> List[Benchmark]:
+    import dashboard
+
+    dashboard.app.config['LOGIN_DISABLED'] = True
+    client = dashboard.app.test_client()
+    symbols = synthetic_data.symbols(200)
+    for signal in synthetic_data.generate_signals(100):
+        dashboard.strategy.active_trades[signal.symbol] = signal
+    dashboard.dashboard_data['active_trades'] = dashboard.strategy.get_active_trades()
+    dashboard.dashboard_data['trade_history'] = dashboard.generate_mock_trade_history()
+    dashboard.dashboard_data['pnl_data'] = dashboard.generate_mock_pnl_data()
+    dashboard.market_analyzer.alerts.clear()
+    for alert in synthetic_data.generate_alerts(1000, symbols):
+        dashboard.market_analyzer.alerts.add(alert)
+    dashboard.risk_manager.portfolio_value = 1e9
+    for position in synthetic_data.generate_positions(1000):
+        dashboard.risk_manager.add_position(position)
+
+    def get(path: str) -> Callable[[Any, int], None]:
+        def op(client, i):
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} returned {response.status_code}")
+        return op
+
+    return [
+        Benchmark(f"dashboard.{path}", lambda: client, get(path), 500)
+        for path in ('/api/status', '/api/alerts', '/api/positions')
+    ]
+
+def all_benchmarks() -> List[Benchmark]:
+    benchmarks = [_analyzer_benchmark(n) for n in (1, 100, 1000)]
+    for n in (10, 100, 1000, 10000):
+        benchmarks.extend(_risk_benchmarks(n))
+    benchmarks.append(_signal_benchmark())
+    benchmarks.extend(_dashboard_benchmarks())
+    return benchmarks
+
+def compare(results: List[BenchmarkResult], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Describe every result that is worse than the baseline by more than the tolerance"""
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.name)
+        if expected is None:
+            continue
+        if result.ops_per_sec < expected['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{result.name}: {result.ops_per_sec:,.0f} ops/s, baseline {expected['ops_per_sec']:,.0f}")
+        for metric in ('p99_us', 'peak_memory_kb'):
+            # Small absolute values are dominated by noise
+            floor = 10.0 if metric == 'p99_us' else 64.0
+            limit = max(expected[metric] * (1 + tolerance), expected[metric] + floor)
+            if getattr(result, metric) > limit:
+                regressions.append(f"{result.name}: {metric} {getattr(result, metric):,.1f}, baseline {expected[metric]:,.1f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE)
+    parser.add_argument('--save', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed fractional slowdown or memory growth against the baseline")
+    parser.add_argument('--filter', default='', help="Only run benchmarks whose name contains this")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    results = []
+    for benchmark in all_benchmarks():
+        if args.filter not in benchmark.name:
+            continue
+        result = run_benchmark(benchmark)
+        results.append(result)
+        print(f"{result.name:50} {result.ops_per_sec:>12,.0f} ops/s  p50 {result.p50_us:>10,.1f}us  "
+              f"p99 {result.p99_us:>10,.1f}us  peak {result.peak_memory_kb:>10,.1f}KB")
+
+    if args.save:
+        existing = json.loads(args.baseline.read_text())['results'] if args.baseline.exists() else {}
+        existing.update({result.name: asdict(result) for result in results})
+        args.baseline.write_text(json.dumps({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': existing
+        }, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save to create one")
+        return
+    regressions = compare(results, json.loads(args.baseline.read_text())['results'], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -18,12 +18,43 @@ LOGS_DIR.mkdir(exist_ok=True)
 IB_PORT = int(os.getenv("IB_PORT", 7497))  # 7497 for paper trading, 7496 for live trading
 IB_HOST = os.getenv("IB_HOST", "127.0.0.1")
 IB_CLIENT_ID = int(os.getenv("IB_CLIENT_ID", 1))
+IB_CONNECT_TIMEOUT = float(os.getenv("IB_CONNECT_TIMEOUT", 10))  # Seconds to wait for the connection handshake
+CONTRACT_CACHE_FILE = DATA_DIR / "contracts.json"  # Resolved contracts (conId) kept across restarts
+CONTRACT_CACHE_TTL_DAYS = float(os.getenv("CONTRACT_CACHE_TTL_DAYS", 30))  # Re-resolve non-expiring contracts after this
+CONTRACT_FAILURE_TTL_MINUTES = float(os.getenv("CONTRACT_FAILURE_TTL_MINUTES", 15))  # Retry specs that matched no contract or several after this
+IB_MAX_MESSAGES_PER_SECOND = float(os.getenv("IB_MAX_MESSAGES_PER_SECOND", 45))  # Outbound pacing; with the burst of 5 stays within TWS's ~50
+IB_RECONNECT = os.getenv("IB_RECONNECT", "true").lower() == "true"  # Reconnect and resync after an unexpected disconnect
+IB_RECONNECT_MAX_DELAY = float(os.getenv("IB_RECONNECT_MAX_DELAY", 30))  # Cap in seconds of the doubling reconnect backoff
 
 # Trading parameters
 MAX_POSITION_SIZE = float(os.getenv("MAX_POSITION_SIZE", 10000))  # Maximum position size in USD
 RISK_PER_TRADE = float(os.getenv("RISK_PER_TRADE", 0.01))  # Risk per trade as a percentage of account
 MIN_RISK_REWARD_RATIO = float(os.getenv("MIN_RISK_REWARD_RATIO", 2.0))  # Minimum risk:reward ratio
+RISK_METRICS_INTERVAL = float(os.getenv("RISK_METRICS_INTERVAL", 1.0))  # Seconds between risk metric recomputes on price updates (also recomputed on read)
 
 # Logging configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-LOG_FILE = LOGS_DIR / "trading_bot.log" 
\ No newline at end of file
+LOG_FILE = LOGS_DIR / "trading_bot.log" 
+
+# Market data configuration
+MARKET_DATA_HISTORY = int(os.getenv("MARKET_DATA_HISTORY", 1000))  # Data points kept per symbol
+MAX_ALERTS = int(os.getenv("MAX_ALERTS", 10000))  # Alerts retained in memory
+ALERT_TTL_MINUTES = float(os.getenv("ALERT_TTL_MINUTES", 0))  # 0 keeps alerts until evicted by MAX_ALERTS
+BAR_INTERVALS = [int(x) for x in os.getenv("BAR_INTERVALS", "1,60,300").split(",") if x]  # Bar sizes built from ticks, in seconds
+ANALYSIS_BAR_INTERVAL = int(os.getenv("ANALYSIS_BAR_INTERVAL", 0))  # Bar size indicators run on, 0 for every tick
+BAR_ALLOWED_LATENESS = float(os.getenv("BAR_ALLOWED_LATENESS", 0))  # Seconds a bar stays open for late ticks
+MARKET_DATA_ARCHIVE = os.getenv("MARKET_DATA_ARCHIVE", "true").lower() == "true"  # Persist analyzed data for warm restarts
+MARKET_DATA_ARCHIVE_DIR = DATA_DIR / "archive"
+MARKET_DATA_LINES = int(os.getenv("MARKET_DATA_LINES", 100))  # Streaming reqMktData lines the account allows
+MARKET_DATA_BATCH_INTERVAL = float(os.getenv("MARKET_DATA_BATCH_INTERVAL", 0.25))  # Seconds between batched analyzer updates
+ANALYZER_SHARDS = int(os.getenv("ANALYZER_SHARDS", 0))  # Worker processes for market analysis, 0 to analyze in-process
+
+# Value at Risk configuration
+VAR_METHOD = os.getenv("VAR_METHOD", "historical")  # 'historical' or 'monte_carlo'
+VAR_WINDOW = int(os.getenv("VAR_WINDOW", 250))  # Bars of returns used for VaR
+VAR_BAR_INTERVAL = int(os.getenv("VAR_BAR_INTERVAL", 60))  # Bar size VaR returns are measured over, in seconds
+VAR_CONFIDENCE = float(os.getenv("VAR_CONFIDENCE", 0.95))
+
+# Options Greeks configuration
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", 0.02))  # Annual rate used in Black-Scholes
+GREEKS_PRICE_BUCKET = float(os.getenv("GREEKS_PRICE_BUCKET", 0.001))  # Relative underlying move that re-values cached Greeks
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import copy
+import json
+import threading
+from ibapi.contract import Contract
+from loguru import logger
+
+# Contract fields persisted for a resolved contract
+FIELDS = ('conId', 'symbol', 'secType', 'lastTradeDateOrContractMonth', 'strike', 'right', 'multiplier',
+          'exchange', 'primaryExchange', 'currency', 'localSymbol', 'tradingClass')
+
+# Contract spec fields that make up a cache key
+KEY_FIELDS = ('symbol', 'secType', 'lastTradeDateOrContractMonth', 'strike', 'right', 'exchange', 'currency')
+
+def contract_key(contract: Contract) -> Tuple[str, str, str, float, str, str, str]:
+    """Cache key of a contract spec: (symbol, secType, expiry, strike, right, exchange, currency)"""
+    return (contract.symbol, contract.secType, contract.lastTradeDateOrContractMonth or '',
+            float(contract.strike or 0.0), contract.right or '', contract.exchange or '', contract.currency or '')
+
+class ContractCache:
+    """Resolved (conId) contracts memoized by contract spec and persisted as JSON.
+
+    Entries for expiring contracts (options, futures) are evicted after their
+    expiry date; others are re-resolved after `ttl_days`. Lookups are in memory
+    and return copies, so callers may modify them; `save` writes the file only
+    when entries changed. Specs that matched no contract or several are
+    remembered for `failure_ttl_minutes` (in memory only), so they are not
+    looked up again on every use.
+    """
+
+    def __init__(self, path: Optional[Path] = None, ttl_days: float = 30.0, failure_ttl_minutes: float = 15.0):
+        self.path = path
+        self.ttl = timedelta(days=ttl_days)
+        self.failure_ttl = timedelta(minutes=failure_ttl_minutes)
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple, Tuple[Contract, datetime]] = {}
+        self._failures: Dict[Tuple, Tuple[str, datetime]] = {}  # Key -> (reason, failed at)
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path is not None and path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, contract: Contract, resolved_at: datetime, now: datetime) -> bool:
+        expiry = contract.lastTradeDateOrContractMonth
+        if expiry and len(expiry) >= 8:
+            return expiry[:8] < now.strftime("%Y%m%d")
+        return now - resolved_at > self.ttl
+
+    def get(self, spec: Contract) -> Optional[Contract]:
+        """Resolved contract for a spec, or None if it is not cached (or has expired)"""
+        key = contract_key(spec)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0], entry[1], datetime.now()):
+                del self._entries[key]
+                self._dirty = True
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.copy(entry[0])
+
+    def put(self, spec: Contract, resolved: Contract):
+        """Store the resolved contract for a spec"""
+        key = contract_key(spec)
+        with self._lock:
+            self._entries[key] = (copy.copy(resolved), datetime.now())
+            self._failures.pop(key, None)
+            self._dirty = True
+
+    def failure(self, spec: Contract) -> Optional[str]:
+        """Why a spec recently failed to resolve to one contract, or None"""
+        key = contract_key(spec)
+        with self._lock:
+            failure = self._failures.get(key)
+            if failure is not None and datetime.now() - failure[1] > self.failure_ttl:
+                del self._failures[key]
+                failure = None
+        return failure[0] if failure is not None else None
+
+    def put_failure(self, spec: Contract, reason: str):
+        """Remember that a spec matched no contract or several"""
+        with self._lock:
+            self._failures[contract_key(spec)] = (reason, datetime.now())
+
+    def evict_expired(self) -> int:
+        """Drop expired entries and return how many were dropped"""
+        now = datetime.now()
+        with self._lock:
+            expired = [key for key, (contract, resolved_at) in self._entries.items()
+                       if self._expired(contract, resolved_at, now)]
+            for key in expired:
+                del self._entries[key]
+            if expired:
+                self._dirty = True
+        return len(expired)
+
+    def load(self):
+        """Read entries from the cache file, skipping expired ones"""
+        try:
+            records = json.loads(self.path.read_text())
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading contract cache {self.path}: {e}")
+            return
+        for record in records:
+            spec, resolved = Contract(), Contract()
+            for name, value in record['spec'].items():
+                setattr(spec, name, value)
+            for name, value in record['contract'].items():
+                setattr(resolved, name, value)
+            self._entries[contract_key(spec)] = (resolved, datetime.fromisoformat(record['resolved_at']))
+        dropped = self.evict_expired()
+        logger.info(f"Loaded {len(self._entries)} cached contracts ({dropped} expired)")
+
+    def save(self):
+        """Write the cache file if entries changed since the last save"""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            records = [
+                {
+                    'spec': dict(zip(KEY_FIELDS, key)),
+                    'contract': {name: getattr(contract, name) for name in FIELDS},
+                    'resolved_at': resolved_at.isoformat()
+                }
+                for key, (contract, resolved_at) in self._entries.items()
+            ]
+            self._dirty = False
+        # Written to a temporary file first so a crash never leaves a truncated cache
+        temporary = self.path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(records))
+        temporary.replace(self.path)
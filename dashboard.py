@@ -1,8 +1,9 @@
 from flask import Flask, render_template, jsonify, request, redirect, url_for, session, flash
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from trading_bot import TradingBot
+from trading_bot import TradingBot, reconcile_state
 from strategy import TradingStrategy
 from loguru import logger
+import contextlib
 import threading
 import time
 from datetime import datetime, timedelta
@@ -11,6 +12,13 @@ import os
 from werkzeug.security import generate_password_hash, check_password_hash
 from risk_manager import RiskManager, PositionRisk
 from market_analyzer import MarketAnalyzer, MarketAlert
+from sharded_analyzer import ShardedMarketAnalyzer
+from tick_archive import TickArchive
+from var_engine import VaREngine
+from greeks import GreeksEngine
+from config import (MARKET_DATA_ARCHIVE, MARKET_DATA_ARCHIVE_DIR, ANALYSIS_BAR_INTERVAL, ANALYZER_SHARDS,
+                    VAR_METHOD, VAR_WINDOW, VAR_CONFIDENCE, VAR_BAR_INTERVAL, RISK_METRICS_INTERVAL,
+                    RISK_FREE_RATE, GREEKS_PRICE_BUCKET)
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  # For session management
@@ -24,9 +32,12 @@ strategy = TradingStrategy()
 # Global variables for dashboard data
 dashboard_data = {
     'active_trades': {},
-    'account_summary': {},
+    'account_summary': bot.account_summary,  # Updated in place by the IB account stream
     'system_status': 'Disconnected',
     'last_update': None,
+    'order_pacing': {},
+    'connection': {},
+    'market_data': {},
     'trade_history': [],
     'pnl_data': {
         'daily': [],
@@ -35,9 +46,48 @@ dashboard_data = {
     }
 }
 
+# The analyzer, risk manager and strategy are shared by the market data consumer
+# thread, the IB reader thread, the update loop and the request handlers
+state_lock = threading.RLock()
+# The sharded analyzer is thread-safe and waits on worker processes, so it is
+# called outside state_lock; the in-process analyzer shares it
+analyzer_lock = contextlib.nullcontext() if ANALYZER_SHARDS else state_lock
+
+def locked(function, lock=state_lock):
+    """Wrap a listener so it runs under a lock"""
+    def run(*args):
+        with lock:
+            return function(*args)
+    return run
+
 # Initialize risk manager and market analyzer
-risk_manager = RiskManager()
-market_analyzer = MarketAnalyzer()
+var_engine = VaREngine(window=VAR_WINDOW, confidence=VAR_CONFIDENCE, bar_interval=VAR_BAR_INTERVAL)
+risk_manager = RiskManager(var_engine=var_engine, var_method=VAR_METHOD,
+                           lazy_metrics=True, metrics_interval=RISK_METRICS_INTERVAL,
+                           greeks_engine=GreeksEngine(rate=RISK_FREE_RATE, price_bucket=GREEKS_PRICE_BUCKET))
+archive_dir = MARKET_DATA_ARCHIVE_DIR / (f"{ANALYSIS_BAR_INTERVAL}s" if ANALYSIS_BAR_INTERVAL else "ticks")
+if ANALYZER_SHARDS:
+    # Workers start and warm-start from their own archives on first use
+    market_analyzer = ShardedMarketAnalyzer(
+        shards=ANALYZER_SHARDS, archive_dir=archive_dir if MARKET_DATA_ARCHIVE else None)
+else:
+    market_analyzer = MarketAnalyzer(archive=TickArchive(archive_dir) if MARKET_DATA_ARCHIVE else None)
+if MARKET_DATA_ARCHIVE:
+    # Each shard archives its own symbols in a subdirectory
+    var_engine.warm_start([TickArchive(directory) for directory in sorted(archive_dir.glob('shard-*'))]
+                          if ANALYZER_SHARDS else [market_analyzer.archive])
+if not ANALYZER_SHARDS:
+    market_analyzer.warm_start()
+# VaR builds its own bars from streamed trades, whatever the analysis interval
+bot.market_data.listeners.append(locked(var_engine.on_market_data))
+# Streamed trades reprice stock positions and option underlyings
+bot.market_data.listeners.append(locked(risk_manager.on_market_data))
+# Streaming trades from IB reach the analyzer in batches, off the IB reader thread
+bot.market_data.listeners.append(locked(market_analyzer.update_market_data_batch, analyzer_lock))
+# Net liquidation changes size the risk limits
+bot.account_data.listeners.append(locked(risk_manager.on_net_liquidation))
+# After a reconnect, drop trades and positions IB no longer holds
+bot.resync_listeners.append(locked(lambda snapshot: reconcile_state(snapshot, strategy, risk_manager)))
 
 # Mock user database (replace with proper database in production)
 class User(UserMixin):
@@ -62,11 +112,27 @@ def update_dashboard_data():
     """Update dashboard data periodically"""
     while True:
         try:
-            # Update active trades
-            dashboard_data['active_trades'] = strategy.get_active_trades()
+            with state_lock:
+                # Update active trades
+                dashboard_data['active_trades'] = strategy.get_active_trades()
+                
+                # Close VaR bars for symbols that stopped ticking
+                var_engine.flush_bars()
+                
+            with analyzer_lock:
+                # Close market data bars for symbols that stopped ticking
+                market_analyzer.flush_bars()
+                
+                # Persist archived market data and resolved contracts
+                if market_analyzer.archive is not None:
+                    market_analyzer.archive.flush()
+            bot.contract_cache.save()
             
             # Update system status
             dashboard_data['system_status'] = 'Connected' if bot.connected else 'Disconnected'
+            dashboard_data['order_pacing'] = bot.scheduler.metrics()
+            dashboard_data['connection'] = bot.connection_metrics()
+            dashboard_data['market_data'] = bot.market_data.metrics()
             
             # Update timestamp
             dashboard_data['last_update'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -134,7 +200,8 @@ def logout():
 @app.route('/')
 @login_required
 def index():
-    risk_report = risk_manager.get_risk_report()
+    with state_lock:
+        risk_report = risk_manager.get_risk_report()
     return render_template('index.html', 
                          risk_report=risk_report,
                          current_user=current_user)
@@ -143,7 +210,8 @@ def index():
 @login_required
 def get_status():
     """Get current system status"""
-    return jsonify(dashboard_data)
+    # The account summary is written by the IB reader thread, so serialize a copy
+    return jsonify(dict(dashboard_data, account_summary=dict(dashboard_data['account_summary'])))
 
 @app.route('/api/trades')
 @login_required
@@ -159,7 +227,7 @@ def get_trades():
 def get_account():
     """Get account summary"""
     return jsonify({
-        'account_summary': dashboard_data['account_summary'],
+        'account_summary': dict(dashboard_data['account_summary']),
         'last_update': dashboard_data['last_update']
     })
 
@@ -202,7 +270,8 @@ def close_trade():
             })
             
             # Remove from active trades
-            del dashboard_data['active_trades'][symbol]
+            with state_lock:
+                dashboard_data['active_trades'].pop(symbol, None)
             
             return jsonify({'status': 'success'})
         return jsonify({'status': 'error', 'message': 'Trade not found'})
@@ -225,27 +294,50 @@ def positions():
             is_option=data.get('is_option', False),
             delta=float(data.get('delta', 1.0)),
             vega=float(data.get('vega', 0.0)),
-            theta=float(data.get('theta', 0.0))
+            theta=float(data.get('theta', 0.0)),
+            # With these and an underlying price the Greeks are computed instead
+            strike=float(data['strike']) if data.get('strike') else None,
+            expiry=data.get('expiry'),
+            option_type=data.get('option_type'),
+            implied_vol=float(data.get('implied_vol', 0.0)),
+            underlying_price=float(data.get('underlying_price', 0.0)),
+            multiplier=float(data.get('multiplier', 100.0))
         )
         
-        if risk_manager.check_position_risk(position):
-            risk_manager.add_position(position)
-            # Update market analyzer with new position data
-            market_analyzer.update_market_data(
-                symbol=position.symbol,
-                price=position.current_price,
-                volume=position.quantity,
-                timestamp=datetime.now()
-            )
+        with state_lock:
+            accepted = risk_manager.check_position_risk(position)
+            if accepted:
+                risk_manager.add_position(position)
+        if accepted:
+            # Stream the symbol's trades into the market analyzer
+            if bot.connected:
+                bot.market_data.subscribe(bot.create_stock_contract(position.symbol))
             return jsonify({'status': 'success'})
         return jsonify({'status': 'error', 'message': 'Position risk exceeds limits'})
         
-    return jsonify(risk_manager.get_risk_report())
+    with state_lock:
+        return jsonify(risk_manager.get_risk_report())
+
+@app.route('/api/stress')
+@login_required
+def stress_test():
+    """Portfolio P&L under a grid of underlying, volatility and time-decay shocks"""
+    try:
+        grid = {
+            name: [float(x) for x in request.args[arg].split(',')]
+            for name, arg in (('underlying_shocks', 'underlying'), ('vol_shocks', 'vol'), ('days', 'days'))
+            if request.args.get(arg)
+        }
+        with state_lock:
+            return jsonify(risk_manager.stress_test(**grid))
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
 
 @app.route('/api/market-analysis/<symbol>')
 @login_required
 def market_analysis(symbol):
-    analysis = market_analyzer.get_market_analysis(symbol)
+    with analyzer_lock:
+        analysis = market_analyzer.get_market_analysis(symbol)
     return jsonify(analysis)
 
 @app.route('/api/alerts')
@@ -253,7 +345,8 @@ def market_analysis(symbol):
 def alerts():
     symbol = request.args.get('symbol')
     priority = request.args.get('priority')
-    alerts = market_analyzer.get_alerts(symbol=symbol, priority=priority)
+    with analyzer_lock:
+        alerts = market_analyzer.get_alerts(symbol=symbol, priority=priority)
     return jsonify([{
         'symbol': alert.symbol,
         'type': alert.alert_type,
@@ -0,0 +1,172 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import math
+import time
+import numpy as np
+
+SECONDS_PER_YEAR = 365.0 * 24 * 3600
+RIGHTS = {'C': 1.0, 'CALL': 1.0, 'P': -1.0, 'PUT': -1.0}
+GREEKS = ('price', 'delta', 'gamma', 'vega', 'theta')
+
+def expiry_time(expiry: str) -> float:
+    """Epoch seconds of the 16:00 close on an expiry date (YYYYMMDD)"""
+    return datetime.strptime(expiry, "%Y%m%d").replace(hour=16).timestamp()
+
+def expiry_date(timestamp: float) -> str:
+    """Expiry date (YYYYMMDD) of an expiry_time timestamp"""
+    return datetime.fromtimestamp(timestamp).strftime("%Y%m%d")
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF (Abramowitz & Stegun 7.1.26, absolute error below 1e-7)"""
+    z = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / math.sqrt(2.0 * math.pi)
+
+def black_scholes(underlying, strike, years, volatility, right, rate: float = 0.0) -> Dict[str, np.ndarray]:
+    """Black-Scholes price and Greeks for arrays of European options.
+
+    `right` is +1 for calls and -1 for puts. Vega is per volatility point (0.01)
+    and theta per calendar day. Expired options (or zero volatility) are worth
+    their intrinsic value and have no gamma, vega or theta.
+    """
+    s, k, t, sigma, w = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64)
+                                               for a in (underlying, strike, years, volatility, right)))
+    live = (t > 0) & (sigma > 0) & (s > 0) & (k > 0)
+    t_safe = np.where(live, t, 1.0)
+    sigma_safe = np.where(live, sigma, 1.0)
+    root_t = np.sqrt(t_safe)
+    discount = np.exp(-rate * t_safe)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(np.where(live, s / k, 1.0)) + (rate + 0.5 * sigma_safe ** 2) * t_safe) / (sigma_safe * root_t)
+    d2 = d1 - sigma_safe * root_t
+    pdf = norm_pdf(d1)
+    price = w * (s * norm_cdf(w * d1) - k * discount * norm_cdf(w * d2))
+    delta = w * norm_cdf(w * d1)
+    gamma = pdf / (s * sigma_safe * root_t)
+    vega = s * pdf * root_t / 100
+    theta = (-s * pdf * sigma_safe / (2 * root_t) - w * rate * k * discount * norm_cdf(w * d2)) / 365
+
+    intrinsic = np.maximum(w * (s - k), 0.0)
+    return {
+        'price': np.where(live, price, intrinsic),
+        'delta': np.where(live, delta, np.where(intrinsic > 0, w, 0.0)),
+        'gamma': np.where(live, gamma, 0.0),
+        'vega': np.where(live, vega, 0.0),
+        'theta': np.where(live, theta, 0.0)
+    }
+
+def implied_volatility(price, underlying, strike, years, right, rate: float = 0.0, iterations: int = 100,
+                       tolerance: float = 1e-6, low: float = 1e-4, high: float = 5.0) -> np.ndarray:
+    """Implied volatility for arrays of option prices.
+
+    Newton steps safeguarded by a bisection bracket [low, high], all options at
+    once. NaN where the price is outside the no-arbitrage bounds or the option has
+    expired.
+    """
+    p, s, k, t, w = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64)
+                                          for a in (price, underlying, strike, years, right)))
+    discount = np.exp(-rate * np.maximum(t, 0.0))
+    lower_bound = np.maximum(w * (s - k * discount), 0.0)
+    upper_bound = np.where(w > 0, s, k * discount)
+    valid = (t > 0) & (s > 0) & (k > 0) & (p > lower_bound) & (p < upper_bound)
+
+    lo = np.full(p.shape, low)
+    hi = np.full(p.shape, high)
+    sigma = np.full(p.shape, 0.3)
+    active = valid.copy()
+    for _ in range(iterations):
+        if not active.any():
+            break
+        model = black_scholes(s[active], k[active], t[active], sigma[active], w[active], rate)
+        diff = model['price'] - p[active]
+        done = np.abs(diff) < tolerance
+        # Price rises with volatility, so the sign of the error narrows the bracket
+        lo[active] = np.where(diff < 0, sigma[active], lo[active])
+        hi[active] = np.where(diff > 0, sigma[active], hi[active])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = sigma[active] - diff / (model['vega'] * 100)
+        inside = np.isfinite(step) & (step > lo[active]) & (step < hi[active])
+        sigma[active] = np.where(done, sigma[active],
+                                 np.where(inside, step, 0.5 * (lo[active] + hi[active])))
+        active[active] = ~done
+    return np.where(valid, sigma, np.nan)
+
+class GreeksEngine:
+    """Cached Black-Scholes Greeks for option books and chains.
+
+    Options are valued at the center of their underlying price bucket (buckets
+    are `price_bucket` wide in relative terms), so every option with the same
+    (bucket, strike, expiry, right) and volatility shares one cache entry and a
+    small underlying move re-values only options whose bucket changed. Time to
+    expiry is measured from the start of the current `time_step` period; the cache
+    is dropped when the period changes or it grows past `max_entries`.
+    """
+
+    def __init__(self, rate: float = 0.02, price_bucket: float = 0.001, default_volatility: float = 0.3,
+                 time_step: float = 300.0, max_entries: int = 100000):
+        self.rate = rate
+        self.price_bucket = price_bucket
+        self.default_volatility = default_volatility
+        self.time_step = time_step
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._log_step = math.log1p(price_bucket)
+        self._cache: Dict[Tuple[int, float, float, float, float], Tuple[float, ...]] = {}
+        self._period: Optional[float] = None
+
+    def _valuation_time(self, now: Optional[float]) -> float:
+        now = time.time() if now is None else now
+        period = now // self.time_step * self.time_step
+        if period != self._period or len(self._cache) > self.max_entries:
+            self._cache = {}
+            self._period = period
+        return period
+
+    def greeks(self, underlying, strike, expiry, right, volatility=None,
+               now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Price, delta, gamma, vega and theta per option.
+
+        `expiry` holds expiry_time timestamps and `right` +1/-1; volatility
+        defaults to `default_volatility` where missing or not positive.
+        """
+        valued_at = self._valuation_time(now)
+        underlying = np.asarray(underlying, dtype=np.float64)
+        n = len(underlying)
+        strike = np.broadcast_to(np.asarray(strike, dtype=np.float64), n)
+        expiry = np.broadcast_to(np.asarray(expiry, dtype=np.float64), n)
+        right = np.broadcast_to(np.asarray(right, dtype=np.float64), n)
+        volatility = np.broadcast_to(np.asarray(
+            self.default_volatility if volatility is None else volatility, dtype=np.float64), n)
+        volatility = np.round(np.where(volatility > 0, volatility, self.default_volatility), 4)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            buckets = np.round(np.log(underlying) / self._log_step)
+        buckets = np.where(np.isfinite(buckets), buckets, 0).astype(np.int64)
+
+        keys = list(zip(buckets.tolist(), strike.tolist(), expiry.tolist(), right.tolist(), volatility.tolist()))
+        cache = self._cache
+        values = [cache.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        self.hits += n - len(missing)
+        self.misses += len(missing)
+        if missing:
+            rows = np.array(missing, dtype=np.int64)
+            model = black_scholes(np.exp(buckets[rows] * self._log_step), strike[rows],
+                                  (expiry[rows] - valued_at) / SECONDS_PER_YEAR, volatility[rows], right[rows], self.rate)
+            computed = list(zip(*(model[name].tolist() for name in GREEKS)))
+            for i, value in zip(missing, computed):
+                values[i] = cache[keys[i]] = value
+        table = np.array(values, dtype=np.float64).reshape(n, len(GREEKS))
+        return {name: table[:, column] for column, name in enumerate(GREEKS)}
+
+    def implied_volatility(self, price, underlying, strike, expiry, right, now: Optional[float] = None) -> np.ndarray:
+        """Implied volatility per option (default_volatility where it has no solution)"""
+        now = time.time() if now is None else now
+        years = (np.asarray(expiry, dtype=np.float64) - now) / SECONDS_PER_YEAR
+        volatility = implied_volatility(price, underlying, strike, years, right, self.rate)
+        return np.where(np.isnan(volatility), self.default_volatility, volatility)
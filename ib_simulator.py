@@ -0,0 +1,532 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from ibapi.client import EClient
+from ibapi.contract import Contract, ContractDetails
+from ibapi.execution import Execution
+from ibapi.order import Order
+from ibapi.order_state import OrderState
+from ibapi.common import TickAttrib
+from ibapi.ticktype import TickTypeEnum
+from loguru import logger
+
+@dataclass
+class LatencyModel:
+    """One-way message latency: `base` seconds plus uniform jitter in [0, jitter)"""
+    base: float = 0.001
+    jitter: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        return self.base + (rng.random() * self.jitter if self.jitter else 0.0)
+
+@dataclass
+class FillModel:
+    """How working orders execute against the simulated last price"""
+    fill_delay: float = 0.0          # Seconds between an order becoming marketable and its fill
+    slippage: float = 0.0            # Price units against the order for market and stop fills
+    executions: int = 1              # execDetails callbacks a fill is split into
+    reject_probability: float = 0.0  # Chance an order is rejected on arrival
+
+@dataclass
+class _SimOrder:
+    order_id: int
+    contract: Contract
+    order: Order
+    status: str = 'PendingSubmit'
+    filled: float = 0.0
+    children: List[int] = field(default_factory=list)
+
+class IBSimulator:
+    """In-process stand-in for TWS / IB Gateway.
+
+    `attach(bot)` replaces a TradingBot's outgoing EClient calls (connect, run,
+    placeOrder, cancelOrder, reqMktData, cancelMktData, reqContractDetails) with
+    the simulator's, so the bot runs unchanged: connect_to_ib completes the
+    handshake when nextValidId arrives, and every callback is delivered on the
+    bot's reader thread after a latency drawn from `latency` with a seeded RNG.
+
+    Orders are acknowledged with openOrder/orderStatus and executed by `fills`
+    against prices published with `tick`, which also streams tickPrice/tickSize
+    to market data subscribers. Brackets are honoured (untransmitted legs wait
+    for the transmitting one, children wait for their parent, OCA siblings are
+    cancelled on fill). Inbound messages above `max_messages_per_second` are
+    dropped with pacing error 100, as TWS does.
+
+    Fills build up positions and move cash from `cash`, which reqPositions and
+    reqAccountUpdates report along with the working orders (reqOpenOrders);
+    reqAccountSummary and reqPnL stream the account's value after every fill and
+    every tick of a held symbol. `drop_connection` closes the
+    session without touching orders or positions, and connection attempts are
+    refused while `available` is False, for testing reconnects.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, fills: Optional[FillModel] = None,
+                 max_messages_per_second: float = 50.0, max_lines: int = 100, next_order_id: int = 1,
+                 seed: int = 0, account: str = 'DU000000', cash: float = 1000000.0):
+        self.latency = latency or LatencyModel()
+        self.fills = fills or FillModel()
+        self.max_messages_per_second = max_messages_per_second
+        self.max_lines = max_lines
+        self.next_order_id = next_order_id
+        self.rng = random.Random(seed)
+        self.messages = 0
+        self.pacing_violations = 0
+        self.orders_received = 0
+        self.orders_filled = 0
+        self.bot = None
+        self.account = account
+        self.available = True
+        self.last_prices: Dict[str, float] = {}
+        self.positions: Dict[str, List] = {}  # Symbol -> [contract, quantity, average cost]
+        self.cash = cash
+        self.realized_pnl = 0.0
+        self._starting_value = cash
+        self._summary_requests: Dict[int, List[str]] = {}  # Request ID -> tags
+        self._pnl_requests: List[int] = []
+        self._orders: Dict[int, _SimOrder] = {}
+        self._untransmitted: List[_SimOrder] = []
+        self._subscriptions: Dict[int, str] = {}  # Request ID -> symbol
+        self._con_ids: Dict[tuple, int] = {}
+        self._tokens = max_messages_per_second
+        self._refilled_at = time.monotonic()
+        self._last_arrival = 0.0
+        self._events: List[Tuple[float, int, Callable, tuple]] = []
+        self._sequence = itertools.count()
+        self._exec_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._condition = threading.Condition(self._lock)
+        self._connected = False
+
+    def attach(self, bot):
+        """Route a TradingBot's outgoing calls to this simulator and return the bot"""
+        self.bot = bot
+        bot.connect = self._connect
+        bot.isConnected = lambda: self._connected
+        bot.run = self._run
+        bot.placeOrder = self._place_order
+        bot.cancelOrder = self._cancel_order
+        bot.reqMktData = self._req_mkt_data
+        bot.cancelMktData = self._cancel_mkt_data
+        bot.reqContractDetails = self._req_contract_details
+        bot.reqOpenOrders = self._req_open_orders
+        bot.reqPositions = self._req_positions
+        bot.cancelPositions = self._cancel_positions
+        bot.reqAccountUpdates = self._req_account_updates
+        bot.reqAccountSummary = self._req_account_summary
+        bot.cancelAccountSummary = self._cancel_account_summary
+        bot.reqPnL = self._req_pnl
+        bot.cancelPnL = self._cancel_pnl
+        return bot
+
+    # Event delivery
+
+    def _deliver(self, at: float, callback: Callable, *args):
+        """Call `callback(*args)` on the reader thread at monotonic time `at`"""
+        with self._condition:
+            heapq.heappush(self._events, (at, next(self._sequence), callback, args))
+            self._condition.notify()
+
+    def _arrival(self) -> float:
+        # One socket: messages never overtake each other, whatever the jitter
+        self._last_arrival = max(time.monotonic() + self.latency.sample(self.rng), self._last_arrival)
+        return self._last_arrival
+
+    def _run(self):
+        """Reader thread: deliver due callbacks until the client disconnects"""
+        while True:
+            with self._condition:
+                while self._connected and self.bot.connState != EClient.DISCONNECTED:
+                    wait = self._events[0][0] - time.monotonic() if self._events else None
+                    if wait is not None and wait <= 0:
+                        break
+                    # Polls so a client-side disconnect is noticed without a notify
+                    self._condition.wait(0.05 if wait is None else min(wait, 0.05))
+                else:
+                    self._connected = False
+                    self._events.clear()
+                    # Streams end with the session; orders and positions persist
+                    self._subscriptions.clear()
+                    self._summary_requests.clear()
+                    self._pnl_requests.clear()
+                    break
+                _, _, callback, args = heapq.heappop(self._events)
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Error in simulated IB callback {callback.__name__}: {e}")
+        self.bot.connState = EClient.DISCONNECTED
+        self.bot.connectionClosed()
+
+    def _paced(self, request_id: int) -> bool:
+        """Count an inbound message and answer pacing error 100 if it exceeds the rate"""
+        now = time.monotonic()
+        self.messages += 1
+        self._tokens = min(self.max_messages_per_second,
+                           self._tokens + (now - self._refilled_at) * self.max_messages_per_second)
+        self._refilled_at = now
+        if self._tokens < 1:
+            self.pacing_violations += 1
+            self._deliver(self._arrival(), self.bot.error, request_id, 100,
+                          f"Max rate of messages per second has been exceeded:max={self.max_messages_per_second:g}")
+            return False
+        self._tokens -= 1
+        return True
+
+    # Connection
+
+    def _connect(self, host: str, port: int, client_id: int):
+        with self._lock:
+            if not self.available:
+                return
+            self._connected = True
+            self.bot.connState = EClient.CONNECTED
+            self._events.clear()
+            self._tokens = self.max_messages_per_second
+            # Handshake: server version exchange and start API, then the accounts and next valid order ID
+            at = self._arrival() + self.latency.sample(self.rng)
+            self._deliver(at, self.bot.managedAccounts, self.account)
+            self._deliver(at, self.bot.nextValidId, self.next_order_id)
+
+    def drop_connection(self):
+        """Simulate TWS closing the socket; the bot gets connectionClosed"""
+        with self._condition:
+            self._connected = False
+            self._condition.notify()
+
+    # Orders
+
+    def _place_order(self, order_id: int, contract: Contract, order: Order):
+        with self._lock:
+            if not self._paced(order_id):
+                return
+            self.orders_received += 1
+            self.next_order_id = max(self.next_order_id, order_id + 1)
+            sim = _SimOrder(order_id, contract, order)
+            if not order.transmit:
+                self._untransmitted.append(sim)
+                return
+            # A transmitting order releases the untransmitted legs linked to it
+            linked = [held for held in self._untransmitted
+                      if order.parentId and (held.order_id == order.parentId or held.order.parentId == order.parentId)]
+            self._untransmitted = [held for held in self._untransmitted if held not in linked]
+            at = self._arrival()
+            for accepted in linked + [sim]:
+                self._accept(accepted, at)
+
+    def _accept(self, sim: _SimOrder, at: float):
+        if self.fills.reject_probability and self.rng.random() < self.fills.reject_probability:
+            self._deliver(at, self.bot.error, sim.order_id, 201, "Order rejected - reason: simulated rejection")
+            return
+        self._orders[sim.order_id] = sim
+        parent = self._orders.get(sim.order.parentId)
+        if parent is not None:
+            parent.children.append(sim.order_id)
+        # Children wait for their parent's fill
+        sim.status = 'PreSubmitted' if parent is not None and parent.status != 'Filled' else 'Submitted'
+        state = OrderState()
+        state.status = sim.status
+        self._deliver(at, self.bot.openOrder, sim.order_id, sim.contract, sim.order, state)
+        self._status(sim, at)
+        if sim.status == 'Submitted':
+            self._try_fill(sim, at)
+
+    def _status(self, sim: _SimOrder, at: float, avg_price: float = 0.0):
+        remaining = float(sim.order.totalQuantity) - sim.filled
+        self._deliver(at, self.bot.orderStatus, sim.order_id, sim.status, sim.filled, remaining, avg_price,
+                      0, sim.order.parentId, avg_price, 0, '', 0.0)
+
+    def _fill_price(self, sim: _SimOrder) -> Optional[float]:
+        """Execution price if the order is marketable at the last price"""
+        last = self.last_prices.get(sim.contract.symbol)
+        order = sim.order
+        buy = order.action == 'BUY'
+        slip = self.fills.slippage if buy else -self.fills.slippage
+        if order.orderType == 'MKT':
+            price = last if last is not None else (order.lmtPrice if order.lmtPrice < 1e300 else None)
+            return None if price is None else price + slip
+        if last is None:
+            return None
+        if order.orderType == 'STP':
+            triggered = last >= order.auxPrice if buy else last <= order.auxPrice
+            return last + slip if triggered else None
+        marketable = last <= order.lmtPrice if buy else last >= order.lmtPrice
+        return last if marketable else None
+
+    def _try_fill(self, sim: _SimOrder, at: float):
+        price = self._fill_price(sim)
+        if price is None:
+            return
+        at += self.fills.fill_delay
+        quantity = float(sim.order.totalQuantity)
+        parts = max(1, self.fills.executions)
+        for i in range(parts):
+            execution = Execution()
+            execution.execId = f"sim.{next(self._exec_ids)}"
+            execution.orderId = sim.order_id
+            execution.side = 'BOT' if sim.order.action == 'BUY' else 'SLD'
+            execution.shares = quantity / parts
+            execution.price = execution.avgPrice = price
+            execution.cumQty = quantity * (i + 1) / parts
+            execution.time = time.strftime("%Y%m%d  %H:%M:%S")
+            self._deliver(at, self.bot.execDetails, -1, sim.contract, execution)
+        held = self.positions.setdefault(sim.contract.symbol, [sim.contract, 0.0, 0.0])
+        signed = quantity if sim.order.action == 'BUY' else -quantity
+        if held[1] * signed >= 0:
+            # Adding to (or opening) a position moves its average cost
+            held[2] = (held[1] * held[2] + signed * price) / (held[1] + signed)
+        else:
+            closed = min(abs(signed), abs(held[1]))
+            self.realized_pnl += closed * (price - held[2]) * (1 if held[1] > 0 else -1)
+            if abs(signed) > abs(held[1]):
+                held[2] = price  # Reversed through zero
+        held[1] += signed
+        self.cash -= signed * price
+        if held[1] == 0:
+            del self.positions[sim.contract.symbol]
+        sim.filled = quantity
+        sim.status = 'Filled'
+        self.orders_filled += 1
+        self._status(sim, at, price)
+        self._push_account(at)
+        del self._orders[sim.order_id]
+        # One fill in an OCA group cancels the rest
+        if sim.order.ocaGroup:
+            for other in [o for o in self._orders.values() if o.order.ocaGroup == sim.order.ocaGroup]:
+                self._cancel(other, at)
+        for child_id in sim.children:
+            child = self._orders.get(child_id)
+            if child is not None and child.status == 'PreSubmitted':
+                child.status = 'Submitted'
+                self._status(child, at)
+                self._try_fill(child, at)
+
+    def _cancel(self, sim: _SimOrder, at: float):
+        self._orders.pop(sim.order_id, None)
+        sim.status = 'Cancelled'
+        self._status(sim, at)
+
+    def _cancel_order(self, order_id: int, *args):
+        with self._lock:
+            if not self._paced(order_id):
+                return
+            sim = self._orders.get(order_id)
+            if sim is None:
+                self._deliver(self._arrival(), self.bot.error, order_id, 10147,
+                              f"OrderId {order_id} that needs to be cancelled is not found.")
+                return
+            self._cancel(sim, self._arrival())
+
+    # Market data and contracts
+
+    def tick(self, symbol: str, price: float, size: float = 100):
+        """Publish a trade: stream it to subscribers and execute orders it makes marketable"""
+        with self._lock:
+            self.last_prices[symbol] = price
+            at = self._arrival()
+            for request_id, subscribed in self._subscriptions.items():
+                if subscribed == symbol:
+                    self._deliver(at, self.bot.tickPrice, request_id, TickTypeEnum.LAST, price, TickAttrib())
+                    self._deliver(at, self.bot.tickSize, request_id, TickTypeEnum.LAST_SIZE, size)
+            for sim in [o for o in self._orders.values() if o.contract.symbol == symbol and o.status == 'Submitted']:
+                if sim.order_id in self._orders:
+                    self._try_fill(sim, at)
+            if symbol in self.positions:
+                self._push_account(at)
+
+    def _req_mkt_data(self, request_id: int, contract: Contract, *args):
+        with self._lock:
+            if not self._paced(request_id):
+                return
+            if len(self._subscriptions) >= self.max_lines:
+                self._deliver(self._arrival(), self.bot.error, request_id, 101,
+                              "Max number of tickers has been reached")
+                return
+            self._subscriptions[request_id] = contract.symbol
+
+    def _cancel_mkt_data(self, request_id: int):
+        with self._lock:
+            if self._paced(request_id):
+                self._subscriptions.pop(request_id, None)
+
+    def _req_contract_details(self, request_id: int, contract: Contract):
+        with self._lock:
+            if not self._paced(request_id):
+                return
+            key = (contract.symbol, contract.secType, contract.lastTradeDateOrContractMonth,
+                   contract.strike, contract.right)
+            details = ContractDetails()
+            details.contract = Contract()
+            details.contract.__dict__.update(contract.__dict__)
+            details.contract.conId = self._con_ids.setdefault(key, len(self._con_ids) + 1)
+            at = self._arrival()
+            self._deliver(at, self.bot.contractDetails, request_id, details)
+            self._deliver(at, self.bot.contractDetailsEnd, request_id)
+
+    # Account and order downloads
+
+    def _req_open_orders(self):
+        with self._lock:
+            if not self._paced(0):
+                return
+            at = self._arrival()
+            for sim in list(self._orders.values()):
+                state = OrderState()
+                state.status = sim.status
+                self._deliver(at, self.bot.openOrder, sim.order_id, sim.contract, sim.order, state)
+            self._deliver(at, self.bot.openOrderEnd)
+
+    def _req_positions(self):
+        with self._lock:
+            if not self._paced(0):
+                return
+            at = self._arrival()
+            for contract, quantity, average_cost in self.positions.values():
+                self._deliver(at, self.bot.position, self.account, contract, quantity, average_cost)
+            self._deliver(at, self.bot.positionEnd)
+
+    def _cancel_positions(self):
+        with self._lock:
+            self._paced(0)
+
+    def _req_account_updates(self, subscribe: bool, account: str):
+        with self._lock:
+            if not self._paced(0) or not subscribe:
+                return
+            at = self._arrival()
+            for contract, quantity, average_cost in self.positions.values():
+                price = self.last_prices.get(contract.symbol, average_cost)
+                self._deliver(at, self.bot.updatePortfolio, contract, quantity, price, quantity * price,
+                              average_cost, quantity * (price - average_cost), 0.0, self.account)
+            for key, value in self.account_values().items():
+                self._deliver(at, self.bot.updateAccountValue, key, f"{value:.2f}", 'USD', self.account)
+            self._deliver(at, self.bot.accountDownloadEnd, self.account)
+
+    def account_values(self) -> Dict[str, float]:
+        """Account summary tags and P&L at the last prices"""
+        gross = unrealized = 0.0
+        value = self.cash
+        for contract, quantity, average_cost in self.positions.values():
+            price = self.last_prices.get(contract.symbol, average_cost)
+            value += quantity * price
+            gross += abs(quantity * price)
+            unrealized += quantity * (price - average_cost)
+        return {
+            'NetLiquidation': value, 'TotalCashValue': self.cash, 'GrossPositionValue': gross,
+            'BuyingPower': 4 * (value - 0.25 * gross), 'AvailableFunds': value - 0.25 * gross,
+            'ExcessLiquidity': value - 0.25 * gross, 'InitMarginReq': 0.25 * gross, 'MaintMarginReq': 0.25 * gross,
+            'DailyPnL': value - self._starting_value, 'UnrealizedPnL': unrealized, 'RealizedPnL': self.realized_pnl
+        }
+
+    def _push_account(self, at: float, request_id: Optional[int] = None):
+        """Stream account values to the summary and P&L subscribers (or one new summary subscriber)"""
+        if not self._summary_requests and not self._pnl_requests:
+            return
+        values = self.account_values()
+        for summary_id, tags in self._summary_requests.items():
+            if request_id is not None and summary_id != request_id:
+                continue
+            for tag in tags:
+                if tag in values:
+                    self._deliver(at, self.bot.accountSummary, summary_id, self.account, tag, f"{values[tag]:.2f}",
+                                  'USD')
+        if request_id is None:
+            for pnl_id in self._pnl_requests:
+                self._deliver(at, self.bot.pnl, pnl_id, values['DailyPnL'], values['UnrealizedPnL'],
+                              values['RealizedPnL'])
+
+    def _req_account_summary(self, request_id: int, group: str, tags: str):
+        with self._lock:
+            if not self._paced(request_id):
+                return
+            self._summary_requests[request_id] = tags.split(',')
+            at = self._arrival()
+            self._push_account(at, request_id)
+            self._deliver(at, self.bot.accountSummaryEnd, request_id)
+
+    def _cancel_account_summary(self, request_id: int):
+        with self._lock:
+            if self._paced(request_id):
+                self._summary_requests.pop(request_id, None)
+
+    def _req_pnl(self, request_id: int, account: str, model_code: str):
+        with self._lock:
+            if not self._paced(request_id):
+                return
+            self._pnl_requests.append(request_id)
+            values = self.account_values()
+            self._deliver(self._arrival(), self.bot.pnl, request_id, values['DailyPnL'], values['UnrealizedPnL'],
+                          values['RealizedPnL'])
+
+    def _cancel_pnl(self, request_id: int):
+        with self._lock:
+            if self._paced(request_id) and request_id in self._pnl_requests:
+                self._pnl_requests.remove(request_id)
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            'messages': self.messages,
+            'pacing_violations': self.pacing_violations,
+            'orders_received': self.orders_received,
+            'orders_filled': self.orders_filled,
+            'working_orders': len(self._orders),
+            'subscriptions': len(self._subscriptions),
+            'positions': len(self.positions)
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test TradingBot order handling against the IB simulator")
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.001, help="One-way latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--fill-delay', type=float, default=0.0)
+    parser.add_argument('--rate', type=float, default=None,
+                        help="Messages per second for both the bot's pacing and the simulator's limit "
+                             "(default: the configured pacing against a 50/s simulator)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from contract_cache import ContractCache
+    from trading_bot import TradingBot
+
+    simulator = IBSimulator(LatencyModel(args.latency, args.jitter), FillModel(fill_delay=args.fill_delay),
+                            max_messages_per_second=args.rate or 50.0, seed=args.seed)
+    bot = simulator.attach(TradingBot(contract_cache=ContractCache()))
+    if args.rate:
+        bot.scheduler.rate = args.rate
+    if not bot.connect_to_ib():
+        return
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    for i, symbol in enumerate(symbols):
+        simulator.tick(symbol, 100.0 + i)
+
+    started = time.perf_counter()
+    futures = []
+    for i in range(args.orders):
+        contract = bot.create_stock_contract(symbols[i % len(symbols)])
+        futures.append(bot.submit_order(contract, bot.create_order('BUY', 1, 'MKT'), wait_for='filled'))
+    statuses: Dict[str, int] = {}
+    for future in futures:
+        status = future.result().status
+        statuses[status] = statuses.get(status, 0) + 1
+    elapsed = time.perf_counter() - started
+    bot.close()
+
+    print(json.dumps({
+        'orders': args.orders,
+        'elapsed': elapsed,
+        'orders_per_second': args.orders / elapsed,
+        'statuses': statuses,
+        'latency': bot.latency_stats(),
+        'pacing': bot.scheduler.metrics(),
+        'simulator': simulator.metrics()
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
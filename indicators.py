@@ -0,0 +1,237 @@
+from typing import Any, Callable, Dict, Sequence, Tuple
+import numpy as np
+from tick_store import TickStore
+
+class IndicatorEngine:
+    """Streaming RSI, MACD, Bollinger Bands and volume statistics.
+
+    State is kept per symbol (one entry per TickStore row) and every tick costs O(1):
+    EMAs advance through their recurrences, and windowed means and variances use
+    running sums whose outgoing values are read back from the store before it is
+    overwritten. Results match the pandas calculations in MarketAnalyzer.
+    """
+
+    STATE = (
+        'ema_fast', 'ema_slow', 'macd', 'signal', 'prev_macd', 'prev_signal',
+        'gain_sum', 'loss_sum',
+        'price_ref', 'price_sum', 'price_sumsq',
+        'volume_sum', 'volume_sumsq'
+    )
+
+    def __init__(self, store: TickStore, rsi_period: int = 14, macd_fast: int = 12,
+                 macd_slow: int = 26, macd_signal: int = 9, bollinger_period: int = 20,
+                 bollinger_std: float = 2.0):
+        if store.capacity <= max(rsi_period + 1, bollinger_period):
+            raise ValueError("TickStore capacity is too small for the indicator windows")
+        self.store = store
+        self.rsi_period = rsi_period
+        self.bollinger_period = bollinger_period
+        self.bollinger_std = bollinger_std
+        self._alpha_fast = 2.0 / (macd_fast + 1)
+        self._alpha_slow = 2.0 / (macd_slow + 1)
+        self._alpha_signal = 2.0 / (macd_signal + 1)
+        self._state = {name: np.zeros(store.allocated_rows) for name in self.STATE}
+        # Updates since the running sums were last recomputed exactly
+        self._since_resync = np.zeros(store.allocated_rows, dtype=np.int64)
+
+    def _ensure_rows(self):
+        """Grow state arrays to match the store"""
+        size = self.store.allocated_rows
+        current = len(self._since_resync)
+        if size > current:
+            for name, values in self._state.items():
+                self._state[name] = np.concatenate([values, np.zeros(size - current)])
+            self._since_resync = np.concatenate([self._since_resync, np.zeros(size - current, dtype=np.int64)])
+
+    def update(self, rows: np.ndarray, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+        """Append one tick per row to the store and advance indicator state.
+
+        `rows` must not contain duplicates.
+        """
+        self._ensure_rows()
+        store = self.store
+        state = self._state
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        total = store.totals(rows)
+        has_prev = total > 0
+
+        # RSI: windowed sums of gains and losses (the very first tick contributes 0)
+        delta = np.where(has_prev, prices - store.back(rows, 'price', 0), 0.0)
+        period = self.rsi_period
+        old = store.back(rows, 'price', period - 1)
+        older = store.back(rows, 'price', period)
+        old_delta = np.where(total > period, old - older, 0.0)
+        state['gain_sum'][rows] += np.maximum(delta, 0.0) - np.maximum(old_delta, 0.0)
+        state['loss_sum'][rows] += np.maximum(-delta, 0.0) - np.maximum(-old_delta, 0.0)
+
+        # Bollinger: windowed sums of prices, shifted by a reference price for precision
+        ref = np.where(has_prev, state['price_ref'][rows], prices)
+        state['price_ref'][rows] = ref
+        evicted = np.where(total >= self.bollinger_period,
+                           store.back(rows, 'price', self.bollinger_period - 1) - ref, 0.0)
+        shifted = prices - ref
+        state['price_sum'][rows] += shifted - evicted
+        state['price_sumsq'][rows] += shifted * shifted - evicted * evicted
+
+        # Volume: sums over everything the store holds
+        evicted = np.where(total >= store.capacity, store.back(rows, 'volume', store.capacity - 1), 0.0)
+        state['volume_sum'][rows] += volumes - evicted
+        state['volume_sumsq'][rows] += volumes * volumes - evicted * evicted
+
+        # MACD: EMA recurrences seeded with the first price (pandas adjust=False)
+        ema_fast = np.where(has_prev, self._alpha_fast * prices + (1 - self._alpha_fast) * state['ema_fast'][rows], prices)
+        ema_slow = np.where(has_prev, self._alpha_slow * prices + (1 - self._alpha_slow) * state['ema_slow'][rows], prices)
+        macd = ema_fast - ema_slow
+        state['prev_macd'][rows] = state['macd'][rows]
+        state['prev_signal'][rows] = state['signal'][rows]
+        state['ema_fast'][rows] = ema_fast
+        state['ema_slow'][rows] = ema_slow
+        state['macd'][rows] = macd
+        state['signal'][rows] = np.where(
+            has_prev, self._alpha_signal * macd + (1 - self._alpha_signal) * state['signal'][rows], macd)
+
+        store.append(rows, timestamps, prices, volumes)
+
+        # Recompute running sums exactly once per store capacity to bound float drift
+        self._since_resync[rows] += 1
+        due = rows[self._since_resync[rows] >= store.capacity]
+        if len(due):
+            self._resync(due)
+
+    def _gather(self, rows: np.ndarray, field: str, width: int) -> np.ndarray:
+        """Last `width` values per row as a matrix, left-padded with NaN"""
+        matrix = np.full((len(rows), width), np.nan)
+        for i, row in enumerate(rows):
+            values = self.store.window(row, field, width)
+            matrix[i, width - len(values):] = values
+        return matrix
+
+    def _resync(self, rows: np.ndarray):
+        """Recompute the running sums for rows exactly from the store"""
+        state = self._state
+        deltas = np.diff(self._gather(rows, 'price', self.rsi_period + 1), axis=1)
+        state['gain_sum'][rows] = np.where(deltas > 0, deltas, 0.0).sum(axis=1)
+        state['loss_sum'][rows] = np.where(deltas < 0, -deltas, 0.0).sum(axis=1)
+
+        prices = self._gather(rows, 'price', self.bollinger_period)
+        ref = np.nanmean(prices, axis=1)
+        shifted = prices - ref[:, None]
+        state['price_ref'][rows] = ref
+        state['price_sum'][rows] = np.nansum(shifted, axis=1)
+        state['price_sumsq'][rows] = np.nansum(shifted * shifted, axis=1)
+
+        volumes = self._gather(rows, 'volume', int(self.store.counts(rows).max()))
+        state['volume_sum'][rows] = np.nansum(volumes, axis=1)
+        state['volume_sumsq'][rows] = np.nansum(volumes * volumes, axis=1)
+        self._since_resync[rows] = 0
+
+    def rebuild(self, rows: np.ndarray):
+        """Recompute all state for rows from the data already in the store"""
+        self._ensure_rows()
+        rows = rows[self.store.counts(rows) > 0]
+        if len(rows) == 0:
+            return
+        self._resync(rows)
+
+        # Replay the EMA recurrences across all rows at once, one column per step.
+        # Shorter histories are left-padded with NaN and start at their first value.
+        prices = self._gather(rows, 'price', int(self.store.counts(rows).max()))
+        ema_fast = np.full(len(rows), np.nan)
+        ema_slow = np.full(len(rows), np.nan)
+        signal = np.full(len(rows), np.nan)
+        macd = prev_macd = prev_signal = signal
+        for column in prices.T:
+            prev_macd, prev_signal = macd, signal
+            started = ~np.isnan(ema_fast)
+            ema_fast = np.where(started, self._alpha_fast * column + (1 - self._alpha_fast) * ema_fast, column)
+            ema_slow = np.where(started, self._alpha_slow * column + (1 - self._alpha_slow) * ema_slow, column)
+            macd = ema_fast - ema_slow
+            signal = np.where(started, self._alpha_signal * macd + (1 - self._alpha_signal) * signal, macd)
+
+        state = self._state
+        state['ema_fast'][rows] = ema_fast
+        state['ema_slow'][rows] = ema_slow
+        state['macd'][rows] = macd
+        state['signal'][rows] = signal
+        state['prev_macd'][rows] = np.nan_to_num(prev_macd)
+        state['prev_signal'][rows] = np.nan_to_num(prev_signal)
+
+    def rsi(self, rows) -> np.ndarray:
+        """Latest RSI per row (NaN until the window is full)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gain = np.maximum(self._state['gain_sum'][rows], 0.0)
+            loss = np.maximum(self._state['loss_sum'][rows], 0.0)
+            rsi = 100 - (100 / (1 + gain / loss))
+        return np.where(self.store.totals(rows) >= self.rsi_period, rsi, np.nan)
+
+    def macd(self, rows) -> Dict[str, np.ndarray]:
+        """Latest and previous MACD and signal values per row"""
+        return {
+            'macd': self._state['macd'][rows],
+            'signal': self._state['signal'][rows],
+            'prev_macd': self._state['prev_macd'][rows],
+            'prev_signal': self._state['prev_signal'][rows]
+        }
+
+    def bollinger_bands(self, rows) -> Dict[str, np.ndarray]:
+        """Latest Bollinger Bands per row (NaN until the window is full)"""
+        n = self.bollinger_period
+        valid = self.store.totals(rows) >= n
+        total = self._state['price_sum'][rows]
+        middle = self._state['price_ref'][rows] + total / n
+        variance = np.maximum(self._state['price_sumsq'][rows] - total * total / n, 0.0) / (n - 1)
+        std = np.sqrt(variance)
+        return {
+            'upper': np.where(valid, middle + std * self.bollinger_std, np.nan),
+            'middle': np.where(valid, middle, np.nan),
+            'lower': np.where(valid, middle - std * self.bollinger_std, np.nan)
+        }
+
+    def volume_profile(self, rows) -> Dict[str, np.ndarray]:
+        """Mean and sample standard deviation of held volumes, plus the latest volume"""
+        n = self.store.counts(rows).astype(np.float64)
+        total = self._state['volume_sum'][rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.maximum(self._state['volume_sumsq'][rows] - total * total / n, 0.0) / (n - 1)
+            return {
+                'average_volume': total / n,
+                'volume_std': np.where(n > 1, np.sqrt(variance), np.nan),
+                'current_volume': self.store.back(rows, 'volume', 0)
+            }
+
+class IndicatorGraph:
+    """Full-series indicator calculations registered as a dependency graph.
+
+    Each node is `func(symbol, *dependency_values)`. Results are memoized per symbol
+    for one data version, so nodes shared by several indicators are computed once and
+    nothing is recomputed until new data arrives for that symbol.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+        self._cache: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+    def register(self, name: str, func: Callable[..., Any], depends_on: Sequence[str] = ()):
+        """Add a node; dependencies must already be registered"""
+        missing = [dep for dep in depends_on if dep not in self._nodes]
+        if missing:
+            raise ValueError(f"Indicator {name} depends on unknown nodes: {missing}")
+        self._nodes[name] = (func, tuple(depends_on))
+
+    def evaluate(self, symbol: str, version: int, name: str) -> Any:
+        """Value of a node for a symbol at a data version"""
+        cached = self._cache.get(symbol)
+        if cached is None or cached[0] != version:
+            cached = self._cache[symbol] = (version, {})
+        return self._evaluate(symbol, name, cached[1])
+
+    def _evaluate(self, symbol: str, name: str, values: Dict[str, Any]) -> Any:
+        if name not in values:
+            func, depends_on = self._nodes[name]
+            values[name] = func(symbol, *(self._evaluate(symbol, dep, values) for dep in depends_on))
+        return values[name]
+
+    def invalidate(self, symbol: str):
+        """Drop memoized values for a symbol"""
+        self._cache.pop(symbol, None)
@@ -35,42 +35,10 @@ def main():
         )
         
         if stock_signal:
-            # Create stock contract
-            contract = bot.create_stock_contract(symbol=stock_signal.symbol)
-            
-            # Create entry order
-            entry_order = bot.create_order(
-                action=stock_signal.direction,
-                quantity=stock_signal.quantity,
-                order_type="LMT",
-                price=stock_signal.entry_price
-            )
-            
-            # Place entry order
-            if bot.place_order(contract, entry_order):
+            # Entry, stop loss and take profit go out as one linked bracket
+            entry, take_profit, stop = bot.place_bracket(stock_signal)
+            if entry.result(timeout=10).status != 'Rejected':
                 strategy.add_active_trade(stock_signal)
-                
-            # Create stop loss order
-            stop_order = bot.create_order(
-                action="SELL" if stock_signal.direction == "BUY" else "BUY",
-                quantity=stock_signal.quantity,
-                order_type="STP",
-                price=stock_signal.stop_loss
-            )
-            
-            # Place stop loss order
-            bot.place_order(contract, stop_order)
-            
-            # Create take profit order
-            take_profit_order = bot.create_order(
-                action="SELL" if stock_signal.direction == "BUY" else "BUY",
-                quantity=stock_signal.quantity,
-                order_type="LMT",
-                price=stock_signal.take_profit
-            )
-            
-            # Place take profit order
-            bot.place_order(contract, take_profit_order)
 
         # Example 2: Options trade
         next_friday = get_next_friday()
@@ -88,54 +56,16 @@ def main():
         )
         
         if option_signal:
-            # Create options contract
-            contract = bot.create_option_contract(
-                symbol=option_signal.symbol,
-                strike=option_signal.strike,
-                right=option_signal.option_type,
-                expiry=option_signal.expiry
-            )
-            
-            # Create entry order
-            entry_order = bot.create_order(
-                action=option_signal.direction,
-                quantity=option_signal.quantity,
-                order_type="LMT",
-                price=option_signal.entry_price
-            )
-            
-            # Place entry order
-            if bot.place_order(contract, entry_order):
+            entry, take_profit, stop = bot.place_bracket(option_signal)
+            if entry.result(timeout=10).status != 'Rejected':
                 strategy.add_active_trade(option_signal)
-                
-            # Create stop loss order
-            stop_order = bot.create_order(
-                action="SELL" if option_signal.direction == "BUY" else "BUY",
-                quantity=option_signal.quantity,
-                order_type="STP",
-                price=option_signal.stop_loss
-            )
-            
-            # Place stop loss order
-            bot.place_order(contract, stop_order)
-            
-            # Create take profit order
-            take_profit_order = bot.create_order(
-                action="SELL" if option_signal.direction == "BUY" else "BUY",
-                quantity=option_signal.quantity,
-                order_type="LMT",
-                price=option_signal.take_profit
-            )
-            
-            # Place take profit order
-            bot.place_order(contract, take_profit_order)
             
     except Exception as e:
         logger.error(f"Error in main loop: {e}")
         
     finally:
         # Disconnect from Interactive Brokers
-        bot.disconnect()
+        bot.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
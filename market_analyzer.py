@@ -1,9 +1,17 @@
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from dataclasses import dataclass, asdict
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from loguru import logger
+from config import (MARKET_DATA_HISTORY, MAX_ALERTS, ALERT_TTL_MINUTES, BAR_INTERVALS,
+                    ANALYSIS_BAR_INTERVAL, BAR_ALLOWED_LATENESS)
+from alert_store import AlertStore
+from bar_builder import Bar, BarBuilder
+from indicators import IndicatorEngine, IndicatorGraph
+from tick_archive import TickArchive
+from tick_store import TickStore, to_epoch_seconds
 
 @dataclass
 class MarketAlert:
@@ -14,109 +22,311 @@ class MarketAlert:
     priority: str  # 'high', 'medium', 'low'
     data: dict
 
+def _to_json(value):
+    """Convert indicator output to JSON-safe floats and lists, with NaN as None"""
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, (pd.Series, np.ndarray)):
+        return [None if np.isnan(x) else float(x) for x in np.asarray(value, dtype=np.float64)]
+    value = float(value)
+    return None if np.isnan(value) else value
+
+def _to_epoch_array(timestamps) -> np.ndarray:
+    """Convert datetimes, datetime64 values or numbers to float epoch seconds"""
+    values = np.asarray(timestamps)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64) / 1e9
+    if np.issubdtype(values.dtype, np.number):
+        return values.astype(np.float64)
+    return np.fromiter((to_epoch_seconds(ts) for ts in timestamps), dtype=np.float64, count=len(values))
+
+class _HistoryView(Mapping):
+    """Read-only mapping of symbol -> DataFrame snapshot of a TickStore row"""
+    def __init__(self, store: TickStore, field: str):
+        self._store = store
+        self._field = field
+
+    def __getitem__(self, symbol: str) -> pd.DataFrame:
+        row = self._store.rows[symbol]
+        # Copied: the store's views are overwritten once the ring wraps
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(self._store.timestamps(row), unit='s'),
+            self._field: self._store.window(row, self._field).copy()
+        })
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.symbols)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
 class MarketAnalyzer:
-    def __init__(self):
-        self.price_history: Dict[str, pd.DataFrame] = {}
-        self.volume_history: Dict[str, pd.DataFrame] = {}
-        self.alerts: List[MarketAlert] = []
+    def __init__(self, history_size: int = MARKET_DATA_HISTORY, max_alerts: int = MAX_ALERTS,
+                 alert_ttl: Optional[timedelta] = timedelta(minutes=ALERT_TTL_MINUTES) if ALERT_TTL_MINUTES else None,
+                 rsi_hysteresis: float = 5.0, band_hysteresis: float = 0.1, volume_hysteresis: float = 0.5,
+                 bar_intervals: Iterable[int] = BAR_INTERVALS, analysis_interval: int = ANALYSIS_BAR_INTERVAL,
+                 bar_lateness: float = BAR_ALLOWED_LATENESS, archive: Optional[TickArchive] = None):
+        # With an analysis interval, ticks are aggregated into bars and the history,
+        # indicators and alerts only advance when a bar of that interval closes.
+        # An interval of 0 analyzes every raw tick.
+        self.analysis_interval = analysis_interval
+        self.bar_builder = None
+        if analysis_interval:
+            self.bar_builder = BarBuilder(tuple(bar_intervals) + (analysis_interval,), allowed_lateness=bar_lateness)
+        # symbol -> interval -> most recent closed bar
+        self.last_bars: Dict[str, Dict[int, Bar]] = {}
+        # Called with each group of closed bars at the analysis interval
+        self.bar_listeners: List[Callable[[List[Bar]], None]] = []
+        self.store = TickStore(capacity=history_size)
+        self.price_history = _HistoryView(self.store, 'price')
+        self.volume_history = _HistoryView(self.store, 'volume')
+        self.engine = IndicatorEngine(self.store)
+        # Everything stored for analysis is also appended to the archive, if given
+        self.archive = archive
+        self.alerts = AlertStore(max_alerts=max_alerts, ttl=alert_ttl)
+        # Alert conditions fire when they start and end; exiting requires moving back
+        # past the entry threshold by these margins (RSI points, fraction of the band
+        # half-width, volume standard deviations)
+        self.rsi_hysteresis = rsi_hysteresis
+        self.band_hysteresis = band_hysteresis
+        self.volume_hysteresis = volume_hysteresis
+        self._condition_state: Dict[str, np.ndarray] = {}
+        # Full-series indicators for get_market_analysis, memoized per data version
+        self.graph = IndicatorGraph()
+        self.graph.register('prices', self._prices)
+        self.graph.register('volumes', self._volumes)
+        self.graph.register('ema_fast', lambda symbol, prices: prices.ewm(span=12, adjust=False).mean(), ['prices'])
+        self.graph.register('ema_slow', lambda symbol, prices: prices.ewm(span=26, adjust=False).mean(), ['prices'])
+        self.graph.register('macd_line', lambda symbol, fast, slow: fast - slow, ['ema_fast', 'ema_slow'])
+        self.graph.register('macd_signal', lambda symbol, macd: macd.ewm(span=9, adjust=False).mean(), ['macd_line'])
+        self.graph.register('sma', lambda symbol, prices: prices.rolling(window=20).mean(), ['prices'])
+        self.graph.register('rolling_std', lambda symbol, prices: prices.rolling(window=20).std(), ['prices'])
+        self.graph.register('rsi', self._calculate_rsi, ['prices'])
+        self.graph.register('macd', self._calculate_macd, ['macd_line', 'macd_signal'])
+        self.graph.register('bollinger_bands', self._calculate_bollinger_bands, ['sma', 'rolling_std'])
+        self.graph.register('volume_profile', self._calculate_volume_profile, ['volumes'])
         self.indicators = {
-            'rsi': self._calculate_rsi,
-            'macd': self._calculate_macd,
-            'bollinger_bands': self._calculate_bollinger_bands,
-            'volume_profile': self._calculate_volume_profile
+            name: partial(self.indicator, name=name)
+            for name in ('rsi', 'macd', 'bollinger_bands', 'volume_profile')
         }
         
     def update_market_data(self, symbol: str, price: float, volume: int, timestamp: datetime):
         """Update market data for a symbol"""
-        if symbol not in self.price_history:
-            self.price_history[symbol] = pd.DataFrame(columns=['timestamp', 'price'])
-            self.volume_history[symbol] = pd.DataFrame(columns=['timestamp', 'volume'])
+        if self.bar_builder is not None:
+            self._on_bars(self.bar_builder.add_tick(symbol, timestamp, price, volume))
+            return
+            
+        rows = np.array([self.store.row(symbol)])
+        self._apply(rows, np.array([to_epoch_seconds(timestamp)]), np.array([price]), np.array([volume]))
+        
+    def update_market_data_batch(self, symbols: Sequence[str], prices, volumes, timestamps):
+        """Update market data for many ticks at once.
+
+        Ticks are stored and analyzed vectorized across symbols. Repeated symbols are
+        split into successive waves so each symbol's ticks are still applied in order.
+        """
+        if len(symbols) == 0:
+            return
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        timestamps = _to_epoch_array(timestamps)
+        
+        if self.bar_builder is not None:
+            bars = []
+            for symbol, price, volume, timestamp in zip(symbols, prices, volumes, timestamps):
+                bars.extend(self.bar_builder.add_tick(symbol, timestamp, price, volume))
+            self._on_bars(bars)
+            return
             
-        self.price_history[symbol] = self.price_history[symbol].append({
-            'timestamp': timestamp,
-            'price': price
-        }, ignore_index=True)
+        self._ingest(self.store.rows_for(symbols), timestamps, prices, volumes)
         
-        self.volume_history[symbol] = self.volume_history[symbol].append({
-            'timestamp': timestamp,
-            'volume': volume
-        }, ignore_index=True)
+    def flush_bars(self, now: Optional[datetime] = None):
+        """Close and analyze bars whose interval has elapsed by clock time"""
+        if self.bar_builder is not None:
+            self._on_bars(self.bar_builder.flush(now))
+            
+    def _on_bars(self, bars: List[Bar]):
+        """Record closed bars and analyze those at the analysis interval"""
+        analysis_bars = []
+        for bar in bars:
+            self.last_bars.setdefault(bar.symbol, {})[bar.interval] = bar
+            if bar.interval == self.analysis_interval:
+                analysis_bars.append(bar)
+        if not analysis_bars:
+            return
+        for listener in self.bar_listeners:
+            listener(analysis_bars)
+            
+        self._ingest(
+            self.store.rows_for(bar.symbol for bar in analysis_bars),
+            np.array([bar.start for bar in analysis_bars]),
+            np.array([bar.close for bar in analysis_bars]),
+            np.array([bar.volume for bar in analysis_bars])
+        )
         
-        # Keep only last 1000 data points
-        self.price_history[symbol] = self.price_history[symbol].tail(1000)
-        self.volume_history[symbol] = self.volume_history[symbol].tail(1000)
+    def _ingest(self, rows: np.ndarray, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+        """Store and analyze data points, applying repeated symbols in order"""
+        # Occurrence rank of each tick within its symbol
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        group_start = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+        group_sizes = np.diff(np.r_[group_start, len(rows)])
+        rank = np.empty(len(rows), dtype=np.int64)
+        rank[order] = np.arange(len(rows)) - np.repeat(group_start, group_sizes)
         
+        if rank.max() == 0:
+            waves = [np.arange(len(rows))]
+        else:
+            by_rank = np.argsort(rank, kind='stable')
+            waves = np.split(by_rank, np.cumsum(np.bincount(rank))[:-1])
+        for wave in waves:
+            self._apply(rows[wave], timestamps[wave], prices[wave], volumes[wave])
+            
+    def _apply(self, rows: np.ndarray, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+        """Store, archive and analyze one data point for each of a set of distinct rows"""
+        self.engine.update(rows, timestamps, prices, volumes)
+        if self.archive is not None:
+            self.archive.append_many((self.store.symbols[row] for row in rows), timestamps, prices, volumes)
+            
         # Analyze new data
-        self._analyze_market_data(symbol)
+        self._analyze_market_data(rows)
+        
+    def warm_start(self) -> int:
+        """Reload recent history from the archive and rebuild indicator state.
+
+        Returns the number of symbols restored.
+        """
+        if self.archive is None:
+            return 0
+        rows = []
+        self.store.reserve(len(self.store) + len(self.archive.symbols))
+        for symbol in self.archive.symbols:
+            records = self.archive.read(symbol, self.store.capacity)
+            if len(records) == 0:
+                continue
+            row = self.store.row(symbol)
+            self.store.load(row, records['timestamp'], records['price'], records['volume'])
+            rows.append(row)
+        self.engine.rebuild(np.array(rows, dtype=np.int64))
+        logger.info(f"Restored market data for {len(rows)} symbols from {self.archive.directory}")
+        return len(rows)
         
-    def _analyze_market_data(self, symbol: str):
+    def _prices(self, symbol: str) -> pd.Series:
+        """Zero-copy price series for a symbol, valid for the current data version only"""
+        return pd.Series(self.store.prices(self.store.rows[symbol]), copy=False)
+        
+    def _volumes(self, symbol: str) -> pd.Series:
+        """Zero-copy volume series for a symbol, valid for the current data version only"""
+        return pd.Series(self.store.volumes(self.store.rows[symbol]), copy=False)
+        
+    def _analyze_market_data(self, rows: np.ndarray):
         """Analyze market data and generate alerts"""
-        if len(self.price_history[symbol]) < 20:  # Need minimum data points
+        rows = rows[self.store.counts(rows) >= 20]  # Need minimum data points
+        if len(rows) == 0:
             return
             
-        # Calculate technical indicators
-        indicators = {}
-        for name, func in self.indicators.items():
-            indicators[name] = func(symbol)
+        # Latest indicator values from the streaming engine
+        indicators = {
+            'rsi': self.engine.rsi(rows),
+            'macd': self.engine.macd(rows),
+            'volume_profile': self.engine.volume_profile(rows),
+            'bollinger_bands': self.engine.bollinger_bands(rows)
+        }
             
         # Check for potential alerts
-        self._check_rsi_alerts(symbol, indicators['rsi'])
-        self._check_macd_alerts(symbol, indicators['macd'])
-        self._check_volume_alerts(symbol, indicators['volume_profile'])
-        self._check_bollinger_alerts(symbol, indicators['bollinger_bands'])
+        self._check_rsi_alerts(rows, indicators['rsi'])
+        self._check_macd_alerts(rows, indicators['macd'])
+        self._check_volume_alerts(rows, indicators['volume_profile'])
+        self._check_bollinger_alerts(rows, indicators['bollinger_bands'])
         
-    def _calculate_rsi(self, symbol: str, period: int = 14) -> pd.Series:
+    def indicator(self, symbol: str, name: str):
+        """Full-series value of an indicator graph node, memoized until new data arrives"""
+        row = self.store.rows[symbol]
+        return self.graph.evaluate(symbol, int(self.store.versions[row]), name)
+        
+    def _calculate_rsi(self, symbol: str, prices: pd.Series, period: int = 14) -> pd.Series:
         """Calculate Relative Strength Index"""
-        prices = self.price_history[symbol]['price']
         delta = prices.diff()
         gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
         loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
         rs = gain / loss
         return 100 - (100 / (1 + rs))
         
-    def _calculate_macd(self, symbol: str) -> Dict[str, pd.Series]:
-        """Calculate MACD indicator"""
-        prices = self.price_history[symbol]['price']
-        exp1 = prices.ewm(span=12, adjust=False).mean()
-        exp2 = prices.ewm(span=26, adjust=False).mean()
-        macd = exp1 - exp2
-        signal = macd.ewm(span=9, adjust=False).mean()
+    def _calculate_macd(self, symbol: str, macd: pd.Series, signal: pd.Series) -> Dict[str, pd.Series]:
+        """Calculate MACD indicator from the MACD line and its signal EMA"""
         return {'macd': macd, 'signal': signal}
         
-    def _calculate_bollinger_bands(self, symbol: str, period: int = 20) -> Dict[str, pd.Series]:
-        """Calculate Bollinger Bands"""
-        prices = self.price_history[symbol]['price']
-        sma = prices.rolling(window=period).mean()
-        std = prices.rolling(window=period).std()
+    def _calculate_bollinger_bands(self, symbol: str, sma: pd.Series, std: pd.Series) -> Dict[str, pd.Series]:
+        """Calculate Bollinger Bands from the rolling mean and standard deviation"""
         upper_band = sma + (std * 2)
         lower_band = sma - (std * 2)
         return {'upper': upper_band, 'middle': sma, 'lower': lower_band}
         
-    def _calculate_volume_profile(self, symbol: str) -> Dict[str, float]:
+    def _calculate_volume_profile(self, symbol: str, volumes: pd.Series) -> Dict[str, float]:
         """Calculate volume profile metrics"""
-        volumes = self.volume_history[symbol]['volume']
         return {
             'average_volume': volumes.mean(),
             'volume_std': volumes.std(),
             'current_volume': volumes.iloc[-1]
         }
         
-    def _check_rsi_alerts(self, symbol: str, rsi: pd.Series):
-        """Check for RSI-based alerts"""
-        current_rsi = rsi.iloc[-1]
+    def _transitions(self, condition: str, rows: np.ndarray, enter_high: np.ndarray, exit_high: np.ndarray,
+                     enter_low: np.ndarray, exit_low: np.ndarray):
+        """Advance a per-symbol high/normal/low condition and return the indices that
+        started high, ended high, started low and ended low"""
+        state = self._condition_state.get(condition)
+        if state is None or len(state) < self.store.allocated_rows:
+            grown = np.zeros(self.store.allocated_rows, dtype=np.int8)
+            if state is not None:
+                grown[:len(state)] = state
+            state = self._condition_state[condition] = grown
+        current = state[rows]
+        high_end = (current == 1) & exit_high
+        low_end = (current == -1) & exit_low
+        high_start = (current != 1) & enter_high
+        low_start = (current != -1) & enter_low
+        current = np.where(high_end | low_end, 0, current)
+        current = np.where(high_start, 1, np.where(low_start, -1, current))
+        state[rows] = current
+        return (np.flatnonzero(high_start), np.flatnonzero(high_end),
+                np.flatnonzero(low_start), np.flatnonzero(low_end))
         
-        if current_rsi > 70:
-            self.alerts.append(MarketAlert(
-                symbol=symbol,
+    def _check_rsi_alerts(self, rows: np.ndarray, rsi: np.ndarray):
+        """Check for RSI-based alerts"""
+        overbought, overbought_end, oversold, oversold_end = self._transitions(
+            'rsi', rows, rsi > 70, rsi <= 70 - self.rsi_hysteresis, rsi < 30, rsi >= 30 + self.rsi_hysteresis)
+        for i in overbought_end:
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
+                alert_type='RSI Overbought Ended',
+                message=f'RSI ({rsi[i]:.2f}) no longer indicates overbought conditions',
+                timestamp=datetime.now(),
+                priority='low',
+                data={'rsi': float(rsi[i])}
+            ))
+        for i in oversold_end:
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
+                alert_type='RSI Oversold Ended',
+                message=f'RSI ({rsi[i]:.2f}) no longer indicates oversold conditions',
+                timestamp=datetime.now(),
+                priority='low',
+                data={'rsi': float(rsi[i])}
+            ))
+        for i in overbought:
+            current_rsi = float(rsi[i])
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
                 alert_type='RSI Overbought',
                 message=f'RSI ({current_rsi:.2f}) indicates overbought conditions',
                 timestamp=datetime.now(),
                 priority='medium',
                 data={'rsi': current_rsi}
             ))
-        elif current_rsi < 30:
-            self.alerts.append(MarketAlert(
-                symbol=symbol,
+        for i in oversold:
+            current_rsi = float(rsi[i])
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
                 alert_type='RSI Oversold',
                 message=f'RSI ({current_rsi:.2f}) indicates oversold conditions',
                 timestamp=datetime.now(),
@@ -124,97 +334,132 @@ class MarketAnalyzer:
                 data={'rsi': current_rsi}
             ))
             
-    def _check_macd_alerts(self, symbol: str, macd_data: Dict[str, pd.Series]):
+    def _check_macd_alerts(self, rows: np.ndarray, macd_data: Dict[str, np.ndarray]):
         """Check for MACD-based alerts"""
         macd = macd_data['macd']
         signal = macd_data['signal']
+        prev_macd = macd_data['prev_macd']
+        prev_signal = macd_data['prev_signal']
         
-        if macd.iloc[-1] > signal.iloc[-1] and macd.iloc[-2] <= signal.iloc[-2]:
-            self.alerts.append(MarketAlert(
-                symbol=symbol,
+        # Crossovers are already transitions, so they need no extra state
+        for i in np.flatnonzero((macd > signal) & (prev_macd <= prev_signal)):
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
                 alert_type='MACD Bullish Crossover',
                 message='MACD line crossed above signal line',
                 timestamp=datetime.now(),
                 priority='medium',
-                data={'macd': macd.iloc[-1], 'signal': signal.iloc[-1]}
+                data={'macd': float(macd[i]), 'signal': float(signal[i])}
             ))
-        elif macd.iloc[-1] < signal.iloc[-1] and macd.iloc[-2] >= signal.iloc[-2]:
-            self.alerts.append(MarketAlert(
-                symbol=symbol,
+        for i in np.flatnonzero((macd < signal) & (prev_macd >= prev_signal)):
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
                 alert_type='MACD Bearish Crossover',
                 message='MACD line crossed below signal line',
                 timestamp=datetime.now(),
                 priority='medium',
-                data={'macd': macd.iloc[-1], 'signal': signal.iloc[-1]}
+                data={'macd': float(macd[i]), 'signal': float(signal[i])}
             ))
             
-    def _check_volume_alerts(self, symbol: str, volume_profile: Dict[str, float]):
+    def _check_volume_alerts(self, rows: np.ndarray, volume_profile: Dict[str, np.ndarray]):
         """Check for volume-based alerts"""
         current_volume = volume_profile['current_volume']
         avg_volume = volume_profile['average_volume']
         volume_std = volume_profile['volume_std']
         
-        if current_volume > avg_volume + (2 * volume_std):
-            self.alerts.append(MarketAlert(
-                symbol=symbol,
+        never = np.zeros(len(rows), dtype=bool)
+        high, high_end, _, _ = self._transitions(
+            'volume', rows,
+            current_volume > avg_volume + (2 * volume_std),
+            current_volume <= avg_volume + ((2 - self.volume_hysteresis) * volume_std),
+            never, never)
+        for i in high_end:
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
+                alert_type='High Volume Ended',
+                message=f'Volume back to normal: {current_volume[i]:.0f} vs avg {avg_volume[i]:.0f}',
+                timestamp=datetime.now(),
+                priority='low',
+                data={name: float(values[i]) for name, values in volume_profile.items()}
+            ))
+        for i in high:
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
                 alert_type='High Volume',
-                message=f'Unusually high volume detected: {current_volume:.0f} vs avg {avg_volume:.0f}',
+                message=f'Unusually high volume detected: {current_volume[i]:.0f} vs avg {avg_volume[i]:.0f}',
                 timestamp=datetime.now(),
                 priority='high',
-                data=volume_profile
+                data={name: float(values[i]) for name, values in volume_profile.items()}
             ))
             
-    def _check_bollinger_alerts(self, symbol: str, bands: Dict[str, pd.Series]):
+    def _check_bollinger_alerts(self, rows: np.ndarray, bands: Dict[str, np.ndarray]):
         """Check for Bollinger Bands alerts"""
-        current_price = self.price_history[symbol]['price'].iloc[-1]
+        current_price = self.store.back(rows, 'price', 0)
+        margin = (bands['upper'] - bands['middle']) * self.band_hysteresis
         
-        if current_price > bands['upper'].iloc[-1]:
-            self.alerts.append(MarketAlert(
-                symbol=symbol,
+        above, above_end, below, below_end = self._transitions(
+            'bollinger', rows,
+            current_price > bands['upper'], current_price <= bands['upper'] - margin,
+            current_price < bands['lower'], current_price >= bands['lower'] + margin)
+        for i in above_end:
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
+                alert_type='Price Above Upper Band Ended',
+                message='Price moved back inside the Bollinger Bands',
+                timestamp=datetime.now(),
+                priority='low',
+                data={'price': float(current_price[i]), 'upper_band': float(bands['upper'][i])}
+            ))
+        for i in below_end:
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
+                alert_type='Price Below Lower Band Ended',
+                message='Price moved back inside the Bollinger Bands',
+                timestamp=datetime.now(),
+                priority='low',
+                data={'price': float(current_price[i]), 'lower_band': float(bands['lower'][i])}
+            ))
+        for i in above:
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
                 alert_type='Price Above Upper Band',
                 message='Price moved above upper Bollinger Band',
                 timestamp=datetime.now(),
                 priority='medium',
-                data={'price': current_price, 'upper_band': bands['upper'].iloc[-1]}
+                data={'price': float(current_price[i]), 'upper_band': float(bands['upper'][i])}
             ))
-        elif current_price < bands['lower'].iloc[-1]:
-            self.alerts.append(MarketAlert(
-                symbol=symbol,
+        for i in below:
+            self.alerts.add(MarketAlert(
+                symbol=self.store.symbols[rows[i]],
                 alert_type='Price Below Lower Band',
                 message='Price moved below lower Bollinger Band',
                 timestamp=datetime.now(),
                 priority='medium',
-                data={'price': current_price, 'lower_band': bands['lower'].iloc[-1]}
+                data={'price': float(current_price[i]), 'lower_band': float(bands['lower'][i])}
             ))
             
     def get_alerts(self, symbol: Optional[str] = None, priority: Optional[str] = None) -> List[MarketAlert]:
         """Get filtered alerts"""
-        filtered_alerts = self.alerts
-        
-        if symbol:
-            filtered_alerts = [alert for alert in filtered_alerts if alert.symbol == symbol]
-            
-        if priority:
-            filtered_alerts = [alert for alert in filtered_alerts if alert.priority == priority]
-            
-        return filtered_alerts
+        return self.alerts.query(symbol=symbol, priority=priority)
         
     def get_market_analysis(self, symbol: str) -> dict:
         """Get comprehensive market analysis for a symbol"""
-        if symbol not in self.price_history:
+        if symbol not in self.store:
             return {}
             
-        indicators = {}
-        for name, func in self.indicators.items():
-            indicators[name] = func(symbol)
+        indicators = {name: _to_json(func(symbol)) for name, func in self.indicators.items()}
             
+        row = self.store.rows[symbol]
+        current_price = self.store.last(row, 'price')
+        previous_price = self.store.last(row, 'price', 1) if self.store.count(row) > 1 else np.nan
         return {
-            'price_data': {
-                'current_price': self.price_history[symbol]['price'].iloc[-1],
-                'price_change': self.price_history[symbol]['price'].iloc[-1] - self.price_history[symbol]['price'].iloc[-2],
-                'price_change_percent': (self.price_history[symbol]['price'].iloc[-1] - self.price_history[symbol]['price'].iloc[-2]) / self.price_history[symbol]['price'].iloc[-2] * 100
-            },
-            'volume_data': self._calculate_volume_profile(symbol),
+            'price_data': _to_json({
+                'current_price': current_price,
+                'price_change': current_price - previous_price,
+                'price_change_percent': (current_price - previous_price) / previous_price * 100
+            }),
+            'volume_data': indicators['volume_profile'],
+            'bars': {interval: asdict(bar) for interval, bar in self.last_bars.get(symbol, {}).items()},
             'technical_indicators': indicators,
             'recent_alerts': self.get_alerts(symbol=symbol)
-        } 
\ No newline at end of file
+        }
@@ -0,0 +1,177 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+from ibapi.contract import Contract
+from ibapi.ticktype import TickTypeEnum
+from loguru import logger
+from order_scheduler import DATA
+
+LAST_PRICE_TICKS = {TickTypeEnum.LAST, TickTypeEnum.DELAYED_LAST}
+LAST_SIZE_TICKS = {TickTypeEnum.LAST_SIZE, TickTypeEnum.DELAYED_LAST_SIZE}
+
+class MarketDataManager:
+    """Streaming market data subscriptions for a TradingBot.
+
+    Subscriptions are reqMktData lines, limited to `max_lines` (the account's
+    market data line budget); subscribing past the budget cancels the least
+    recently used symbol, where a symbol is used when it is subscribed again or
+    one of its trades arrives. Trades (last price followed by last size) are
+    conflated per symbol on the IB reader thread: the pending tick keeps the
+    latest price and time and the summed size, so the pending set never exceeds
+    one entry per subscribed symbol and the reader never blocks. A consumer
+    thread drains it every `batch_interval` seconds and passes the batch to each
+    listener as (symbols, prices, volumes, timestamps), e.g.
+    MarketAnalyzer.update_market_data_batch.
+    """
+
+    def __init__(self, bot, max_lines: int = 100, batch_interval: float = 0.25):
+        self.bot = bot
+        self.max_lines = max_lines
+        self.batch_interval = batch_interval
+        self.listeners: List[Callable[[List[str], List[float], List[float], List[datetime]], None]] = []
+        self.ticks_received = 0
+        self.ticks_conflated = 0  # Ticks merged into a pending tick of the same symbol
+        self.batches = 0
+        self.evictions = 0
+        self.subscriptions: 'OrderedDict[str, Tuple[int, Contract]]' = OrderedDict()  # Least recently subscribed or traded first
+        self._symbols: Dict[int, str] = {}  # Request ID -> symbol
+        self._last_price: Dict[int, float] = {}
+        self._pending: Dict[str, List] = {}  # Symbol -> [price, volume, timestamp]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def subscribe(self, contract: Contract) -> int:
+        """Stream a contract's trades and return the request ID (existing lines are reused)"""
+        with self._lock:
+            subscription = self.subscriptions.get(contract.symbol)
+            if subscription is not None:
+                self.subscriptions.move_to_end(contract.symbol)
+                return subscription[0]
+            evicted = []
+            while len(self.subscriptions) >= self.max_lines:
+                evicted.append(self._remove(next(iter(self.subscriptions))))
+            request_id = next(self.bot._request_ids)
+            self.subscriptions[contract.symbol] = (request_id, contract)
+            self._symbols[request_id] = contract.symbol
+        for old_id in evicted:
+            self.evictions += 1
+            self.bot.scheduler.submit(lambda old_id=old_id: self.bot.cancelMktData(old_id), DATA)
+        self.bot.scheduler.submit(lambda: self.bot.reqMktData(request_id, contract, '', False, False, []), DATA)
+        return request_id
+
+    def _remove(self, symbol: str) -> int:
+        request_id, _ = self.subscriptions.pop(symbol)
+        self._symbols.pop(request_id, None)
+        self._last_price.pop(request_id, None)
+        return request_id
+
+    def unsubscribe(self, symbol: str):
+        """Cancel a symbol's market data line"""
+        with self._lock:
+            if symbol not in self.subscriptions:
+                return
+            request_id = self._remove(symbol)
+        self.bot.scheduler.submit(lambda: self.bot.cancelMktData(request_id), DATA)
+
+    def resubscribe(self) -> int:
+        """Re-request every line after a reconnect, queued in one burst; returns the count"""
+        with self._lock:
+            subscriptions = list(self.subscriptions.values())
+            self._last_price.clear()
+        for request_id, contract in subscriptions:
+            self.bot.scheduler.submit(
+                lambda request_id=request_id, contract=contract: self.bot.reqMktData(request_id, contract, '', False,
+                                                                                     False, []), DATA)
+        return len(subscriptions)
+
+    def owns(self, request_id: int) -> bool:
+        return request_id in self._symbols
+
+    def on_error(self, request_id: int, error_code: int):
+        """Drop a subscription IB refused"""
+        with self._lock:
+            symbol = self._symbols.get(request_id)
+            if symbol is not None:
+                self._remove(symbol)
+        logger.warning(f"Market data for {symbol} stopped (error {error_code})")
+
+    def on_tick_price(self, request_id: int, tick_type: int, price: float):
+        if tick_type in LAST_PRICE_TICKS and price > 0:
+            self._last_price[request_id] = price
+
+    def on_tick_size(self, request_id: int, tick_type: int, size: float):
+        """Queue a trade once its size arrives after the last price"""
+        if tick_type not in LAST_SIZE_TICKS:
+            return
+        price = self._last_price.get(request_id)
+        symbol = self._symbols.get(request_id)
+        if price is None or symbol is None:
+            return
+        now = datetime.now()
+        with self._lock:
+            self.ticks_received += 1
+            if symbol in self.subscriptions:
+                self.subscriptions.move_to_end(symbol)
+            pending = self._pending.get(symbol)
+            if pending is None:
+                self._pending[symbol] = [price, float(size), now]
+            else:
+                self.ticks_conflated += 1
+                pending[0] = price
+                pending[1] += float(size)
+                pending[2] = now
+
+    def drain(self) -> int:
+        """Pass pending ticks to the listeners as one batch and return its size"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        symbols = list(pending)
+        prices, volumes, timestamps = (list(column) for column in zip(*pending.values()))
+        self.batches += 1
+        for listener in self.listeners:
+            try:
+                listener(symbols, prices, volumes, timestamps)
+            except Exception as e:
+                logger.error(f"Error in market data listener: {e}")
+        return len(symbols)
+
+    def _loop(self):
+        while self._running:
+            started = time.monotonic()
+            self.drain()
+            self._wake.wait(max(self.batch_interval - (time.monotonic() - started), 0.0))
+
+    def start(self):
+        """Start the consumer thread"""
+        if self._running:
+            return
+        self._running = True
+        self._wake.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the consumer thread after a final drain"""
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.drain()
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            'subscriptions': len(self.subscriptions),
+            'max_lines': self.max_lines,
+            'pending_symbols': len(self._pending),
+            'ticks_received': self.ticks_received,
+            'ticks_conflated': self.ticks_conflated,
+            'batches': self.batches,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,175 @@
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import heapq
+import itertools
+import threading
+import time
+import numpy as np
+from loguru import logger
+
+# Lower values are sent first
+CANCEL = 0
+STOP = 1
+ORDER = 2
+DATA = 3
+
+class OrderScheduler:
+    """Token-bucket paced outbound queue for IB API messages.
+
+    TWS allows about 50 messages per second per client. Sends are queued with a
+    priority (cancels, then stops, then new orders, then data requests; FIFO
+    within a priority) and a cost in messages, and a sender thread flushes as many
+    as the bucket allows in one batch whenever tokens are available. The bucket
+    refills at `rate` tokens per second up to `burst`, so no one-second window
+    carries more than rate + burst messages.
+
+    Until `start` is called (and after `stop`) sends run immediately on the
+    calling thread, which is what in-process simulations want. `pause` holds
+    the queue while the connection is down; `start` resumes it. On `stop`,
+    queued cancels and stops are still sent (within the rate) unless paused, and
+    every other queued send has its `on_drop` callback called instead.
+    """
+
+    def __init__(self, rate: float = 45.0, burst: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = self.burst
+        self.sent_messages = 0
+        self.batches = 0
+        self.throttled = 0  # Times the queue had to wait for tokens
+        self.max_queue_depth = 0
+        self.wait_times: Deque[float] = deque(maxlen=1000)  # Seconds from submit to send
+        self._queue: List[Tuple[int, int, float, float, Callable[[], None], Optional[Callable[[], None]]]] = []
+        self._sequence = itertools.count()
+        self._refilled_at = clock()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._paused = False
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def submit(self, send: Callable[[], None], priority: int = ORDER, cost: int = 1,
+               on_drop: Optional[Callable[[], None]] = None):
+        """Queue a send of `cost` messages (or run it now if the scheduler is not running).
+
+        `on_drop` is called instead of `send` if the scheduler stops before sending it.
+        """
+        if not self._running:
+            self._run([(priority, 0, self.clock(), float(cost), send, on_drop)])
+            return
+        with self._condition:
+            heapq.heappush(self._queue, (priority, next(self._sequence), self.clock(), float(cost), send, on_drop))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._condition.notify()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _take_batch(self) -> List[tuple]:
+        """Pop every queued send the bucket can pay for, in priority order"""
+        self._refill(self.clock())
+        batch = []
+        # A send costing more than the burst goes out once the bucket is full
+        while self._queue and self.tokens >= min(self._queue[0][3], self.burst):
+            item = heapq.heappop(self._queue)
+            self.tokens -= item[3]
+            batch.append(item)
+        return batch
+
+    def _run(self, batch):
+        now = self.clock()
+        for _, _, submitted_at, cost, send, _ in batch:
+            self.wait_times.append(now - submitted_at)
+            self.sent_messages += int(cost)
+            try:
+                send()
+            except Exception as e:
+                logger.error(f"Error sending queued IB message: {e}")
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while self._running and (self._paused or not self._queue):
+                    self._condition.wait()
+                if not self._running:
+                    return
+                batch = self._take_batch()
+                if not batch:
+                    self.throttled += 1
+                    self._condition.wait((min(self._queue[0][3], self.burst) - self.tokens) / self.rate)
+                    continue
+            self.batches += 1
+            self._run(batch)
+
+    def start(self):
+        """Start the sender thread, or resume it after `pause`"""
+        with self._condition:
+            self._paused = False
+            self._condition.notify()
+        if self._running:
+            return
+        self._running = True
+        self._refilled_at = self.clock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def pause(self):
+        """Keep queueing sends but hold them until `start`"""
+        with self._condition:
+            self._paused = True
+
+    def stop(self, flush_priority: Optional[int] = STOP):
+        """Stop the sender thread.
+
+        Queued sends at `flush_priority` or more urgent (cancels and stops by
+        default) are sent first, paced, unless the scheduler is paused; the rest
+        are dropped and their `on_drop` callbacks called.
+        """
+        with self._condition:
+            self._running = False
+            queued = sorted(self._queue)
+            self._queue.clear()
+            paused = self._paused
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        flush = [item for item in queued
+                 if not paused and flush_priority is not None and item[0] <= flush_priority]
+        for item in flush:
+            self._refill(self.clock())
+            if self.tokens < min(item[3], self.burst):
+                time.sleep((min(item[3], self.burst) - self.tokens) / self.rate)
+                self._refill(self.clock())
+            self.tokens -= item[3]
+            self._run([item])
+        flushed = {item[1] for item in flush}
+        dropped = [item for item in queued if item[1] not in flushed]
+        for item in dropped:
+            if item[5] is not None:
+                try:
+                    item[5]()
+                except Exception as e:
+                    logger.error(f"Error in dropped IB message callback: {e}")
+        if queued:
+            logger.warning(f"Scheduler stopped: flushed {len(flush)} and dropped {len(dropped)} queued IB messages")
+
+    def metrics(self) -> Dict[str, float]:
+        """Queue depth, throughput and wait-time statistics"""
+        waits = np.array(self.wait_times) * 1000
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'sent_messages': self.sent_messages,
+            'batches': self.batches,
+            'throttled': self.throttled,
+            'tokens': self.tokens,
+            'wait_p50_ms': float(np.percentile(waits, 50)) if len(waits) else 0.0,
+            'wait_p99_ms': float(np.percentile(waits, 99)) if len(waits) else 0.0
+        }
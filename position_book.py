@@ -0,0 +1,90 @@
+from typing import Any, Dict, List
+import numpy as np
+from greeks import RIGHTS, expiry_date, expiry_time
+
+class PositionBook:
+    """Columnar position storage: one NumPy array per PositionRisk field.
+
+    Rows are packed at the front of every column and `index` maps symbols to rows.
+    Removing a position moves the last row into its slot (swap-delete), so columns
+    never have holes and whole-book calculations run on `column(name)` views.
+    Option contracts are stored numerically: `expiry` as an expiry_time timestamp
+    and `right` as +1 (call), -1 (put) or 0, with zeros for missing details.
+    """
+
+    FIELDS = ('position_size', 'entry_price', 'current_price', 'stop_loss', 'take_profit',
+              'quantity', 'delta', 'gamma', 'vega', 'theta', 'implied_vol', 'underlying_price', 'multiplier')
+    COLUMNS = FIELDS + ('strike', 'expiry', 'right')
+
+    def __init__(self, capacity: int = 64):
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        # Full-capacity arrays; only the first len(self) rows are positions
+        self.columns = {name: np.zeros(capacity) for name in self.COLUMNS}
+        self._is_option = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self.index
+
+    def record(self, symbol: str) -> Dict[str, Any]:
+        """All fields of one position, keyed like PositionRisk"""
+        row = self.index[symbol]
+        values: Dict[str, Any] = {name: float(self.columns[name][row]) for name in self.FIELDS}
+        values['quantity'] = int(values['quantity'])
+        values['is_option'] = bool(self._is_option[row])
+        strike, expiry, right = (float(self.columns[name][row]) for name in ('strike', 'expiry', 'right'))
+        values['strike'] = strike or None
+        values['expiry'] = expiry_date(expiry) if expiry else None
+        values['option_type'] = 'C' if right > 0 else 'P' if right < 0 else None
+        return values
+
+    def _grow(self):
+        size = 2 * len(self._is_option)
+        for name, column in self.columns.items():
+            self.columns[name] = np.concatenate([column, np.zeros(size - len(column))])
+        self._is_option = np.concatenate([self._is_option, np.zeros(size - len(self._is_option), dtype=bool)])
+
+    def add(self, position) -> int:
+        """Insert or replace a position and return its row"""
+        row = self.index.get(position.symbol)
+        if row is None:
+            if len(self.symbols) == len(self._is_option):
+                self._grow()
+            row = self.index[position.symbol] = len(self.symbols)
+            self.symbols.append(position.symbol)
+        columns = self.columns
+        for name in self.FIELDS:
+            columns[name][row] = getattr(position, name)
+        columns['strike'][row] = position.strike or 0.0
+        columns['expiry'][row] = expiry_time(position.expiry) if position.expiry else 0.0
+        columns['right'][row] = RIGHTS.get((position.option_type or '').upper(), 0.0)
+        self._is_option[row] = position.is_option
+        return row
+
+    def remove(self, symbol: str) -> bool:
+        """Remove a position by moving the last row into its slot"""
+        row = self.index.pop(symbol, None)
+        if row is None:
+            return False
+        last = len(self.symbols) - 1
+        moved = self.symbols.pop()
+        if row != last:
+            self.symbols[row] = moved
+            self.index[moved] = row
+            for column in self.columns.values():
+                column[row] = column[last]
+            self._is_option[row] = self._is_option[last]
+        return True
+
+    def column(self, name: str) -> np.ndarray:
+        """View of one field for every position, in row order"""
+        if name == 'is_option':
+            return self._is_option[:len(self.symbols)]
+        return self.columns[name][:len(self.symbols)]
+
+    def rows(self, symbols) -> np.ndarray:
+        """Rows for symbols (all must be held)"""
+        return np.fromiter((self.index[symbol] for symbol in symbols), dtype=np.int64)
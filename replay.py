@@ -0,0 +1,367 @@
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from loguru import logger
+from ibapi.contract import Contract, ContractDetails
+from ibapi.order import Order
+from config import MAX_POSITION_SIZE
+from contract_cache import ContractCache
+from market_analyzer import MarketAnalyzer, MarketAlert, _to_epoch_array
+from risk_manager import RiskManager, PositionRisk
+from strategy import TradingStrategy, TradeSignal
+from trading_bot import TradingBot
+
+def load_market_data(path: Union[str, Path]) -> pd.DataFrame:
+    """Load ticks or bars from a CSV or Parquet file, sorted by time.
+
+    Ticks need `symbol`, `timestamp`, `price` and `volume` columns. Bars may give
+    `close` instead of `price`; the close is replayed as the bar's price.
+    """
+    path = Path(path)
+    if path.suffix in ('.parquet', '.pq'):
+        data = pd.read_parquet(path)
+    else:
+        data = pd.read_csv(path)
+    if 'price' not in data.columns and 'close' in data.columns:
+        data = data.rename(columns={'close': 'price'})
+    missing = {'symbol', 'timestamp', 'price', 'volume'} - set(data.columns)
+    if missing:
+        raise ValueError(f"Market data file {path} is missing columns: {sorted(missing)}")
+    if not pd.api.types.is_numeric_dtype(data['timestamp']):
+        data['timestamp'] = pd.to_datetime(data['timestamp'])
+    return data.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+@dataclass
+class SimulatedFill:
+    order_id: int
+    symbol: str
+    action: str
+    quantity: float
+    price: float
+    timestamp: float
+
+class SimulatedTradingBot(TradingBot):
+    """TradingBot whose orders fill in-process against each replayed batch's low, high and last price"""
+
+    def __init__(self, slippage: float = 0.0):
+        super().__init__(contract_cache=ContractCache())
+        self.connected = True
+        self.next_order_id = 1
+        self.slippage = slippage
+        self.open_orders: Dict[int, Tuple[Contract, Order]] = {}
+        self.fills: List[SimulatedFill] = []
+        # Called with every fill
+        self.listeners: List[Callable[[SimulatedFill], None]] = []
+
+    def connect_to_ib(self):
+        return True
+
+    def close(self):
+        self.connected = False
+
+    def placeOrder(self, orderId: int, contract: Contract, order: Order):
+        self.open_orders[orderId] = (contract, order)
+        self.orderStatus(orderId, 'Submitted', 0, order.totalQuantity, 0, 0, 0, 0, 0, '', 0)
+
+    def reqContractDetails(self, reqId: int, contract: Contract):
+        details = ContractDetails()
+        details.contract = contract
+        details.contract.conId = len(self.contract_cache) + 1
+        self.contractDetails(reqId, details)
+        self.contractDetailsEnd(reqId)
+
+    def cancelOrder(self, orderId: int, *args):
+        if self.open_orders.pop(orderId, None) is not None:
+            self.orderStatus(orderId, 'Cancelled', 0, 0, 0, 0, 0, 0, 0, '', 0)
+
+    def process_prices(self, index: Dict[str, int], low: np.ndarray, high: np.ndarray,
+                       last: np.ndarray, timestamp: float) -> List[SimulatedFill]:
+        """Fill open orders whose symbols traded in a batch"""
+        fills = []
+        for order_id, (contract, order) in list(self.open_orders.items()):
+            i = index.get(contract.symbol)
+            if i is None or order_id not in self.open_orders:
+                continue
+            buy = order.action == 'BUY'
+            if order.orderType == 'MKT':
+                price = last[i]
+            elif order.orderType == 'STP':
+                stop = order.auxPrice
+                if (high[i] if buy else -low[i]) < (stop if buy else -stop):
+                    continue
+                price = stop + (self.slippage if buy else -self.slippage)
+            else:
+                if (low[i] if buy else -high[i]) > (order.lmtPrice if buy else -order.lmtPrice):
+                    continue
+                price = order.lmtPrice
+            del self.open_orders[order_id]
+            fill = SimulatedFill(order_id, contract.symbol, order.action, float(order.totalQuantity),
+                                 float(price), timestamp)
+            self.fills.append(fill)
+            fills.append(fill)
+            self.orderStatus(order_id, 'Filled', fill.quantity, 0, fill.price, 0, 0, fill.price, 0, '', 0)
+            for listener in self.listeners:
+                listener(fill)
+        return fills
+
+def alert_signal(alert: MarketAlert, price: float) -> Optional[dict]:
+    """Default rule: buy RSI oversold and sell RSI overbought with a 1% stop and 3% target"""
+    if alert.alert_type == 'RSI Oversold':
+        direction, sign = 'BUY', 1
+    elif alert.alert_type == 'RSI Overbought':
+        direction, sign = 'SELL', -1
+    else:
+        return None
+    quantity = int(MAX_POSITION_SIZE // price)
+    if quantity < 1:
+        return None
+    return {
+        'symbol': alert.symbol,
+        'entry_price': price,
+        'stop_loss': price * (1 - 0.01 * sign),
+        'take_profit': price * (1 + 0.03 * sign),
+        'quantity': quantity,
+        'direction': direction
+    }
+
+@dataclass
+class _Trade:
+    signal: TradeSignal
+    entry_id: int
+    exit_ids: List[int] = field(default_factory=list)
+    fill_price: float = 0.0
+
+@dataclass
+class ReplayReport:
+    ticks: int
+    batches: int
+    elapsed: float
+    ticks_per_second: float
+    stage_latency: Dict[str, Dict[str, float]]  # Milliseconds per batch
+    alerts: int
+    signals: int
+    orders: int
+    fills: int
+    closed_trades: int
+    realized_pnl: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+class ReplayEngine:
+    """Replays historical market data through the live trading components.
+
+    Data is fed to MarketAnalyzer in batches at full speed. New alerts become trade
+    signals through `signal_rule`, are validated by TradingStrategy and
+    RiskManager, and are placed through a SimulatedTradingBot. Filled entries get a
+    stop and a target; whichever fills first cancels the other and closes the
+    position. Held positions are repriced after every batch. The wall-clock time of
+    each stage is recorded per batch.
+    """
+
+    STAGES = ('analyzer', 'fills', 'risk', 'signals')
+
+    def __init__(self, analyzer: Optional[MarketAnalyzer] = None, strategy: Optional[TradingStrategy] = None,
+                 risk_manager: Optional[RiskManager] = None, bot: Optional[SimulatedTradingBot] = None,
+                 signal_rule: Callable[[MarketAlert, float], Optional[dict]] = alert_signal,
+                 initial_capital: float = 100000.0, batch_size: int = 1000):
+        self.analyzer = analyzer or MarketAnalyzer()
+        self.strategy = strategy or TradingStrategy()
+        self.risk_manager = risk_manager or RiskManager()
+        self.bot = bot or SimulatedTradingBot()
+        self.signal_rule = signal_rule
+        self.batch_size = batch_size
+        self.capital = initial_capital
+        self.risk_manager.portfolio_value = initial_capital
+        self.realized_pnl = 0.0
+        self.closed_trades = 0
+        self.signals = 0
+        self.orders = 0
+        self._trades: Dict[str, _Trade] = {}
+        self._orders: Dict[int, str] = {}  # Order id -> symbol of its trade
+        self._new_alerts: List[MarketAlert] = []
+        self._alert_count = 0
+        self._last_price: Dict[str, float] = {}
+        self._timestamp = 0.0
+        self.analyzer.alerts.listeners.append(self._new_alerts.append)
+        self.bot.listeners.append(self._on_fill)
+
+    def _place(self, signal: TradeSignal, action: str, order_type: str, price: float) -> Optional[int]:
+        """Place an order and return its id"""
+        order_id = self.bot.next_order_id
+        contract = self.bot.create_stock_contract(symbol=signal.symbol)
+        order = self.bot.create_order(action=action, quantity=signal.quantity, order_type=order_type, price=price)
+        if not self.bot.place_order(contract, order):
+            return None
+        self.orders += 1
+        self._orders[order_id] = signal.symbol
+        return order_id
+
+    def _on_signal(self, alert: MarketAlert):
+        price = self._last_price.get(alert.symbol)
+        if price is None or alert.symbol in self._trades:
+            return
+        params = self.signal_rule(alert, price)
+        if params is None:
+            return
+        signal = self.strategy.generate_signal(**params)
+        if signal is None:
+            return
+        self.signals += 1
+        candidate = PositionRisk(
+            symbol=signal.symbol,
+            position_size=signal.quantity * signal.entry_price,
+            entry_price=signal.entry_price,
+            current_price=price,
+            stop_loss=signal.stop_loss,
+            take_profit=signal.take_profit,
+            quantity=signal.quantity,
+            is_option=signal.is_option
+        )
+        if not self.risk_manager.check_position_risk(candidate):
+            return
+        entry_id = self._place(signal, signal.direction, 'LMT', signal.entry_price)
+        if entry_id is not None:
+            self._trades[signal.symbol] = _Trade(signal, entry_id)
+            self.strategy.add_active_trade(signal)
+
+    def _on_fill(self, fill: SimulatedFill):
+        symbol = self._orders.pop(fill.order_id, None)
+        trade = self._trades.get(symbol)
+        if trade is None:
+            return
+        signal = trade.signal
+        if fill.order_id == trade.entry_id:
+            trade.fill_price = fill.price
+            self.risk_manager.add_position(PositionRisk(
+                symbol=symbol,
+                position_size=signal.quantity * fill.price,
+                entry_price=fill.price,
+                current_price=fill.price,
+                stop_loss=signal.stop_loss,
+                take_profit=signal.take_profit,
+                quantity=signal.quantity,
+                is_option=signal.is_option
+            ))
+            exit_action = 'SELL' if signal.direction == 'BUY' else 'BUY'
+            trade.exit_ids = [order_id for order_id in (
+                self._place(signal, exit_action, 'STP', signal.stop_loss),
+                self._place(signal, exit_action, 'LMT', signal.take_profit)
+            ) if order_id is not None]
+            return
+
+        # An exit filled: cancel the other leg and close the position
+        for order_id in trade.exit_ids:
+            if order_id != fill.order_id:
+                self.bot.cancel_order(order_id)
+                self._orders.pop(order_id, None)
+        sign = 1 if signal.direction == 'BUY' else -1
+        pnl = sign * (fill.price - trade.fill_price) * fill.quantity
+        self.realized_pnl += pnl
+        self.capital += pnl
+        self.risk_manager.portfolio_value = self.capital
+        self.closed_trades += 1
+        del self._trades[symbol]
+        self.strategy.remove_active_trade(symbol)
+        self.risk_manager.remove_position(symbol)
+
+    def run(self, data: Union[str, Path, pd.DataFrame]) -> ReplayReport:
+        """Replay a file or DataFrame of market data and report throughput"""
+        if not isinstance(data, pd.DataFrame):
+            data = load_market_data(data)
+        symbols = data['symbol'].to_numpy(dtype=object)
+        prices = data['price'].to_numpy(dtype=np.float64)
+        volumes = data['volume'].to_numpy(dtype=np.float64)
+        timestamps = _to_epoch_array(data['timestamp'].to_numpy())
+
+        stage_times: Dict[str, List[float]] = {stage: [] for stage in self.STAGES}
+        started = time.perf_counter()
+        batches = 0
+        for first in range(0, len(data), self.batch_size):
+            batch = slice(first, first + self.batch_size)
+            batch_symbols, batch_prices = symbols[batch], prices[batch]
+            self._timestamp = float(timestamps[batch][-1])
+
+            t0 = time.perf_counter()
+            self.analyzer.update_market_data_batch(batch_symbols, batch_prices, volumes[batch], timestamps[batch])
+
+            t1 = time.perf_counter()
+            index: Dict[str, int] = {}
+            ids = np.fromiter((index.setdefault(symbol, len(index)) for symbol in batch_symbols),
+                              dtype=np.int64, count=len(batch_symbols))
+            low = np.full(len(index), np.inf)
+            high = np.full(len(index), -np.inf)
+            last_position = np.zeros(len(index), dtype=np.int64)
+            np.minimum.at(low, ids, batch_prices)
+            np.maximum.at(high, ids, batch_prices)
+            np.maximum.at(last_position, ids, np.arange(len(ids)))
+            last = batch_prices[last_position]
+            self._last_price.update(zip(index, last.tolist()))
+            if self.bot.open_orders:
+                self.bot.process_prices(index, low, high, last, self._timestamp)
+
+            t2 = time.perf_counter()
+            if len(self.risk_manager.positions):
+                self.risk_manager.update_prices(list(index), last)
+
+            t3 = time.perf_counter()
+            alerts, self._new_alerts[:] = list(self._new_alerts), []
+            self._alert_count += len(alerts)
+            for alert in alerts:
+                self._on_signal(alert)
+            t4 = time.perf_counter()
+
+            for stage, elapsed in zip(self.STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                stage_times[stage].append(elapsed)
+            batches += 1
+
+        # Close the last bars so their data is analyzed too
+        if len(data):
+            self.analyzer.flush_bars(float(timestamps[-1]) + self.analyzer.analysis_interval + 1)
+        elapsed = time.perf_counter() - started
+
+        stage_latency = {}
+        for stage, times in stage_times.items():
+            ms = np.array(times) * 1000 if times else np.zeros(1)
+            stage_latency[stage] = {
+                'mean_ms': float(ms.mean()),
+                'p50_ms': float(np.percentile(ms, 50)),
+                'p99_ms': float(np.percentile(ms, 99)),
+                'max_ms': float(ms.max())
+            }
+        report = ReplayReport(
+            ticks=len(data),
+            batches=batches,
+            elapsed=elapsed,
+            ticks_per_second=len(data) / elapsed if elapsed > 0 else 0.0,
+            stage_latency=stage_latency,
+            alerts=self._alert_count,
+            signals=self.signals,
+            orders=self.orders,
+            fills=len(self.bot.fills),
+            closed_trades=self.closed_trades,
+            realized_pnl=self.realized_pnl
+        )
+        logger.info(f"Replayed {report.ticks} ticks in {elapsed:.2f}s ({report.ticks_per_second:,.0f} ticks/s)")
+        return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay historical market data through the trading components")
+    parser.add_argument('path', help="CSV or Parquet file of ticks or bars")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--capital', type=float, default=100000.0)
+    parser.add_argument('--analysis-interval', type=int, default=None,
+                        help="Bar size to analyze in seconds, 0 to analyze every row (default from config)")
+    args = parser.parse_args()
+
+    analyzer = MarketAnalyzer() if args.analysis_interval is None else MarketAnalyzer(analysis_interval=args.analysis_interval)
+    engine = ReplayEngine(analyzer=analyzer, initial_capital=args.capital, batch_size=args.batch_size)
+    print(json.dumps(engine.run(args.path).to_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
+from bisect import bisect_left, insort
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+import math
+import time
 import numpy as np
 from loguru import logger
 from datetime import datetime, timedelta
+from bar_builder import Bar
+from greeks import GreeksEngine
+from position_book import PositionBook
+from var_engine import VaREngine
 
 @dataclass
 class PositionRisk:
@@ -15,14 +22,184 @@ class PositionRisk:
     quantity: int
     is_option: bool
     delta: float = 1.0  # For options, represents the delta
+    gamma: float = 0.0  # For options, represents the gamma
     vega: float = 0.0   # For options, represents the vega
     theta: float = 0.0  # For options, represents the theta
+    # Option contract; with an underlying price the Greeks above are computed
+    strike: Optional[float] = None
+    expiry: Optional[str] = None       # YYYYMMDD
+    option_type: Optional[str] = None  # 'C' or 'P'
+    implied_vol: float = 0.0           # Solved from current_price when 0
+    underlying_price: float = 0.0
+    multiplier: float = 100.0          # Units of the underlying per option contract
+
+@dataclass
+class RiskVerdict:
+    symbol: str
+    accepted: bool
+    risk_amount: float
+    reason: str  # 'accepted', 'position risk exceeds limit' or 'portfolio risk limit reached'
+
+class _PositionsView(Mapping):
+    """Read-only mapping of symbol -> PositionRisk snapshot backed by a PositionBook"""
+    def __init__(self, book: PositionBook):
+        self._book = book
+
+    def __getitem__(self, symbol: str) -> PositionRisk:
+        return PositionRisk(symbol=symbol, **self._book.record(symbol))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._book.symbols)
+
+    def __len__(self) -> int:
+        return len(self._book)
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self._book
+
+class _OrderStatistics:
+    """Multiset of floats with O(log n) insert, delete and k-th smallest lookup.
+
+    Values are bucketed at a fixed width over [low, high), with one overflow
+    bucket at each end. A Fenwick tree of bucket counts locates the bucket
+    holding the k-th value in O(log buckets), and each bucket keeps its own
+    values sorted so lookups stay exact; buckets hold few values unless many
+    positions share a return to within `width`.
+    """
+    def __init__(self, low: float = -1.0, high: float = 3.0, width: float = 2e-3):
+        self.low = low
+        self.high = high
+        self.width = width
+        self.buckets = int(round((high - low) / width)) + 2  # First and last are the overflow buckets
+        # Tree size padded to a power of two so the descent in kth needs no bounds check
+        self._capacity = 1 << (self.buckets - 1).bit_length()
+        self.clear()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self):
+        self._tree = [0] * (self._capacity + 1)
+        self._values: Dict[int, List[float]] = {}
+        self._size = 0
+
+    def _bucket(self, value: float) -> int:
+        if value < self.low:
+            return 0
+        if not value < self.high:
+            return self.buckets - 1
+        return min(int((value - self.low) / self.width) + 1, self.buckets - 2)
+
+    def _adjust(self, bucket: int, delta: int):
+        tree = self._tree
+        i = bucket + 1
+        while i <= self._capacity:
+            tree[i] += delta
+            i += i & -i
+
+    def add(self, value: float):
+        bucket = self._bucket(value)
+        values = self._values.get(bucket)
+        if values is None:
+            self._values[bucket] = [value]
+        else:
+            insort(values, value)
+        self._adjust(bucket, 1)
+        self._size += 1
+
+    def remove(self, value: float):
+        bucket = self._bucket(value)
+        values = self._values[bucket]
+        del values[bisect_left(values, value)]
+        if not values:
+            del self._values[bucket]
+        self._adjust(bucket, -1)
+        self._size -= 1
+
+    def rebuild(self, values: np.ndarray):
+        """Replace the contents with `values`, building the tree vectorized"""
+        values = np.sort(np.asarray(values, dtype=np.float64))
+        if 64 * len(values) < self._capacity:
+            # Few values: inserting them is cheaper than building every tree node
+            self.clear()
+            for value in values.tolist():
+                self.add(value)
+            return
+        with np.errstate(invalid='ignore'):
+            buckets = np.clip(((values - self.low) / self.width).astype(np.int64) + 1,
+                              1, self.buckets - 2)
+            buckets[values < self.low] = 0
+            buckets[~(values < self.high)] = self.buckets - 1
+        counts = np.bincount(buckets, minlength=self._capacity)
+        cumulative = np.concatenate(([0], np.cumsum(counts)))
+        index = np.arange(self._capacity + 1)
+        self._tree = (cumulative - cumulative[index - (index & -index)]).tolist()
+        values, cumulative = values.tolist(), cumulative.tolist()
+        self._values = {bucket: values[cumulative[bucket]:cumulative[bucket + 1]]
+                        for bucket in np.flatnonzero(counts).tolist()}
+        self._size = len(values)
+
+    def kth(self, k: int) -> float:
+        """k-th smallest value, counting from 0"""
+        if not 0 <= k < self._size:
+            raise IndexError(k)
+        tree = self._tree
+        position, remaining, step = 0, k + 1, self._capacity >> 1
+        while step:
+            count = tree[position + step]
+            if count < remaining:
+                position += step
+                remaining -= count
+            step >>= 1
+        return self._values[position][remaining - 1]
 
 class RiskManager:
-    def __init__(self, max_portfolio_risk: float = 0.02, max_position_risk: float = 0.01):
+    """Position and portfolio risk tracking.
+
+    Positions live in a columnar PositionBook. Portfolio metrics are derived from
+    running aggregates (sums of delta-weighted size and of position returns and
+    their squares, plus an order statistic tree of returns for the percentile
+    and minimum) that are adjusted by each position's old and new contribution,
+    so adding, removing or repricing one position is O(1) for the sums and
+    O(log n) for the returns. Exact recomputation and the per-position report
+    are whole-array operations over the book. `positions` is a read-only view; change
+    positions through add_position, remove_position and update_position.
+
+    Options with a strike, expiry, right and underlying price get their delta,
+    vega and theta from the Greeks engine when added, and again whenever their
+    underlying moves (update_underlying_prices, or on_market_data and on_bars as
+    listeners).
+    """
+
+    # Default stress grid: relative underlying moves, relative volatility changes, days elapsed
+    STRESS_UNDERLYING_SHOCKS = (-0.20, -0.15, -0.10, -0.05, -0.02, -0.01, 0.0, 0.01, 0.02, 0.05, 0.10, 0.15, 0.20)
+    STRESS_VOL_SHOCKS = (-0.50, -0.25, 0.0, 0.25, 0.50)
+    STRESS_DAYS = (0, 1, 5)
+
+    def __init__(self, max_portfolio_risk: float = 0.02, max_position_risk: float = 0.01,
+                 var_engine: Optional[VaREngine] = None, var_method: str = 'historical',
+                 lazy_metrics: bool = False, metrics_interval: float = 0.0,
+                 greeks_engine: Optional[GreeksEngine] = None):
         self.max_portfolio_risk = max_portfolio_risk  # Maximum risk as a percentage of portfolio
         self.max_position_risk = max_position_risk    # Maximum risk per position
-        self.positions: Dict[str, PositionRisk] = {}
+        # In lazy mode position changes only mark the metrics dirty; they are
+        # recomputed on read (get_risk_report, refresh_metrics) and, with an
+        # interval, also on a change at most once per interval seconds
+        self.lazy_metrics = lazy_metrics
+        self.metrics_interval = metrics_interval
+        self.metric_recomputes = 0
+        self.coalesced_updates = 0  # Position changes that did not need their own recompute
+        self._pending_changes = 0
+        self._last_recompute = float('-inf')
+        # Price-history VaR/CVaR for the risk report; the simplified metric is used
+        # until the engine has enough history
+        self.var_engine = var_engine
+        self.var_method = var_method
+        self._var_cache: Tuple[tuple, Optional[Dict[str, float]]] = ((), None)
+        self.greeks_engine = greeks_engine or GreeksEngine()
+        self._stress_cache: Tuple[tuple, Optional[dict]] = ((), None)
+        self.book = PositionBook()
+        self.positions: Mapping[str, PositionRisk] = _PositionsView(self.book)
         self.portfolio_value = 0.0
         self.risk_metrics = {
             'portfolio_beta': 0.0,
@@ -31,26 +208,232 @@ class RiskManager:
             'max_drawdown': 0.0,
             'sharpe_ratio': 0.0
         }
-        
+        self._sum_size_delta = 0.0
+        self._sum_return = 0.0
+        self._sum_abs_return = 0.0
+        self._sum_return_sq = 0.0
+        self._return_ranks = _OrderStatistics()
+        # Sum of every position's loss to stop, the portfolio risk budget in use
+        self.total_risk = 0.0
+        # Changes since the aggregates were last recomputed exactly
+        self._changes = 0
+        # Incremented on every position change
+        self.version = 0
+
+    def _contribution(self, row: int) -> Tuple[float, float]:
+        """Delta-weighted size and return of one book row"""
+        columns = self.book.columns
+        entry = columns['entry_price'].item(row)
+        size_delta = columns['position_size'].item(row) * columns['delta'].item(row)
+        return size_delta, (columns['current_price'].item(row) - entry) / entry
+
+    def _add_contribution(self, row: int):
+        size_delta, ret = self._contribution(row)
+        self._sum_size_delta += size_delta
+        self._sum_return += ret
+        self._sum_abs_return += abs(ret)
+        self._sum_return_sq += ret * ret
+        self._return_ranks.add(ret)
+
+    def _remove_contribution(self, row: int):
+        size_delta, ret = self._contribution(row)
+        self._sum_size_delta -= size_delta
+        self._sum_return -= ret
+        self._sum_abs_return -= abs(ret)
+        self._sum_return_sq -= ret * ret
+        self._return_ranks.remove(ret)
+
+    def _row_risk(self, row: int) -> float:
+        """Loss to stop of one book row"""
+        columns = self.book.columns
+        return abs(columns['entry_price'].item(row) - columns['stop_loss'].item(row)) * columns['quantity'].item(row)
+
+    def _returns(self) -> np.ndarray:
+        """Return of every position since entry"""
+        entry = self.book.column('entry_price')
+        return (self.book.column('current_price') - entry) / entry
+
+    def _risk_amounts(self) -> np.ndarray:
+        """Loss to stop of every position"""
+        book = self.book
+        return np.abs(book.column('entry_price') - book.column('stop_loss')) * book.column('quantity')
+
+    def _resync(self):
+        """Recompute the aggregates exactly from the book"""
+        book = self.book
+        returns = self._returns()
+        self._sum_size_delta = float(np.sum(book.column('position_size') * book.column('delta')))
+        self._sum_return = float(np.sum(returns))
+        self._sum_abs_return = float(np.sum(np.abs(returns)))
+        self._sum_return_sq = float(np.sum(returns * returns))
+        self._return_ranks.rebuild(returns)
+        self.total_risk = float(self._risk_amounts().sum())
+        self._changes = 0
+
+    def _priced_options(self, rows: np.ndarray) -> np.ndarray:
+        """Rows among `rows` holding options with full contract details and an underlying price"""
+        columns = self.book.columns
+        priced = (self.book._is_option[rows] & (columns['strike'][rows] > 0) & (columns['expiry'][rows] > 0)
+                  & (columns['right'][rows] != 0) & (columns['underlying_price'][rows] > 0))
+        return rows[priced]
+
+    def _refresh_greeks(self, rows: np.ndarray):
+        """Recompute delta, gamma, vega and theta of option rows from their underlying prices"""
+        if not len(rows):
+            return
+        columns = self.book.columns
+        engine = self.greeks_engine
+        underlying, strike, expiry, right = (columns[name][rows] for name in
+                                             ('underlying_price', 'strike', 'expiry', 'right'))
+        # Options added without a volatility take the one implied by their price
+        unsolved = rows[columns['implied_vol'][rows] <= 0]
+        if len(unsolved):
+            columns['implied_vol'][unsolved] = engine.implied_volatility(
+                columns['current_price'][unsolved], columns['underlying_price'][unsolved],
+                columns['strike'][unsolved], columns['expiry'][unsolved], columns['right'][unsolved])
+        greeks = engine.greeks(underlying, strike, expiry, right, columns['implied_vol'][rows])
+        for name in ('delta', 'gamma', 'vega', 'theta'):
+            columns[name][rows] = greeks[name]
+
     def add_position(self, position: PositionRisk):
         """Add a new position to risk management"""
-        self.positions[position.symbol] = position
+        row = self.book.index.get(position.symbol)
+        if row is not None:
+            self._remove_contribution(row)
+            self.total_risk -= self._row_risk(row)
+        row = self.book.add(position)
+        if position.is_option:
+            self._refresh_greeks(self._priced_options(np.array([row])))
+        self._add_contribution(row)
+        self.total_risk += self._row_risk(row)
         self._update_risk_metrics()
         
     def remove_position(self, symbol: str):
         """Remove a position from risk management"""
-        if symbol in self.positions:
-            del self.positions[symbol]
+        row = self.book.index.get(symbol)
+        if row is not None:
+            self._remove_contribution(row)
+            self.total_risk -= self._row_risk(row)
+            self.book.remove(symbol)
             self._update_risk_metrics()
             
     def update_position(self, symbol: str, current_price: float):
         """Update position with current market price"""
-        if symbol in self.positions:
-            self.positions[symbol].current_price = current_price
+        row = self.book.index.get(symbol)
+        if row is not None:
+            self._remove_contribution(row)
+            self.book.columns['current_price'][row] = current_price
+            self._add_contribution(row)
             self._update_risk_metrics()
             
-    def _update_risk_metrics(self):
-        """Update all risk metrics"""
+    def update_prices(self, prices, current_prices=None):
+        """Reprice many positions with a single metrics update.
+
+        Accepts a mapping of symbol -> price, or a sequence of symbols and an array
+        of prices. Symbols without a position are ignored.
+        """
+        if current_prices is None:
+            symbols, current_prices = list(prices.keys()), list(prices.values())
+        else:
+            symbols = prices
+        index = self.book.index
+        held = [(row, price) for row, price in zip((index.get(symbol) for symbol in symbols), current_prices)
+                if row is not None]
+        if not held:
+            return
+        rows = np.fromiter((row for row, _ in held), dtype=np.int64, count=len(held))
+        values = np.fromiter((price for _, price in held), dtype=np.float64, count=len(held))
+        if 8 * len(held) >= len(self.book):
+            # Large bursts: set every price at once and rebuild the aggregates vectorized
+            self.book.columns['current_price'][rows] = values
+            self._resync()
+        else:
+            current = self.book.columns['current_price']
+            for row, price in zip(rows.tolist(), values.tolist()):
+                self._remove_contribution(row)
+                current[row] = price
+                self._add_contribution(row)
+        self._update_risk_metrics(len(held))
+            
+    def update_underlying_prices(self, prices, underlying_prices=None):
+        """Move the underlying of option positions and refresh their Greeks.
+
+        Takes the same arguments as update_prices; symbols without a priced option
+        position are ignored.
+        """
+        if underlying_prices is None:
+            symbols, underlying_prices = list(prices.keys()), list(prices.values())
+        else:
+            symbols = prices
+        index, is_option = self.book.index, self.book._is_option
+        # Keyed by row so a repeated symbol keeps its last price
+        held = {row: price for row, price in zip((index.get(symbol) for symbol in symbols), underlying_prices)
+                if row is not None and is_option[row]}
+        if not held:
+            return
+        rows = np.fromiter(held.keys(), dtype=np.int64, count=len(held))
+        values = np.fromiter(held.values(), dtype=np.float64, count=len(held))
+        if 8 * len(rows) >= len(self.book):
+            self.book.columns['underlying_price'][rows] = values
+            self._refresh_greeks(self._priced_options(rows))
+            self._resync()
+        else:
+            # Delta changes the delta-weighted size, so swap the contributions around the refresh
+            for row in rows.tolist():
+                self._remove_contribution(row)
+            self.book.columns['underlying_price'][rows] = values
+            self._refresh_greeks(self._priced_options(rows))
+            for row in rows.tolist():
+                self._add_contribution(row)
+        self._update_risk_metrics(len(rows))
+
+    def on_net_liquidation(self, value: float):
+        """Account listener: size risk limits and metrics by the account's net liquidation"""
+        if value == self.portfolio_value:
+            return
+        self.portfolio_value = value
+        self.version += 1
+        self._pending_changes += 1
+        if not self.lazy_metrics:
+            self.refresh_metrics()
+
+    def on_market_data(self, symbols: Sequence[str], prices, volumes=None, timestamps=None):
+        """Market data listener: reprice stock positions and move option underlyings to the latest trades"""
+        index, is_option = self.book.index, self.book._is_option
+        stock_symbols, stock_prices = [], []
+        for symbol, price in zip(symbols, prices):
+            row = index.get(symbol)
+            if row is not None and not is_option[row]:
+                stock_symbols.append(symbol)
+                stock_prices.append(price)
+        if stock_symbols:
+            self.update_prices(stock_symbols, stock_prices)
+        self.update_underlying_prices(symbols, prices)
+
+    def on_bars(self, bars: Sequence[Bar]):
+        """Bar listener: move option underlyings to the latest closes"""
+        self.update_underlying_prices({bar.symbol: bar.close for bar in bars})
+
+    def _update_risk_metrics(self, changes: int = 1):
+        """Record position changes and update all risk metrics (or defer them in lazy mode)"""
+        self.version += 1
+        self._changes += changes
+        self._pending_changes += changes
+        if self._changes >= max(len(self.positions), 1000):
+            self._resync()
+        if self.lazy_metrics and (
+                self.metrics_interval <= 0 or time.monotonic() - self._last_recompute < self.metrics_interval):
+            return
+        self.refresh_metrics()
+
+    def refresh_metrics(self):
+        """Recompute the risk metrics if positions changed since the last recompute"""
+        if not self._pending_changes:
+            return
+        self.coalesced_updates += self._pending_changes - 1
+        self._pending_changes = 0
+        self.metric_recomputes += 1
+        self._last_recompute = time.monotonic()
         self._calculate_portfolio_beta()
         self._calculate_portfolio_volatility()
         self._calculate_value_at_risk()
@@ -59,15 +442,11 @@ class RiskManager:
         
     def _calculate_portfolio_beta(self):
         """Calculate portfolio beta"""
-        if not self.positions:
+        if not self.positions or self.portfolio_value <= 0:
             self.risk_metrics['portfolio_beta'] = 0.0
             return
             
-        total_beta = sum(
-            (position.position_size / self.portfolio_value) * position.delta
-            for position in self.positions.values()
-        )
-        self.risk_metrics['portfolio_beta'] = total_beta
+        self.risk_metrics['portfolio_beta'] = self._sum_size_delta / self.portfolio_value
         
     def _calculate_portfolio_volatility(self):
         """Calculate portfolio volatility"""
@@ -75,12 +454,12 @@ class RiskManager:
             self.risk_metrics['portfolio_volatility'] = 0.0
             return
             
-        # This is a simplified calculation. In production, use historical returns
-        position_volatilities = [
-            abs(position.current_price - position.entry_price) / position.entry_price
-            for position in self.positions.values()
-        ]
-        self.risk_metrics['portfolio_volatility'] = np.std(position_volatilities)
+        # This is a simplified calculation. In production, use historical returns.
+        # Population standard deviation of the absolute position returns.
+        n = len(self.positions)
+        mean = self._sum_abs_return / n
+        variance = max(self._sum_return_sq / n - mean * mean, 0.0)
+        self.risk_metrics['portfolio_volatility'] = math.sqrt(variance)
         
     def _calculate_value_at_risk(self, confidence_level: float = 0.95):
         """Calculate Value at Risk (VaR)"""
@@ -88,12 +467,14 @@ class RiskManager:
             self.risk_metrics['value_at_risk'] = 0.0
             return
             
-        # Simplified VaR calculation
-        portfolio_returns = [
-            (position.current_price - position.entry_price) / position.entry_price
-            for position in self.positions.values()
-        ]
-        var = np.percentile(portfolio_returns, (1 - confidence_level) * 100)
+        # Simplified VaR calculation: percentile of position returns, interpolated
+        # linearly between order statistics like np.percentile
+        returns = self._return_ranks
+        rank = (len(returns) - 1) * (1 - confidence_level)
+        lower = int(rank)
+        upper = min(lower + 1, len(returns) - 1)
+        low_return = returns.kth(lower)
+        var = low_return + (returns.kth(upper) - low_return) * (rank - lower)
         self.risk_metrics['value_at_risk'] = abs(var * self.portfolio_value)
         
     def _calculate_max_drawdown(self):
@@ -102,12 +483,8 @@ class RiskManager:
             self.risk_metrics['max_drawdown'] = 0.0
             return
             
-        # Simplified drawdown calculation
-        drawdowns = [
-            (position.current_price - position.entry_price) / position.entry_price
-            for position in self.positions.values()
-        ]
-        self.risk_metrics['max_drawdown'] = min(drawdowns) if drawdowns else 0.0
+        # Simplified drawdown calculation: worst position return
+        self.risk_metrics['max_drawdown'] = self._return_ranks.kth(0)
         
     def _calculate_sharpe_ratio(self, risk_free_rate: float = 0.02):
         """Calculate Sharpe ratio"""
@@ -115,15 +492,90 @@ class RiskManager:
             self.risk_metrics['sharpe_ratio'] = 0.0
             return
             
-        portfolio_return = sum(
-            (position.current_price - position.entry_price) / position.entry_price
-            for position in self.positions.values()
-        ) / len(self.positions)
+        portfolio_return = self._sum_return / len(self.positions)
         
         self.risk_metrics['sharpe_ratio'] = (
             (portfolio_return - risk_free_rate) / self.risk_metrics['portfolio_volatility']
         )
         
+    def value_at_risk(self, method: Optional[str] = None) -> Optional[Dict[str, float]]:
+        """VaR and CVaR from the VaR engine, cached until positions or price history change"""
+        if self.var_engine is None:
+            return None
+        method = method or self.var_method
+        key = (method, self.version, self.var_engine.version)
+        if self._var_cache[0] != key:
+            book = self.book
+            # Current delta-adjusted exposure per position
+            exposures = (book.column('position_size') * book.column('current_price')
+                         / book.column('entry_price') * book.column('delta'))
+            self._var_cache = (key, self.var_engine.value_at_risk(book.symbols, exposures, method))
+        return self._var_cache[1]
+
+    def _stress_coefficients(self) -> np.ndarray:
+        """Per-position P&L per unit of each stress factor (shock, shock^2, vol shock, day)"""
+        book = self.book
+        is_option = book.column('is_option')
+        # Option Greeks are per unit of the underlying, so contracts scale by the multiplier
+        quantity = book.column('quantity') * np.where(is_option, book.column('multiplier'), 1.0)
+        underlying = book.column('underlying_price')
+        priced = is_option & (underlying > 0)
+        # Options with an underlying price move with its notional, everything else with its own value
+        exposure = np.where(priced, quantity * underlying,
+                            book.column('position_size') * book.column('current_price') / book.column('entry_price'))
+        volatility = book.column('implied_vol')
+        volatility = np.where(volatility > 0, volatility, self.greeks_engine.default_volatility)
+        coefficients = np.empty((len(book), 4))
+        coefficients[:, 0] = book.column('delta') * exposure
+        coefficients[:, 1] = np.where(priced, 0.5 * book.column('gamma') * quantity * underlying * underlying, 0.0)
+        coefficients[:, 2] = book.column('vega') * quantity * volatility * 100  # Vega is per volatility point
+        coefficients[:, 3] = book.column('theta') * quantity
+        return coefficients
+
+    def stress_grid(self, underlying_shocks: Sequence[float] = STRESS_UNDERLYING_SHOCKS,
+                    vol_shocks: Sequence[float] = STRESS_VOL_SHOCKS,
+                    days: Sequence[float] = STRESS_DAYS) -> np.ndarray:
+        """P&L of every position under every scenario, shaped (positions, shocks, vol shocks, days).
+
+        Scenarios move each underlying by a relative shock, scale implied
+        volatility by (1 + vol shock) and let days pass. Positions are repriced
+        from their Greeks (delta-gamma for the underlying, vega, theta), so the
+        whole grid is one matrix product of per-position coefficients with the
+        scenario factors.
+        """
+        shock, vol, elapsed = np.meshgrid(np.asarray(underlying_shocks, dtype=np.float64),
+                                          np.asarray(vol_shocks, dtype=np.float64),
+                                          np.asarray(days, dtype=np.float64), indexing='ij')
+        factors = np.stack([shock.ravel(), shock.ravel() ** 2, vol.ravel(), elapsed.ravel()])
+        return (self._stress_coefficients() @ factors).reshape((len(self.book),) + shock.shape)
+
+    def stress_test(self, underlying_shocks: Sequence[float] = STRESS_UNDERLYING_SHOCKS,
+                    vol_shocks: Sequence[float] = STRESS_VOL_SHOCKS,
+                    days: Sequence[float] = STRESS_DAYS) -> dict:
+        """Portfolio P&L over the stress grid with the worst scenario, cached until positions change"""
+        key = (self.version, tuple(underlying_shocks), tuple(vol_shocks), tuple(days))
+        if self._stress_cache[0] == key:
+            return self._stress_cache[1]
+        grid = self.stress_grid(underlying_shocks, vol_shocks, days)
+        portfolio = grid.sum(axis=0)
+        worst = np.unravel_index(np.argmin(portfolio), portfolio.shape)
+        position_worst = grid.reshape(len(self.book), -1).min(axis=1) if len(self.book) else np.zeros(0)
+        result = {
+            'underlying_shocks': list(underlying_shocks),
+            'vol_shocks': list(vol_shocks),
+            'days': list(days),
+            'pnl': portfolio.tolist(),
+            'worst_pnl': float(portfolio[worst]),
+            'worst_scenario': {
+                'underlying_shock': float(underlying_shocks[worst[0]]),
+                'vol_shock': float(vol_shocks[worst[1]]),
+                'days': float(days[worst[2]])
+            },
+            'position_worst_pnl': dict(zip(self.book.symbols, position_worst.tolist()))
+        }
+        self._stress_cache = (key, result)
+        return result
+
     def check_position_risk(self, position: PositionRisk) -> bool:
         """Check if a new position meets risk requirements"""
         # Calculate position risk
@@ -135,10 +587,7 @@ class RiskManager:
             return False
             
         # Check if adding this position would exceed portfolio risk
-        total_risk = sum(
-            abs(pos.entry_price - pos.stop_loss) * pos.quantity
-            for pos in self.positions.values()
-        ) + position_risk
+        total_risk = self.total_risk + position_risk
         
         if total_risk > self.max_portfolio_risk * self.portfolio_value:
             logger.warning(f"Portfolio risk {total_risk} would exceed maximum allowed")
@@ -146,22 +595,71 @@ class RiskManager:
             
         return True
         
+    def check_positions_batch(self, positions: Sequence[PositionRisk],
+                              priorities: Optional[Sequence[float]] = None) -> List[RiskVerdict]:
+        """Check many candidate positions at once against the remaining risk budget.
+
+        Candidates are taken in priority order (highest first; input order by
+        default) and accepted until the next one would exceed the portfolio risk
+        limit. Candidates over the per-position limit are rejected without using
+        budget. Verdicts are returned in input order; nothing is added to the book.
+        """
+        if not positions:
+            return []
+        entry = np.fromiter((position.entry_price for position in positions), dtype=np.float64, count=len(positions))
+        stop = np.fromiter((position.stop_loss for position in positions), dtype=np.float64, count=len(positions))
+        quantity = np.fromiter((position.quantity for position in positions), dtype=np.float64, count=len(positions))
+        risk = np.abs(entry - stop) * quantity
+        within_position_limit = risk <= self.max_position_risk * self.portfolio_value
+
+        if priorities is None:
+            order = np.arange(len(positions))
+        else:
+            order = np.argsort(-np.asarray(priorities, dtype=np.float64), kind='stable')
+        used = self.total_risk + np.cumsum(np.where(within_position_limit[order], risk[order], 0.0))
+        fits = np.empty(len(positions), dtype=bool)
+        # Budget is consumed in order, so everything from the first miss onwards is rejected
+        fits[order] = np.cumprod(used <= self.max_portfolio_risk * self.portfolio_value).astype(bool)
+        accepted = within_position_limit & fits
+
+        verdicts = []
+        for position, ok, within, amount in zip(positions, accepted.tolist(), within_position_limit.tolist(), risk.tolist()):
+            if ok:
+                reason = 'accepted'
+            elif not within:
+                reason = 'position risk exceeds limit'
+            else:
+                reason = 'portfolio risk limit reached'
+            verdicts.append(RiskVerdict(position.symbol, ok, amount, reason))
+        logger.info(f"Batch risk check accepted {int(accepted.sum())} of {len(positions)} candidates")
+        return verdicts
+
     def get_risk_report(self) -> dict:
         """Generate a comprehensive risk report"""
+        self.refresh_metrics()
+        book = self.book
+        entry = book.column('entry_price')
+        risk_amounts = self._risk_amounts()
+        risk_percentages = np.abs(entry - book.column('stop_loss')) / entry
+        risk_metrics = self.risk_metrics
+        var = self.value_at_risk()
+        if var is not None:
+            risk_metrics = dict(risk_metrics, **var)
         return {
             'portfolio_value': self.portfolio_value,
-            'number_of_positions': len(self.positions),
-            'total_position_risk': sum(
-                abs(pos.entry_price - pos.stop_loss) * pos.quantity
-                for pos in self.positions.values()
-            ),
-            'risk_metrics': self.risk_metrics,
+            'number_of_positions': len(book),
+            'total_position_risk': self.total_risk,
+            'risk_metrics': risk_metrics,
+            'metric_recomputes': self.metric_recomputes,
+            'coalesced_updates': self.coalesced_updates,
             'positions': {
                 symbol: {
-                    'position_size': pos.position_size,
-                    'risk_amount': abs(pos.entry_price - pos.stop_loss) * pos.quantity,
-                    'risk_percentage': abs(pos.entry_price - pos.stop_loss) / pos.entry_price
+                    'position_size': size,
+                    'risk_amount': amount,
+                    'risk_percentage': percentage
                 }
-                for symbol, pos in self.positions.items()
+                for symbol, size, amount, percentage in zip(
+                    book.symbols, book.column('position_size').tolist(),
+                    risk_amounts.tolist(), risk_percentages.tolist())
             }
-        } 
\ No newline at end of file
+        }
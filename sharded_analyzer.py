@@ -0,0 +1,394 @@
+from datetime import datetime, timedelta
+from multiprocessing import get_context, shared_memory
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import threading
+import time
+import zlib
+import numpy as np
+from loguru import logger
+from alert_store import AlertStore
+from bar_builder import Bar
+from config import MAX_ALERTS, ALERT_TTL_MINUTES
+from market_analyzer import MarketAnalyzer, MarketAlert, _to_epoch_array
+from tick_archive import TickArchive
+from tick_store import to_epoch_seconds
+
+TICK_DTYPE = np.dtype([('symbol', '<i8'), ('timestamp', '<f8'), ('price', '<f8'), ('volume', '<f8')])
+
+class _TickRing:
+    """Single-producer, single-consumer ring of tick records in shared memory.
+
+    The header holds the number of records ever written and ever read. The counters
+    are only read and published under a process-shared lock, which also orders the
+    record writes before the consumer sees them.
+    """
+
+    _HEADER = 2 * np.dtype(np.int64).itemsize
+
+    def __init__(self, capacity: int, lock, name: Optional[str] = None):
+        self.capacity = capacity
+        self.lock = lock
+        create = name is None
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=create, size=self._HEADER + capacity * TICK_DTYPE.itemsize)
+        self._counters = np.ndarray(2, dtype=np.int64, buffer=self.shm.buf)
+        self._records = np.ndarray(capacity, dtype=TICK_DTYPE, buffer=self.shm.buf, offset=self._HEADER)
+        if create:
+            self._counters[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def put(self, records: np.ndarray) -> int:
+        """Write as many records as fit and return how many were written"""
+        with self.lock:
+            written, read = int(self._counters[0]), int(self._counters[1])
+        n = min(self.capacity - (written - read), len(records))
+        start = written % self.capacity
+        first = min(n, self.capacity - start)
+        self._records[start:start + first] = records[:first]
+        self._records[:n - first] = records[first:n]
+        with self.lock:
+            self._counters[0] = written + n
+        return n
+
+    def get(self) -> np.ndarray:
+        """Copy out and consume every record written so far"""
+        with self.lock:
+            written, read = int(self._counters[0]), int(self._counters[1])
+        n = written - read
+        start = read % self.capacity
+        first = min(n, self.capacity - start)
+        records = np.concatenate([self._records[start:start + first], self._records[:n - first]])
+        with self.lock:
+            self._counters[1] = read + n
+        return records
+
+    def close(self, unlink: bool = False):
+        del self._counters, self._records
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+def _shard_main(index: int, ring_name: str, ring_capacity: int, lock, wakeup, conn, alert_queue,
+                analyzer_kwargs: dict, archive_dir: Optional[Path]):
+    """Worker process: drain ticks from the ring into a private MarketAnalyzer"""
+    ring = _TickRing(ring_capacity, lock, name=ring_name)
+    archive = TickArchive(archive_dir) if archive_dir is not None else None
+    analyzer = MarketAnalyzer(archive=archive, **analyzer_kwargs)
+    analyzer.warm_start()
+    outbox: List[MarketAlert] = []
+    analyzer.alerts.listeners.append(outbox.append)
+    bar_outbox: List[Bar] = []
+    analyzer.bar_listeners.append(bar_outbox.extend)
+    symbols: List[str] = []
+    last_flush = time.monotonic()
+
+    def drain() -> int:
+        records = ring.get()
+        if len(records):
+            # Symbol names are registered over the pipe before their first tick
+            while int(records['symbol'].max()) >= len(symbols):
+                if not handle(conn.recv()):
+                    raise SystemExit
+            analyzer.update_market_data_batch(
+                [symbols[i] for i in records['symbol']],
+                records['price'], records['volume'], records['timestamp'])
+        if outbox:
+            alert_queue.put(('alerts', list(outbox)))
+            outbox.clear()
+        if bar_outbox:
+            alert_queue.put(('bars', list(bar_outbox)))
+            bar_outbox.clear()
+        return len(records)
+
+    def handle(message: tuple) -> bool:
+        kind = message[0]
+        if kind == 'symbols':
+            symbols.extend(message[1])
+        elif kind == 'analysis':
+            drain()
+            conn.send((message[2], analyzer.get_market_analysis(message[1])))
+        elif kind == 'flush_bars':
+            analyzer.flush_bars(message[1])
+        elif kind == 'stop':
+            return False
+        return True
+
+    try:
+        while True:
+            wakeup.clear()
+            drained = drain()
+            while conn.poll():
+                if not handle(conn.recv()):
+                    return
+            if time.monotonic() - last_flush > 1.0:
+                analyzer.flush_bars()
+                if archive is not None:
+                    archive.flush()
+                last_flush = time.monotonic()
+            if not drained:
+                wakeup.wait(0.05)
+    except (SystemExit, KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        drain()
+        if archive is not None:
+            archive.flush()
+        ring.close()
+
+class _Shard:
+    """Parent-side handle for one worker process"""
+
+    def __init__(self, ctx, index: int, ring_capacity: int):
+        self.index = index
+        self.ring = _TickRing(ring_capacity, ctx.Lock())
+        self.wakeup = ctx.Event()
+        self.conn, self.worker_conn = ctx.Pipe()
+        self.symbol_count = 0
+        self.unregistered: List[str] = []  # Symbols routed here but not yet sent to the worker
+        self.lock = threading.Lock()  # Serializes writes to the pipe and the ring
+        self.request_lock = threading.Lock()  # Serializes request/response pairs
+        self.request_id = 0  # Replies carry their request's id, so late ones can be skipped
+        self.dropped_ticks = 0
+        self.process = None
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+class ShardedMarketAnalyzer:
+    """MarketAnalyzer spread across worker processes by symbol.
+
+    Symbols are assigned to shards by a stable hash. Ticks travel to each worker
+    through a shared-memory ring, alerts from all workers come back on one queue and
+    are merged into a local AlertStore. Closed analysis bars come back on the same
+    queue and are passed to `bar_listeners` on the collector thread. The public
+    API matches MarketAnalyzer and is thread-safe. Workers start on first use, or
+    explicitly with `start`. No call waits on a worker for more than
+    `request_timeout` seconds: analysis requests to a stopped or stuck worker
+    return {}, and ticks for a worker whose ring stays full are dropped.
+    """
+
+    def __init__(self, shards: int = 4, ring_capacity: int = 65536,
+                 archive_dir: Optional[Path] = None, max_alerts: int = MAX_ALERTS,
+                 alert_ttl: Optional[timedelta] = timedelta(minutes=ALERT_TTL_MINUTES) if ALERT_TTL_MINUTES else None,
+                 request_timeout: float = 5.0, **analyzer_kwargs):
+        if shards < 1:
+            raise ValueError("At least one shard is required")
+        self._ctx = get_context('spawn')
+        self._shard_count = shards
+        self._ring_capacity = ring_capacity
+        self.request_timeout = request_timeout
+        # Shared memory, queues and processes are created in `start`, so constructing
+        # an instance at import time is safe under the spawn start method
+        self._shards: List[_Shard] = []
+        self._alert_queue = None
+        self._archive_dir = Path(archive_dir) if archive_dir is not None else None
+        self._analyzer_kwargs = dict(analyzer_kwargs, max_alerts=max_alerts, alert_ttl=alert_ttl)
+        self.alerts = AlertStore(max_alerts=max_alerts, ttl=alert_ttl)
+        self._alerts_lock = threading.Lock()
+        # Called with each group of closed bars at the analysis interval, from any shard
+        self.bar_listeners: List[Callable[[List[Bar]], None]] = []
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._collector = None
+        # symbol -> (shard index, symbol id within the shard)
+        self._routes: Dict[str, Tuple[int, int]] = {}
+        self._routes_lock = threading.Lock()
+        # Workers own their archives and warm-start themselves
+        self.archive = None
+
+    def start(self):
+        """Start worker processes and the alert collector"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._shards = [_Shard(self._ctx, index, self._ring_capacity) for index in range(self._shard_count)]
+            self._alert_queue = self._ctx.Queue()
+            for shard in self._shards:
+                archive_dir = None
+                if self._archive_dir is not None:
+                    archive_dir = self._archive_dir / f"shard-{shard.index}-of-{len(self._shards)}"
+                shard.process = self._ctx.Process(
+                    target=_shard_main,
+                    args=(shard.index, shard.ring.name, shard.ring.capacity, shard.ring.lock, shard.wakeup,
+                          shard.worker_conn, self._alert_queue, self._analyzer_kwargs, archive_dir),
+                    daemon=True,
+                    name=f"market-analyzer-shard-{shard.index}"
+                )
+                shard.process.start()
+            self._collector = threading.Thread(target=self._collect_alerts, daemon=True)
+            self._collector.start()
+            self._started = True
+            logger.info(f"Started {len(self._shards)} market analyzer shards")
+
+    def _collect_alerts(self):
+        """Merge alerts from all workers into the local store and forward their bars"""
+        while True:
+            try:
+                message = self._alert_queue.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            kind, items = message
+            if kind == 'bars':
+                for listener in self.bar_listeners:
+                    try:
+                        listener(items)
+                    except Exception as e:
+                        logger.error(f"Error in bar listener: {e}")
+                continue
+            with self._alerts_lock:
+                for alert in items:
+                    self.alerts.add(alert)
+
+    def _route(self, symbol: str) -> Tuple[int, int]:
+        """Shard index and per-shard symbol id, assigned on first sight"""
+        route = self._routes.get(symbol)
+        if route is None:
+            with self._routes_lock:
+                route = self._routes.get(symbol)
+                if route is None:
+                    shard = self._shards[zlib.crc32(symbol.encode()) % len(self._shards)]
+                    route = self._routes[symbol] = (shard.index, shard.symbol_count)
+                    shard.symbol_count += 1
+                    shard.unregistered.append(symbol)
+        return route
+
+    def _send(self, shard: _Shard, ids: np.ndarray, timestamps: np.ndarray,
+              prices: np.ndarray, volumes: np.ndarray):
+        """Register new symbols with a worker and push ticks through its ring"""
+        records = np.empty(len(ids), dtype=TICK_DTYPE)
+        records['symbol'] = ids
+        records['timestamp'] = timestamps
+        records['price'] = prices
+        records['volume'] = volumes
+        deadline = time.monotonic() + self.request_timeout
+        while True:
+            try:
+                with shard.lock:
+                    with self._routes_lock:
+                        new_symbols, shard.unregistered = shard.unregistered, []
+                    if new_symbols:
+                        shard.conn.send(('symbols', new_symbols))
+                    written = shard.ring.put(records)
+                    shard.wakeup.set()
+            except OSError as e:
+                logger.error(f"Market analyzer shard {shard.index} is unreachable: {e}")
+                written = 0
+                deadline = 0.0
+            records = records[written:]
+            if not len(records):
+                return
+            if not shard.alive() or time.monotonic() > deadline:
+                shard.dropped_ticks += len(records)
+                logger.error(f"Dropped {len(records)} ticks for market analyzer shard {shard.index}: "
+                             f"{'worker not running' if not shard.alive() else 'ring full'}")
+                return
+            # Ring full; let the worker catch up without blocking other producers
+            time.sleep(0.0005)
+
+    def update_market_data(self, symbol: str, price: float, volume: int, timestamp: datetime):
+        """Update market data for a symbol"""
+        self.start()
+        shard_index, symbol_id = self._route(symbol)
+        self._send(self._shards[shard_index], np.array([symbol_id]), np.array([to_epoch_seconds(timestamp)]),
+                   np.array([price], dtype=np.float64), np.array([volume], dtype=np.float64))
+
+    def update_market_data_batch(self, symbols: Sequence[str], prices, volumes, timestamps):
+        """Update market data for many ticks at once, split by shard"""
+        if len(symbols) == 0:
+            return
+        self.start()
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        timestamps = _to_epoch_array(timestamps)
+        routes = np.array([self._route(symbol) for symbol in symbols], dtype=np.int64)
+        for shard in self._shards:
+            selected = np.flatnonzero(routes[:, 0] == shard.index)
+            if len(selected):
+                self._send(shard, routes[selected, 1], timestamps[selected], prices[selected], volumes[selected])
+
+    def flush_bars(self, now: Optional[datetime] = None):
+        """Close and analyze bars whose interval has elapsed, on every shard"""
+        if not self._started:
+            return
+        for shard in self._shards:
+            if not shard.alive():
+                continue
+            try:
+                with shard.lock:
+                    shard.conn.send(('flush_bars', now))
+                    shard.wakeup.set()
+            except OSError as e:
+                logger.error(f"Market analyzer shard {shard.index} is unreachable: {e}")
+
+    def warm_start(self) -> int:
+        """Workers warm-start from their own archives when they start"""
+        self.start()
+        return 0
+
+    def get_alerts(self, symbol: Optional[str] = None, priority: Optional[str] = None) -> List[MarketAlert]:
+        """Get filtered alerts merged from all shards"""
+        with self._alerts_lock:
+            return self.alerts.query(symbol=symbol, priority=priority)
+
+    def get_market_analysis(self, symbol: str) -> dict:
+        """Get comprehensive market analysis for a symbol from its shard, or {} if it does not answer"""
+        if not self._started:
+            return {}
+        route = self._routes.get(symbol)
+        if route is None:
+            return {}
+        shard = self._shards[route[0]]
+        with shard.request_lock:
+            if not shard.alive():
+                logger.error(f"Market analyzer shard {shard.index} is not running")
+                return {}
+            shard.request_id += 1
+            deadline = time.monotonic() + self.request_timeout
+            try:
+                with shard.lock:
+                    shard.conn.send(('analysis', symbol, shard.request_id))
+                    shard.wakeup.set()
+                while shard.conn.poll(max(deadline - time.monotonic(), 0.0)):
+                    request_id, analysis = shard.conn.recv()
+                    # Otherwise a late reply to a request that timed out
+                    if request_id == shard.request_id:
+                        return analysis
+            except (EOFError, OSError) as e:
+                logger.error(f"Market analyzer shard {shard.index} is unreachable: {e}")
+                return {}
+            logger.warning(f"Market analyzer shard {shard.index} did not answer within {self.request_timeout}s")
+            return {}
+
+    def close(self, timeout: float = 5.0):
+        """Stop workers and release shared memory"""
+        if self._started:
+            for shard in self._shards:
+                try:
+                    with shard.lock:
+                        shard.conn.send(('stop',))
+                        shard.wakeup.set()
+                except OSError:
+                    pass  # Already gone; joined below
+            for shard in self._shards:
+                shard.process.join(timeout)
+                if shard.process.is_alive():
+                    shard.process.terminate()
+            self._alert_queue.put(None)
+            self._collector.join(timeout)
+            self._started = False
+        for shard in self._shards:
+            shard.ring.close(unlink=True)
+        self._shards = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+import argparse
+import numpy as np
+import pandas as pd
+from market_analyzer import MarketAlert
+from risk_manager import PositionRisk
+from strategy import TradeSignal
+
+def symbols(n: int) -> List[str]:
+    """Deterministic symbol names SYM0000, SYM0001, ..."""
+    return [f"SYM{i:04d}" for i in range(n)]
+
+def generate_ticks(n_symbols: int, n_ticks: int, seed: int = 0, start: datetime = datetime(2024, 1, 2, 9, 30),
+                   interval: float = 1.0, volatility: float = 0.002) -> pd.DataFrame:
+    """Round-robin ticks for n_symbols following geometric random walks.
+
+    Every symbol ticks once per `interval` seconds, so n_ticks rows cover
+    n_ticks / n_symbols intervals. Columns match what `replay.load_market_data` reads.
+    """
+    rng = np.random.default_rng(seed)
+    steps = -(-n_ticks // n_symbols)
+    start_prices = rng.uniform(10, 500, n_symbols)
+    returns = rng.normal(0, volatility, (steps, n_symbols))
+    prices = start_prices * np.exp(np.cumsum(returns, axis=0))
+    offsets = np.repeat(np.arange(steps) * interval, n_symbols)[:n_ticks]
+    return pd.DataFrame({
+        'symbol': np.tile(np.array(symbols(n_symbols), dtype=object), steps)[:n_ticks],
+        'timestamp': pd.Timestamp(start) + pd.to_timedelta(offsets, unit='s'),
+        'price': prices.ravel()[:n_ticks].round(4),
+        'volume': rng.integers(1, 1000, n_ticks)
+    })
+
+def generate_positions(n: int, seed: int = 0, option_fraction: float = 0.2) -> List[PositionRisk]:
+    """Open stock and option positions with stops below and targets above entry"""
+    rng = np.random.default_rng(seed)
+    entry = rng.uniform(10, 500, n)
+    current = entry * np.exp(rng.normal(0, 0.02, n))
+    quantity = rng.integers(1, 200, n)
+    is_option = rng.random(n) < option_fraction
+    delta = np.where(is_option, rng.uniform(-1, 1, n), 1.0)
+    return [
+        PositionRisk(
+            symbol=symbol,
+            position_size=float(entry[i] * quantity[i]),
+            entry_price=float(entry[i]),
+            current_price=float(current[i]),
+            stop_loss=float(entry[i] * 0.98),
+            take_profit=float(entry[i] * 1.06),
+            quantity=int(quantity[i]),
+            is_option=bool(is_option[i]),
+            delta=float(delta[i]),
+            vega=float(rng.uniform(0, 0.3)) if is_option[i] else 0.0,
+            theta=float(-rng.uniform(0, 0.1)) if is_option[i] else 0.0
+        )
+        for i, symbol in enumerate(symbols(n))
+    ]
+
+def generate_signals(n: int, seed: int = 0, expiry: Optional[str] = None) -> List[TradeSignal]:
+    """Trade signals that pass TradeSignal.validate; every third one is an option"""
+    rng = np.random.default_rng(seed)
+    expiry = expiry or (datetime.now() + timedelta(days=30)).strftime("%Y%m%d")
+    signals = []
+    for i, symbol in enumerate(symbols(n)):
+        is_option = i % 3 == 0
+        entry = float(rng.uniform(1, 5) if is_option else rng.uniform(10, 100))
+        buy = i % 2 == 0
+        sign = 1 if buy else -1
+        signals.append(TradeSignal(
+            symbol=symbol,
+            entry_price=entry,
+            stop_loss=entry * (1 - 0.02 * sign),
+            take_profit=entry * (1 + 0.06 * sign),
+            quantity=int(rng.integers(1, 10 if is_option else 50)),
+            direction='BUY' if buy else 'SELL',
+            is_option=is_option,
+            strike=round(entry * 30, 0) if is_option else None,
+            expiry=expiry if is_option else None,
+            option_type=('C' if buy else 'P') if is_option else None
+        ))
+    return signals
+
+def generate_alerts(n: int, symbol_names: Sequence[str], seed: int = 0) -> List[MarketAlert]:
+    """Market alerts spread across symbols and priorities"""
+    rng = np.random.default_rng(seed)
+    kinds = [('RSI Overbought', 'medium'), ('RSI Oversold', 'medium'), ('MACD Bullish Crossover', 'high'),
+             ('Volume Spike', 'high'), ('RSI Oversold Ended', 'low')]
+    now = datetime.now()
+    picks = rng.integers(0, len(kinds), n)
+    owners = rng.integers(0, len(symbol_names), n)
+    values = rng.uniform(0, 100, n)
+    return [
+        MarketAlert(
+            symbol=symbol_names[owners[i]],
+            alert_type=kinds[picks[i]][0],
+            message=f'{kinds[picks[i]][0]} ({values[i]:.2f})',
+            timestamp=now - timedelta(seconds=int(n - i)),
+            priority=kinds[picks[i]][1],
+            data={'value': float(values[i])}
+        )
+        for i in range(n)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Write deterministic synthetic ticks to CSV or Parquet")
+    parser.add_argument('path')
+    parser.add_argument('--symbols', type=int, default=100)
+    parser.add_argument('--ticks', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ticks = generate_ticks(args.symbols, args.ticks, seed=args.seed)
+    if args.path.endswith(('.parquet', '.pq')):
+        ticks.to_parquet(args.path, index=False)
+    else:
+        ticks.to_csv(args.path, index=False)
+
+if __name__ == "__main__":
+    main()
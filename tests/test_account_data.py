@@ -0,0 +1,60 @@
+from contract_cache import ContractCache
+from trading_bot import TradingBot
+
+def recording_bot():
+    """Bot whose account requests are recorded; the stopped scheduler sends them inline"""
+    bot = TradingBot(contract_cache=ContractCache())
+    bot.sent = []
+    bot.reqAccountSummary = lambda request_id, group, tags: bot.sent.append(('summary', request_id, group))
+    bot.reqPnL = lambda request_id, account, model: bot.sent.append(('pnl', request_id, account))
+    bot.cancelPnL = lambda request_id: bot.sent.append(('cancel_pnl', request_id))
+    return bot
+
+def test_pnl_subscription_waits_for_managed_accounts():
+    bot = recording_bot()
+    bot.account_data.subscribe()
+    assert [kind for kind, *_ in bot.sent] == ['summary']
+    assert bot.account_data.account == ''
+
+    bot.managedAccounts('U1,U2')
+    (_, pnl_request, account), = [request for request in bot.sent if request[0] == 'pnl']
+    assert account == 'U1'
+    # A repeated callback for the same account does not subscribe twice
+    bot.managedAccounts('U1,U2')
+    assert len(bot.sent) == 2
+    bot.pnl(pnl_request, 12.5, 3.0, 1e308)
+    assert bot.account_summary == {'DailyPnL': 12.5, 'UnrealizedPnL': 3.0}
+
+def test_accounts_known_before_subscribing_start_pnl_at_once():
+    bot = recording_bot()
+    bot.managedAccounts('U1')
+    # Not subscribed yet: nothing is requested
+    assert bot.sent == []
+    bot.account_data.subscribe()
+    assert [(kind, account) for kind, _, account in bot.sent] == [('summary', 'All'), ('pnl', 'U1')]
+
+def test_summary_values_are_kept_per_account():
+    bot = recording_bot()
+    net_liquidations = []
+    bot.account_data.listeners.append(net_liquidations.append)
+    bot.account_data.subscribe()
+    summary_request = bot.sent[0][1]
+    # Values for several accounts, streamed before managedAccounts arrives
+    bot.accountSummary(summary_request, 'U1', 'NetLiquidation', '100000', 'USD')
+    bot.accountSummary(summary_request, 'U2', 'NetLiquidation', '5000', 'USD')
+    bot.accountSummary(summary_request, 'U2', 'BuyingPower', '20000', 'USD')
+    assert bot.account_data.values == {('U1', 'NetLiquidation'): 100000.0, ('U2', 'NetLiquidation'): 5000.0,
+                                       ('U2', 'BuyingPower'): 20000.0}
+    assert bot.account_summary == {}
+
+    bot.managedAccounts('U1,U2')
+    # The primary account's values are published once it is known
+    assert bot.account_summary == {'NetLiquidation': 100000.0}
+    assert net_liquidations == [100000.0]
+    bot.accountSummary(summary_request, 'U2', 'NetLiquidation', '6000', 'USD')
+    bot.accountSummary(summary_request, 'U1', 'NetLiquidation', '100000', 'USD')
+    bot.accountSummary(summary_request, 'U1', 'NetLiquidation', '101000', 'USD')
+    assert bot.account_summary == {'NetLiquidation': 101000.0}
+    assert bot.account_data.values['U2', 'NetLiquidation'] == 6000.0
+    assert net_liquidations == [100000.0, 101000.0]
+    assert bot.account_data.unchanged == 1
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import numpy as np
+from alert_store import AlertStore
+from market_analyzer import MarketAlert, MarketAnalyzer
+
+START = datetime(2026, 1, 5, 10)
+
+def alert(symbol: str, minute: int, priority: str = 'medium') -> MarketAlert:
+    return MarketAlert(symbol=symbol, alert_type='Test', message='', timestamp=START + timedelta(minutes=minute),
+                       priority=priority, data={})
+
+def test_alerts_expire_after_the_ttl():
+    store = AlertStore(ttl=timedelta(minutes=10))
+    for minute, symbol, priority in ((0, 'AAA', 'high'), (5, 'BBB', 'medium'), (8, 'AAA', 'medium')):
+        store.add(alert(symbol, minute, priority))
+    assert len(store) == 3
+    # Adding a newer alert expires the ones more than ten minutes older
+    store.add(alert('BBB', 12))
+    assert [a.timestamp.minute for a in store] == [5, 8, 12]
+    assert ('priority', 'high') not in store._indexes
+    store.expire(START + timedelta(minutes=17))
+    assert [(a.symbol, a.timestamp.minute) for a in store] == [('AAA', 8), ('BBB', 12)]
+    assert [a.timestamp.minute for a in store._indexes[('symbol', 'BBB')]] == [12]
+    assert store.evicted == 2
+    # Queries expire against the wall clock, long after these alerts
+    assert store.query(symbol='AAA') == []
+    assert len(store) == 0 and store._indexes == {}
+
+def test_retention_cap_evicts_oldest_from_every_index():
+    store = AlertStore(max_alerts=3)
+    for minute in range(5):
+        store.add(alert('AAA' if minute % 2 else 'BBB', minute, 'high' if minute < 2 else 'low'))
+    assert [a.timestamp.minute for a in store.query()] == [2, 3, 4]
+    assert [a.timestamp.minute for a in store.query(symbol='BBB')] == [2, 4]
+    assert store.query(priority='high') == []
+    assert store.evicted == 2
+
+def rsi_alerts(analyzer: MarketAnalyzer, values) -> list:
+    rows = np.array([analyzer.store.row('AAA')])
+    for value in values:
+        analyzer._check_rsi_alerts(rows, np.array([value]))
+    return [a.alert_type for a in analyzer.get_alerts()]
+
+def test_rsi_alerts_need_to_clear_the_hysteresis_band_to_end():
+    analyzer = MarketAnalyzer(analysis_interval=0, rsi_hysteresis=5.0, alert_ttl=None)
+    # Wobbling around 70 fires once; ending needs RSI at or below 65
+    assert rsi_alerts(analyzer, [72, 68, 71, 66, 74]) == ['RSI Overbought']
+    assert rsi_alerts(analyzer, [65, 69, 71]) == ['RSI Overbought', 'RSI Overbought Ended', 'RSI Overbought']
+    # Straight from overbought to oversold ends one condition and starts the other
+    assert rsi_alerts(analyzer, [25, 32, 35])[3:] == ['RSI Overbought Ended', 'RSI Oversold', 'RSI Oversold Ended']
+
+def test_bollinger_alerts_use_a_fraction_of_the_band_width():
+    analyzer = MarketAnalyzer(analysis_interval=0, band_hysteresis=0.1, alert_ttl=None)
+    for i in range(20):
+        analyzer.update_market_data('AAA', 100.0, 1, START + timedelta(seconds=i))
+    rows = np.array([analyzer.store.row('AAA')])
+    bands = {'upper': np.array([102.0]), 'middle': np.array([100.0]), 'lower': np.array([98.0])}
+    fired = []
+    for second, price in enumerate([103.0, 101.9, 102.5, 101.8, 97.0], start=20):
+        before = len(analyzer.alerts)
+        analyzer.store.append(rows, np.array([second]), np.array([price]), np.array([1.0]))
+        analyzer._check_bollinger_alerts(rows, bands)
+        fired.append([a.alert_type for a in analyzer.get_alerts()][before:])
+    # 101.9 is inside the band but within 10% of its half-width (0.2) of the upper edge
+    assert fired == [['Price Above Upper Band'], [], [], ['Price Above Upper Band Ended'],
+                     ['Price Below Lower Band']]
@@ -0,0 +1,59 @@
+import pytest
+from bar_builder import BarBuilder
+
+def ohlcv(bar):
+    return (bar.symbol, bar.interval, bar.start, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.ticks)
+
+def test_tick_on_the_boundary_opens_the_next_bar():
+    builder = BarBuilder(intervals=(60,))
+    assert builder.add_tick('AAA', 0.0, 10.0, 1) == []
+    assert builder.add_tick('AAA', 59.999, 11.0, 2) == []
+    closed = builder.add_tick('AAA', 60.0, 12.0, 3)
+    assert [ohlcv(bar) for bar in closed] == [('AAA', 60, 0.0, 10.0, 11.0, 10.0, 11.0, 3, 2)]
+    assert builder.open_bar('AAA', 60).start == 60.0
+    assert builder.open_bar('AAA', 60).open == 12.0
+
+def test_out_of_order_ticks_inside_an_open_bar_set_open_and_close_by_time():
+    builder = BarBuilder(intervals=(60,))
+    for ts, price in ((30.0, 10.0), (10.0, 9.0), (50.0, 12.0), (40.0, 15.0), (5.0, 8.0)):
+        builder.add_tick('AAA', ts, price, 1)
+    (bar,) = builder.add_tick('AAA', 61.0, 20.0, 1)
+    assert (bar.open, bar.high, bar.low, bar.close, bar.ticks) == (8.0, 15.0, 8.0, 12.0, 5)
+    assert (bar.first_tick, bar.last_tick) == (5.0, 50.0)
+
+def test_ticks_for_closed_bars_are_dropped_and_counted():
+    builder = BarBuilder(intervals=(10, 60))
+    builder.add_tick('AAA', 5.0, 10.0, 1)
+    closed = builder.add_tick('AAA', 12.0, 11.0, 1)
+    assert [(bar.interval, bar.start) for bar in closed] == [(10, 0.0)]
+    # Late for the closed 10s bar, still inside the open 60s bar
+    assert builder.add_tick('AAA', 8.0, 99.0, 1) == []
+    assert builder.late_ticks == {10: 1, 60: 0}
+    assert builder.open_bar('AAA', 60).high == 99.0
+    assert builder.open_bar('AAA', 10).high == 11.0
+    # Other symbols have their own watermark
+    assert builder.add_tick('BBB', 3.0, 5.0, 1) == []
+
+def test_allowed_lateness_keeps_bars_open_for_stragglers():
+    builder = BarBuilder(intervals=(10,), allowed_lateness=2.0)
+    builder.add_tick('AAA', 1.0, 10.0, 1)
+    assert builder.add_tick('AAA', 11.0, 11.0, 1) == []
+    # Inside the lateness window, so it still lands in the first bar
+    assert builder.add_tick('AAA', 9.5, 12.0, 1) == []
+    (bar,) = builder.add_tick('AAA', 12.0, 13.0, 1)
+    assert (bar.start, bar.close, bar.ticks) == (0.0, 12.0, 2)
+    builder.add_tick('AAA', 9.9, 14.0, 1)
+    assert builder.late_ticks[10] == 1
+
+def test_flush_closes_bars_by_clock():
+    builder = BarBuilder(intervals=(10,))
+    builder.add_tick('AAA', 1.0, 10.0, 1)
+    builder.add_tick('BBB', 25.0, 20.0, 1)
+    assert builder.flush(now=9.0) == []
+    closed = builder.flush(now=30.0)
+    assert [(bar.symbol, bar.start) for bar in closed] == [('AAA', 0.0), ('BBB', 20.0)]
+    assert builder.open_bar('AAA', 10) is None
+
+def test_intervals_must_be_positive():
+    with pytest.raises(ValueError):
+        BarBuilder(intervals=(0, 60))
@@ -0,0 +1,73 @@
+from contract_cache import ContractCache
+from ib_simulator import IBSimulator
+from replay import SimulatedTradingBot
+from strategy import TradeSignal
+from trading_bot import TradingBot
+
+class RecordingBot(SimulatedTradingBot):
+    """Simulated bot that also records every placeOrder call in order"""
+
+    def __init__(self):
+        super().__init__()
+        self.next_order_id = 100
+        self.placed = []
+
+    def placeOrder(self, orderId, contract, order):
+        self.placed.append((orderId, contract, order))
+        super().placeOrder(orderId, contract, order)
+
+def signal(direction: str = 'BUY', **fields) -> TradeSignal:
+    prices = dict(entry_price=100.0, stop_loss=95.0, take_profit=110.0) if direction == 'BUY' else \
+        dict(entry_price=100.0, stop_loss=105.0, take_profit=90.0)
+    return TradeSignal(symbol='AAA', quantity=10, direction=direction, **dict(prices, **fields))
+
+def test_bracket_legs_are_linked_and_only_the_last_transmits():
+    bot = RecordingBot()
+    futures = bot.place_bracket(signal())
+    assert [future.result().status for future in futures] == ['Submitted'] * 3
+    assert [order_id for order_id, _, _ in bot.placed] == [100, 101, 102]
+    (_, contract, entry), (_, _, take_profit), (_, _, stop) = bot.placed
+    assert contract.conId and all(placed is contract for _, placed, _ in bot.placed)
+
+    assert (entry.action, entry.orderType, entry.lmtPrice, entry.parentId, entry.transmit) == \
+        ('BUY', 'LMT', 100.0, 0, False)
+    assert (take_profit.action, take_profit.orderType, take_profit.lmtPrice, take_profit.transmit) == \
+        ('SELL', 'LMT', 110.0, False)
+    assert (stop.action, stop.orderType, stop.auxPrice, stop.transmit) == ('SELL', 'STP', 95.0, True)
+    for child in (take_profit, stop):
+        assert child.parentId == 100
+        assert (child.ocaGroup, child.ocaType) == ('bracket-100', 1)
+        assert child.totalQuantity == 10
+    assert bot.next_order_id == 103
+
+def test_short_bracket_exits_with_buys_and_option_brackets_use_the_option():
+    bot = RecordingBot()
+    bot.place_bracket(signal('SELL'))
+    assert [(order.action, order.orderType) for _, _, order in bot.placed] == [
+        ('SELL', 'LMT'), ('BUY', 'LMT'), ('BUY', 'STP')]
+    bot.placed.clear()
+    bot.place_bracket(signal(is_option=True, strike=100.0, expiry='20991217', option_type='C'))
+    contracts = {(contract.secType, contract.strike, contract.right) for _, contract, _ in bot.placed}
+    assert contracts == {('OPT', 100.0, 'C')}
+    assert {order.ocaGroup for _, _, order in bot.placed} == {'', 'bracket-103'}
+
+def test_bracket_is_rejected_when_not_connected():
+    bot = RecordingBot()
+    bot.connected = False
+    assert [future.result().status for future in bot.place_bracket(signal())] == ['Rejected'] * 3
+    assert bot.placed == []
+
+def test_take_profit_fill_cancels_the_stop():
+    simulator = IBSimulator(seed=3)
+    bot = simulator.attach(TradingBot(contract_cache=ContractCache()))
+    assert bot.connect_to_ib()
+    try:
+        simulator.tick('AAA', 100.0)
+        entry, take_profit, stop = bot.place_bracket(signal(entry_price=101.0), wait_for='filled')
+        assert entry.result(5).status == 'Filled'
+        simulator.tick('AAA', 111.0)
+        assert take_profit.result(5).status == 'Filled'
+        assert stop.result(5).status == 'Cancelled'
+        assert simulator.positions == {}
+    finally:
+        bot.close()
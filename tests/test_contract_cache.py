@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from ibapi.contract import Contract, ContractDetails
+from contract_cache import ContractCache
+from replay import SimulatedTradingBot
+from strategy import TradeSignal
+
+def spec(symbol: str = 'AAA', currency: str = 'USD') -> Contract:
+    contract = Contract()
+    contract.symbol, contract.secType, contract.exchange, contract.currency = symbol, 'STK', 'SMART', currency
+    return contract
+
+def resolved(symbol: str = 'AAA', currency: str = 'USD', con_id: int = 1) -> Contract:
+    contract = spec(symbol, currency)
+    contract.conId, contract.primaryExchange = con_id, 'NASDAQ'
+    return contract
+
+def test_currency_is_part_of_the_key():
+    cache = ContractCache()
+    cache.put(spec(currency='USD'), resolved(currency='USD', con_id=1))
+    cache.put(spec(currency='CAD'), resolved(currency='CAD', con_id=2))
+    assert cache.get(spec(currency='USD')).conId == 1
+    assert cache.get(spec(currency='CAD')).conId == 2
+    assert cache.get(spec(currency='EUR')) is None
+
+def test_lookups_return_copies():
+    cache = ContractCache()
+    contract = resolved()
+    cache.put(spec(), contract)
+    contract.conId = 99
+    cached = cache.get(spec())
+    cached.exchange = 'ISLAND'
+    assert cache.get(spec()).conId == 1
+    assert cache.get(spec()).exchange == 'SMART'
+
+def test_failures_expire_after_their_ttl():
+    cache = ContractCache(failure_ttl_minutes=15)
+    cache.put_failure(spec(), 'no contract found')
+    assert cache.failure(spec()) == 'no contract found'
+    assert cache.failure(spec(currency='CAD')) is None
+    key = next(iter(cache._failures))
+    cache._failures[key] = ('no contract found', datetime.now() - timedelta(minutes=16))
+    assert cache.failure(spec()) is None
+    # A later resolution clears the failure
+    cache.put_failure(spec(), 'no contract found')
+    cache.put(spec(), resolved())
+    assert cache.failure(spec()) is None
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / 'contracts.json'
+    cache = ContractCache(path)
+    cache.put(spec('AAA', 'USD'), resolved('AAA', 'USD', 1))
+    cache.put(spec('AAA', 'CAD'), resolved('AAA', 'CAD', 2))
+    cache.save()
+    loaded = ContractCache(path)
+    assert len(loaded) == 2
+    assert loaded.get(spec('AAA', 'CAD')).conId == 2
+    assert loaded.get(spec('AAA', 'USD')).primaryExchange == 'NASDAQ'
+
+class AmbiguousBot(SimulatedTradingBot):
+    """Bot whose contract lookups match two listings of 'AMB' and nothing for 'NONE'"""
+
+    def __init__(self):
+        super().__init__()
+        self.lookups = []
+
+    def reqContractDetails(self, reqId: int, contract: Contract):
+        self.lookups.append(contract.symbol)
+        if contract.symbol == 'NONE':
+            self.error(reqId, 200, 'No security definition has been found for the request')
+            return
+        if contract.symbol == 'AMB':
+            for con_id in (1, 2):
+                details = ContractDetails()
+                details.contract = resolved('AMB', con_id=con_id)
+                self.contractDetails(reqId, details)
+            self.contractDetailsEnd(reqId)
+            return
+        super().reqContractDetails(reqId, contract)
+
+def test_failed_specs_are_not_looked_up_again():
+    bot = AmbiguousBot()
+    assert bot.resolve_contract(spec('AMB')).result() is None
+    assert bot.resolve_contract(spec('NONE')).result() is None
+    bot.create_stock_contract('AMB')
+    bot.create_stock_contract('NONE')
+    assert bot.resolve_contract(spec('AMB')).result() is None
+    assert bot.lookups == ['AMB', 'NONE']
+    assert bot.contract_cache.failure(spec('AMB')) == 'ambiguous contract (2 matches)'
+    assert bot.contract_cache.failure(spec('NONE')) == 'no contract found'
+
+def test_orders_on_unresolvable_specs_are_rejected_without_placing():
+    bot = AmbiguousBot()
+    update = bot.submit_order(bot.create_stock_contract('AMB'), bot.create_order('BUY', 10, 'MKT')).result()
+    assert update.status == 'Rejected'
+    assert 'ambiguous' in update.message
+    signal = TradeSignal(symbol='NONE', entry_price=100.0, stop_loss=95.0, take_profit=110.0,
+                         quantity=10, direction='BUY')
+    updates = [future.result() for future in bot.place_bracket(signal)]
+    assert [update.status for update in updates] == ['Rejected'] * 3
+    assert all('no contract found' in update.message for update in updates)
+    assert bot.open_orders == {}
+    assert bot.lookups == ['AMB', 'NONE']
+
+def test_unresolved_specs_are_resolved_before_placing():
+    bot = AmbiguousBot()
+    contract = spec('AAA')
+    assert bot.submit_order(contract, bot.create_order('BUY', 10, 'MKT')).result().status == 'Submitted'
+    (placed, _), = bot.open_orders.values()
+    assert placed.conId
@@ -0,0 +1,94 @@
+import math
+import numpy as np
+import pytest
+from greeks import GreeksEngine, SECONDS_PER_YEAR, black_scholes, implied_volatility, norm_cdf
+
+def reference(s: float, k: float, t: float, sigma: float, w: float, rate: float) -> float:
+    """Black-Scholes price with the exact normal CDF"""
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    d1 = (math.log(s / k) + (rate + 0.5 * sigma ** 2) * t) / (sigma * math.sqrt(t))
+    d2 = d1 - sigma * math.sqrt(t)
+    return w * (s * cdf(w * d1) - k * math.exp(-rate * t) * cdf(w * d2))
+
+def test_norm_cdf_matches_erf():
+    x = np.linspace(-6, 6, 241)
+    exact = [0.5 * (1 + math.erf(value / math.sqrt(2))) for value in x]
+    np.testing.assert_allclose(norm_cdf(x), exact, atol=1e-7)
+
+def test_prices_match_textbook_values_and_put_call_parity():
+    # Hull, Options, Futures and Other Derivatives: S=42, K=40, r=10%, sigma=20%, six months
+    model = black_scholes([42.0, 42.0], 40.0, 0.5, 0.2, [1.0, -1.0], rate=0.1)
+    assert model['price'] == pytest.approx([4.76, 0.81], abs=5e-3)
+    call, put = model['price']
+    assert call - put == pytest.approx(42.0 - 40.0 * math.exp(-0.05), abs=1e-6)
+
+def test_greeks_match_finite_differences():
+    s, k, t, sigma, rate = 100.0, 105.0, 0.25, 0.35, 0.03
+    for w in (1.0, -1.0):
+        greeks = {name: float(value) for name, value in black_scholes(s, k, t, sigma, w, rate).items()}
+        price = lambda **changes: reference(**dict(dict(s=s, k=k, t=t, sigma=sigma, w=w, rate=rate), **changes))
+        h = 1e-3
+        assert greeks['price'] == pytest.approx(price(), abs=1e-5)
+        assert greeks['delta'] == pytest.approx((price(s=s + h) - price(s=s - h)) / (2 * h), abs=1e-5)
+        assert greeks['gamma'] == pytest.approx((price(s=s + h) - 2 * price() + price(s=s - h)) / h ** 2, abs=1e-4)
+        # Per volatility point and per calendar day
+        assert greeks['vega'] == pytest.approx((price(sigma=sigma + h) - price(sigma=sigma - h)) / (2 * h) / 100,
+                                               abs=1e-6)
+        assert greeks['theta'] == pytest.approx(-(price(t=t + h) - price(t=t - h)) / (2 * h) / 365, abs=1e-6)
+
+def test_expired_options_are_worth_intrinsic_value():
+    model = black_scholes([110.0, 90.0, 110.0], 100.0, [0.0, 0.0, -1.0], 0.3, [1.0, 1.0, -1.0])
+    assert model['price'].tolist() == [10.0, 0.0, 0.0]
+    assert model['delta'].tolist() == [1.0, 0.0, 0.0]
+    assert not model['gamma'].any() and not model['vega'].any() and not model['theta'].any()
+
+def test_implied_volatility_recovers_the_pricing_volatility():
+    rng = np.random.default_rng(2)
+    n = 500
+    s = rng.uniform(50, 150, n)
+    k = s * rng.uniform(0.7, 1.3, n)
+    t = rng.uniform(0.02, 2.0, n)
+    sigma = rng.uniform(0.05, 1.5, n)
+    w = rng.choice([1.0, -1.0], n)
+    prices = black_scholes(s, k, t, sigma, w, rate=0.02)['price']
+    # Options worth a fraction of a cent carry no volatility information
+    vega = black_scholes(s, k, t, sigma, w, rate=0.02)['vega']
+    informative = vega > 1e-3
+    solved = implied_volatility(prices, s, k, t, w, rate=0.02)
+    np.testing.assert_allclose(solved[informative], sigma[informative], atol=1e-4)
+
+def test_implied_volatility_is_nan_outside_arbitrage_bounds():
+    # A fair call, one above the underlying, one below its intrinsic value and an expired one
+    solved = implied_volatility([5.0, 101.0, 15.0, 5.0], 100.0, [100.0, 100.0, 80.0, 100.0], [0.5, 0.5, 0.5, 0.0],
+                                1.0)
+    assert np.isnan(solved).tolist() == [False, True, True, True]
+
+NOW = 1_767_000_000.0  # Start of a valuation period for the default five minute step
+
+def test_engine_shares_cache_entries_within_a_price_bucket():
+    engine = GreeksEngine(rate=0.02, price_bucket=0.001)
+    expiry = NOW + 0.5 * SECONDS_PER_YEAR
+    first = engine.greeks([100.0], 105.0, expiry, 1.0, 0.3, now=NOW)
+    second = engine.greeks([99.98], 105.0, expiry, 1.0, 0.3, now=NOW + 60)
+    assert (engine.hits, engine.misses) == (1, 1)
+    assert second['price'][0] == first['price'][0]
+    # Valued at the bucket center, at most half a bucket from the real price
+    step = math.log1p(0.001)
+    center = math.exp(round(math.log(100.0) / step) * step)
+    assert abs(center / 100.0 - 1) <= 0.0005
+    at_center = black_scholes(center, 105.0, 0.5, 0.3, 1.0, rate=0.02)
+    for name in ('price', 'delta', 'gamma', 'vega', 'theta'):
+        assert first[name][0] == pytest.approx(float(at_center[name]), rel=1e-9)
+    # Missing volatility falls back to the default; a new period drops the cache
+    engine.greeks([100.0], 105.0, expiry, 1.0, [0.0], now=NOW + 120)
+    assert engine.hits == 2
+    engine.greeks([100.0], 105.0, expiry, 1.0, now=NOW + 300)
+    assert engine.misses == 2
+
+def test_engine_implied_volatility_round_trips_and_defaults():
+    engine = GreeksEngine(rate=0.02, default_volatility=0.25)
+    expiry = NOW + 0.25 * SECONDS_PER_YEAR
+    price = float(black_scholes(100.0, 95.0, 0.25, 0.4, -1.0, rate=0.02)['price'])
+    solved = engine.implied_volatility([price, 0.0], 100.0, 95.0, expiry, -1.0, now=NOW)
+    assert solved[0] == pytest.approx(0.4, abs=1e-5)
+    assert solved[1] == 0.25
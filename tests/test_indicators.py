@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import IndicatorEngine
+from tick_store import TickStore
+
+CAPACITY = 100
+TICKS = 350  # Past several ring wraparounds and exact resyncs
+
+def pandas_indicators(prices: np.ndarray, volumes: np.ndarray) -> dict:
+    """The original MarketAnalyzer pandas calculations, on the latest tick"""
+    prices = pd.Series(prices)
+    delta = prices.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rsi = 100 - (100 / (1 + gain / loss))
+    macd = prices.ewm(span=12, adjust=False).mean() - prices.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    sma = prices.rolling(window=20).mean()
+    std = prices.rolling(window=20).std()
+    held = pd.Series(volumes[-CAPACITY:])
+    return {
+        'rsi': rsi.iloc[-1],
+        'macd': macd.iloc[-1], 'signal': signal.iloc[-1],
+        'prev_macd': macd.iloc[-2], 'prev_signal': signal.iloc[-2],
+        'upper': (sma + std * 2).iloc[-1], 'middle': sma.iloc[-1], 'lower': (sma - std * 2).iloc[-1],
+        'average_volume': held.mean(), 'volume_std': held.std(), 'current_volume': held.iloc[-1]
+    }
+
+def streamed(engine: IndicatorEngine, row: int) -> dict:
+    rows = np.array([row])
+    values = {}
+    for result in (engine.macd(rows), engine.bollinger_bands(rows), engine.volume_profile(rows)):
+        values.update({name: float(value[0]) for name, value in result.items()})
+    values['rsi'] = float(engine.rsi(rows)[0])
+    return values
+
+@pytest.fixture
+def market():
+    rng = np.random.default_rng(7)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (3, TICKS)), axis=1))
+    volumes = rng.integers(1, 1000, (3, TICKS)).astype(np.float64)
+    return prices, volumes
+
+def test_streaming_indicators_match_pandas(market):
+    prices, volumes = market
+    store = TickStore(capacity=CAPACITY)
+    engine = IndicatorEngine(store)
+    rows = store.rows_for(['AAA', 'BBB', 'CCC'])
+    for tick in range(TICKS):
+        engine.update(rows, np.full(3, float(tick)), prices[:, tick], volumes[:, tick])
+    for row in rows:
+        expected = pandas_indicators(prices[row], volumes[row])
+        actual = streamed(engine, row)
+        for name, value in expected.items():
+            assert actual[name] == pytest.approx(value, rel=1e-9, abs=1e-9), name
+
+def test_rebuild_matches_pandas_on_held_history(market):
+    prices, volumes = market
+    store = TickStore(capacity=CAPACITY)
+    row = store.row('AAA')
+    store.load(row, np.arange(TICKS, dtype=np.float64), prices[0], volumes[0])
+    engine = IndicatorEngine(store)
+    engine.rebuild(np.array([row]))
+    # A rebuilt engine only sees what the store holds
+    expected = pandas_indicators(prices[0, -CAPACITY:], volumes[0])
+    actual = streamed(engine, row)
+    for name, value in expected.items():
+        assert actual[name] == pytest.approx(value, rel=1e-9, abs=1e-9), name
+
+def test_rsi_is_nan_until_window_fills():
+    store = TickStore(capacity=CAPACITY)
+    engine = IndicatorEngine(store)
+    row = np.array([store.row('AAA')])
+    for tick in range(13):
+        engine.update(row, np.array([float(tick)]), np.array([100.0 + tick]), np.array([1.0]))
+    assert np.isnan(engine.rsi(row)[0])
+    engine.update(row, np.array([13.0]), np.array([113.0]), np.array([1.0]))
+    assert engine.rsi(row)[0] == pytest.approx(100.0)
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+import json
+from flask import Flask, jsonify
+from market_analyzer import MarketAnalyzer
+
+START = datetime(2026, 1, 5, 10)
+
+def test_market_analysis_is_json_serializable():
+    analyzer = MarketAnalyzer(history_size=60, analysis_interval=0)
+    for i in range(40):
+        analyzer.update_market_data('AAA', 100.0 + (i % 7), 10 + i, START + timedelta(seconds=i))
+    analysis = analyzer.get_market_analysis('AAA')
+    with Flask(__name__).app_context():
+        payload = json.loads(jsonify(analysis).get_data())
+    rsi = payload['technical_indicators']['rsi']
+    assert len(rsi) == 40 and rsi[0] is None and isinstance(rsi[-1], float)
+    assert len(payload['technical_indicators']['macd']['macd']) == 40
+    assert payload['price_data']['current_price'] == 100.0 + (39 % 7)
+    assert payload['volume_data']['current_volume'] == 49.0
+
+def test_first_tick_has_no_price_change():
+    analyzer = MarketAnalyzer(history_size=30, analysis_interval=0)
+    analyzer.update_market_data('AAA', 100.0, 10, START)
+    price_data = analyzer.get_market_analysis('AAA')['price_data']
+    assert price_data['current_price'] == 100.0 and price_data['price_change'] is None
+
+def test_bars_are_reported_per_symbol():
+    analyzer = MarketAnalyzer(history_size=30, bar_intervals=(5,), analysis_interval=10, bar_lateness=0)
+    for i in range(25):
+        analyzer.update_market_data('AAA', 100.0 + i, 1, START + timedelta(seconds=i))
+        analyzer.update_market_data('BBB', 200.0 + i, 2, START + timedelta(seconds=i))
+    assert set(analyzer.last_bars) == {'AAA', 'BBB'}
+    bars = analyzer.get_market_analysis('AAA')['bars']
+    assert set(bars) == {5, 10}
+    assert bars[10]['symbol'] == 'AAA' and bars[10]['close'] == 119.0
+    assert bars[5]['close'] == 119.0
@@ -0,0 +1,59 @@
+from ibapi.contract import Contract
+from ibapi.ticktype import TickTypeEnum
+from contract_cache import ContractCache
+from trading_bot import TradingBot
+
+class RecordingBot(TradingBot):
+    """TradingBot that records market data requests instead of sending them"""
+
+    def __init__(self):
+        super().__init__(contract_cache=ContractCache())
+        self.requested = []
+        self.cancelled = []
+
+    def reqMktData(self, reqId, contract, *args):
+        self.requested.append(reqId)
+
+    def cancelMktData(self, reqId):
+        self.cancelled.append(reqId)
+
+def stock(symbol: str) -> Contract:
+    contract = Contract()
+    contract.symbol = symbol
+    contract.secType = 'STK'
+    return contract
+
+def trade(bot: TradingBot, request_id: int, price: float = 100.0):
+    bot.market_data.on_tick_price(request_id, TickTypeEnum.LAST, price)
+    bot.market_data.on_tick_size(request_id, TickTypeEnum.LAST_SIZE, 100)
+
+def test_eviction_drops_least_recently_traded_line():
+    bot = RecordingBot()
+    bot.market_data.max_lines = 3
+    ids = {symbol: bot.market_data.subscribe(stock(symbol)) for symbol in ('AAA', 'BBB', 'CCC')}
+    # AAA was subscribed first but is still trading
+    trade(bot, ids['AAA'])
+    bot.market_data.subscribe(stock('DDD'))
+    assert bot.cancelled == [ids['BBB']]
+    assert list(bot.market_data.subscriptions) == ['CCC', 'AAA', 'DDD']
+
+def test_resubscribing_marks_line_used():
+    bot = RecordingBot()
+    bot.market_data.max_lines = 2
+    first = bot.market_data.subscribe(stock('AAA'))
+    second = bot.market_data.subscribe(stock('BBB'))
+    assert bot.market_data.subscribe(stock('AAA')) == first
+    bot.market_data.subscribe(stock('CCC'))
+    assert bot.cancelled == [second]
+    assert bot.requested.count(first) == 1
+
+def test_trades_conflate_per_symbol():
+    bot = RecordingBot()
+    batches = []
+    bot.market_data.listeners.append(lambda *batch: batches.append(batch))
+    request_id = bot.market_data.subscribe(stock('AAA'))
+    trade(bot, request_id, 100.0)
+    trade(bot, request_id, 101.0)
+    assert bot.market_data.drain() == 1
+    symbols, prices, volumes, _ = batches[0]
+    assert (symbols, prices, volumes) == (['AAA'], [101.0], [200.0])
@@ -0,0 +1,54 @@
+import time
+from contract_cache import ContractCache
+from order_scheduler import CANCEL, DATA, ORDER, STOP, OrderScheduler
+from trading_bot import TradingBot
+
+def test_stop_flushes_cancels_and_stops_and_drops_the_rest():
+    scheduler = OrderScheduler(rate=1000.0, burst=5.0)
+    scheduler.start()
+    scheduler.pause()
+    sent, dropped = [], []
+    for name, priority in (('order', ORDER), ('data', DATA), ('stop', STOP), ('cancel', CANCEL)):
+        scheduler.submit(lambda name=name: sent.append(name), priority,
+                         on_drop=lambda name=name: dropped.append(name))
+    scheduler._paused = False  # Connection back, sender not yet woken
+    scheduler.stop()
+    assert sent == ['cancel', 'stop']
+    assert sorted(dropped) == ['data', 'order']
+    assert scheduler.queue_depth == 0
+
+def test_stop_while_paused_sends_nothing():
+    scheduler = OrderScheduler()
+    scheduler.start()
+    scheduler.pause()
+    sent, dropped = [], []
+    scheduler.submit(lambda: sent.append('cancel'), CANCEL, on_drop=lambda: dropped.append('cancel'))
+    scheduler.stop()
+    assert sent == [] and dropped == ['cancel']
+
+def test_paused_queue_resumes_in_priority_order():
+    scheduler = OrderScheduler(rate=1000.0, burst=10.0)
+    scheduler.start()
+    scheduler.pause()
+    sent = []
+    scheduler.submit(lambda: sent.append('order'), ORDER)
+    scheduler.submit(lambda: sent.append('cancel'), CANCEL)
+    scheduler.start()
+    deadline = time.monotonic() + 2
+    while len(sent) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    scheduler.stop()
+    assert sent == ['cancel', 'order']
+
+def test_unsent_orders_resolve_on_close():
+    bot = TradingBot(contract_cache=ContractCache())
+    bot.connected = True
+    bot.next_order_id = 1
+    bot.placeOrder = lambda *args: None
+    bot.scheduler.start()
+    bot.scheduler.pause()
+    single = bot.submit_order(bot.create_stock_contract('AAA'), bot.create_order('BUY', 1, 'MKT'))
+    bot.close()
+    update = single.result(timeout=1)
+    assert update.status == 'Rejected'
+    assert 'not sent' in update.message.lower()
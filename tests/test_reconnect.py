@@ -0,0 +1,76 @@
+import socket
+import time
+import trading_bot
+from contract_cache import ContractCache
+from ib_simulator import IBSimulator
+from order_scheduler import CANCEL
+from trading_bot import TradingBot
+
+def closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_reconnect_retries_refused_socket(monkeypatch):
+    monkeypatch.setattr(trading_bot, 'IB_PORT', closed_port())
+    bot = TradingBot(contract_cache=ContractCache())
+    bot.reconnect_delay = 0.01
+    bot.max_reconnect_delay = 0.04
+    attempts = []
+    connect_session = bot._connect_session
+    monkeypatch.setattr(bot, '_connect_session', lambda timeout=1.0: attempts.append(time.monotonic())
+                        or connect_session(timeout))
+    bot.scheduler.start()
+    sent = []
+    bot.connected = True
+    bot.connectionClosed()
+    # Queued while down: held, not dropped
+    bot.scheduler.submit(lambda: sent.append('cancel'), CANCEL)
+
+    assert wait_for(lambda: len(attempts) >= 4)
+    assert bot._supervisor.is_alive()
+    assert not bot._closing.is_set()
+    assert sent == [] and bot.scheduler.queue_depth == 1
+    # Backoff doubles up to the cap
+    gaps = [b - a for a, b in zip(attempts, attempts[1:])]
+    assert gaps[1] > gaps[0] * 1.5
+
+    bot.close()
+    bot._supervisor.join(1.0)
+    assert not bot._supervisor.is_alive()
+
+def test_reconnect_resyncs_after_drop():
+    simulator = IBSimulator(seed=1)
+    bot = simulator.attach(TradingBot(contract_cache=ContractCache()))
+    bot.reconnect_delay = 0.01
+    snapshots = []
+    bot.resync_listeners.append(snapshots.append)
+    assert bot.connect_to_ib()
+    simulator.tick('AAA', 100.0)
+    bot.market_data.subscribe(bot.create_stock_contract('AAA'))
+    filled = bot.submit_order(bot.create_stock_contract('AAA'), bot.create_order('BUY', 10, 'MKT'), wait_for='filled')
+    assert filled.result(2).status == 'Filled'
+    working = bot.submit_order(bot.create_stock_contract('AAA'), bot.create_order('BUY', 10, 'LMT', 90.0))
+    assert working.result(2).status == 'Submitted'
+
+    simulator.available = False
+    simulator.drop_connection()
+    assert wait_for(lambda: not bot.connected)
+    simulator.available = True
+    assert wait_for(lambda: bot.reconnects == 1)
+
+    snapshot = snapshots[-1]
+    assert snapshot.complete
+    assert snapshot.positions['AAA'][0] == 10
+    assert working.result().order_id in snapshot.open_orders
+    assert wait_for(lambda: simulator.metrics()['subscriptions'] == 1)
+    assert bot.connection_metrics()['last_time_to_ready'] > 0
+    bot.close()
@@ -0,0 +1,157 @@
+import random
+import numpy as np
+import pytest
+from risk_manager import PositionRisk, RiskManager, _OrderStatistics
+
+def stock(symbol: str, entry: float, current: float, quantity: int = 10, stop: float = None) -> PositionRisk:
+    return PositionRisk(symbol=symbol, position_size=entry * quantity, entry_price=entry, current_price=current,
+                        stop_loss=entry * 0.95 if stop is None else stop, take_profit=entry * 1.1,
+                        quantity=quantity, is_option=False)
+
+def test_order_statistics_match_sorted_values():
+    ranks = _OrderStatistics()
+    values = []
+    rng = random.Random(7)
+    for step in range(5000):
+        if values and rng.random() < 0.4:
+            ranks.remove(values.pop(rng.randrange(len(values))))
+        else:
+            # Mostly small returns, some in the overflow buckets and some exact repeats
+            value = rng.choice([rng.gauss(0, 0.05), rng.uniform(-2.0, 6.0), 0.0])
+            values.append(value)
+            ranks.add(value)
+        if step % 250 == 0:
+            assert [ranks.kth(k) for k in range(len(values))] == sorted(values)
+    with pytest.raises(IndexError):
+        ranks.kth(len(values))
+
+def test_order_statistics_rebuild_matches_inserts():
+    values = np.random.default_rng(3).normal(0, 0.5, 3000)
+    values[:3] = [-1.5, 4.0, 0.0]
+    ranks = _OrderStatistics()
+    ranks.rebuild(values)
+    np.testing.assert_array_equal([ranks.kth(k) for k in range(len(values))], np.sort(values))
+    for value in values[:1500]:
+        ranks.remove(value)
+    np.testing.assert_array_equal([ranks.kth(k) for k in range(1500)], np.sort(values[1500:]))
+
+def test_incremental_metrics_match_numpy_after_updates():
+    risk_manager = RiskManager()
+    risk_manager.portfolio_value = 1_000_000
+    rng = np.random.default_rng(11)
+    symbols = [f'S{i}' for i in range(200)]
+    for symbol in symbols:
+        risk_manager.add_position(stock(symbol, 100.0, 100.0 * (1 + rng.normal(0, 0.05))))
+    for i in range(1000):
+        risk_manager.update_position(symbols[i % len(symbols)], 100.0 * (1 + rng.normal(0, 0.05)))
+    for symbol in symbols[:50]:
+        risk_manager.remove_position(symbol)
+    returns = risk_manager._returns()
+    metrics = risk_manager.risk_metrics
+    assert metrics['value_at_risk'] == pytest.approx(abs(np.percentile(returns, 5)) * 1_000_000)
+    assert metrics['max_drawdown'] == returns.min()
+
+def option(symbol: str, underlying: float, quantity: int = 1) -> PositionRisk:
+    return PositionRisk(symbol=symbol, position_size=500.0 * quantity, entry_price=5.0, current_price=5.0,
+                        stop_loss=4.0, take_profit=8.0, quantity=quantity, is_option=True, strike=100.0,
+                        expiry='20991217', option_type='C', implied_vol=0.3, underlying_price=underlying)
+
+def test_streamed_trades_mark_lazy_metrics_stale_until_read():
+    risk_manager = RiskManager(lazy_metrics=True)
+    risk_manager.portfolio_value = 1_000_000
+    for i in range(20):
+        risk_manager.add_position(stock(f'S{i}', 100.0, 100.0))
+    risk_manager.get_risk_report()
+    recomputes, version = risk_manager.metric_recomputes, risk_manager.version
+
+    risk_manager.on_market_data(['S0', 'S1', 'UNHELD', 'S0'], [90.0, 110.0, 50.0, 80.0], [1, 1, 1, 1], [0, 0, 0, 0])
+    # Prices are live immediately, the metrics wait for the next read
+    assert risk_manager.positions['S0'].current_price == 80.0
+    assert risk_manager.positions['S1'].current_price == 110.0
+    assert risk_manager.version > version
+    assert risk_manager.metric_recomputes == recomputes
+    assert risk_manager.risk_metrics['max_drawdown'] == 0.0
+
+    report = risk_manager.get_risk_report()
+    assert risk_manager.metric_recomputes == recomputes + 1
+    assert report['risk_metrics']['max_drawdown'] == pytest.approx(-0.2)
+    # A second read without new trades does not recompute
+    risk_manager.get_risk_report()
+    assert risk_manager.metric_recomputes == recomputes + 1
+
+def test_bulk_and_single_repricing_agree():
+    bulk, single = RiskManager(), RiskManager()
+    for risk_manager in (bulk, single):
+        risk_manager.portfolio_value = 1_000_000
+        for i in range(50):
+            risk_manager.add_position(stock(f'S{i}', 100.0, 100.0 + i % 7))
+    symbols = [f'S{i}' for i in range(0, 50, 3)]
+    prices = [95.0 + i % 11 for i in range(len(symbols))]
+    bulk.update_prices(symbols, prices)
+    for symbol, price in zip(symbols, prices):
+        single.update_position(symbol, price)
+    for name, value in single.risk_metrics.items():
+        assert bulk.risk_metrics[name] == pytest.approx(value)
+
+def test_streamed_trades_move_option_underlyings_not_option_prices():
+    risk_manager = RiskManager()
+    risk_manager.portfolio_value = 1_000_000
+    risk_manager.add_position(option('AAA', 100.0))
+    delta = risk_manager.positions['AAA'].delta
+    risk_manager.on_market_data(['AAA'], [110.0])
+    position = risk_manager.positions['AAA']
+    assert position.current_price == 5.0
+    assert position.underlying_price == 110.0
+    assert position.delta > delta
+
+def candidate(symbol: str, risk: float) -> PositionRisk:
+    """Stock candidate of ten shares at 100 whose stop puts `risk` at stake"""
+    return stock(symbol, 100.0, 100.0, quantity=10, stop=100.0 - risk / 10)
+
+def batch_manager() -> RiskManager:
+    # Limits of 1,000 per position and 2,000 for the portfolio, 500 of it already used
+    risk_manager = RiskManager(max_portfolio_risk=0.02, max_position_risk=0.01)
+    risk_manager.portfolio_value = 100_000
+    risk_manager.add_position(candidate('HELD', 500.0))
+    return risk_manager
+
+def verdicts(results):
+    return [(verdict.symbol, verdict.accepted, verdict.reason) for verdict in results]
+
+def test_batch_check_consumes_the_budget_in_input_order():
+    risk_manager = batch_manager()
+    candidates = [candidate('A', 800.0), candidate('B', 1200.0), candidate('C', 600.0), candidate('D', 200.0),
+                  candidate('E', 50.0)]
+    results = risk_manager.check_positions_batch(candidates)
+    assert verdicts(results) == [
+        ('A', True, 'accepted'),
+        ('B', False, 'position risk exceeds limit'),  # Rejected without using budget
+        ('C', True, 'accepted'),
+        ('D', False, 'portfolio risk limit reached'),
+        ('E', False, 'portfolio risk limit reached')  # Would fit, but comes after the first miss
+    ]
+    assert [verdict.risk_amount for verdict in results] == pytest.approx([800.0, 1200.0, 600.0, 200.0, 50.0])
+    # Nothing is added to the book
+    assert list(risk_manager.positions) == ['HELD']
+    assert risk_manager.total_risk == pytest.approx(500.0)
+
+def test_batch_check_takes_higher_priorities_first():
+    risk_manager = batch_manager()
+    candidates = [candidate('A', 800.0), candidate('C', 600.0), candidate('D', 200.0), candidate('E', 50.0)]
+    results = risk_manager.check_positions_batch(candidates, priorities=[0.1, 0.9, 0.5, 0.5])
+    # C, then D and E (ties keep input order), leave too little budget for A; verdicts stay in input order
+    assert verdicts(results) == [('A', False, 'portfolio risk limit reached'), ('C', True, 'accepted'),
+                                 ('D', True, 'accepted'), ('E', True, 'accepted')]
+
+def test_batch_check_agrees_with_single_checks_until_the_first_miss():
+    rng = np.random.default_rng(4)
+    candidates = [candidate(f'S{i}', risk) for i, risk in enumerate(rng.uniform(10.0, 400.0, 30))]
+    batch = batch_manager().check_positions_batch(candidates)
+    sequential = batch_manager()
+    for candidate_position, verdict in zip(candidates, batch):
+        if not sequential.check_position_risk(candidate_position):
+            break
+        assert verdict.accepted
+        sequential.add_position(candidate_position)
+    assert sum(verdict.accepted for verdict in batch) == len(sequential.positions) - 1
+    assert batch_manager().check_positions_batch([]) == []
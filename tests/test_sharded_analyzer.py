@@ -0,0 +1,89 @@
+import os
+import signal
+import time
+from datetime import datetime, timedelta
+from market_analyzer import MarketAnalyzer
+from sharded_analyzer import ShardedMarketAnalyzer
+
+def test_shard_bars_reach_bar_listeners():
+    bars = []
+    with ShardedMarketAnalyzer(shards=2, analysis_interval=1) as analyzer:
+        analyzer.bar_listeners.append(bars.extend)
+        start = datetime(2026, 1, 5, 10)
+        for second in range(5):
+            analyzer.update_market_data_batch(['AAA', 'BBB'], [100.0 + second, 50.0 + second], [10, 10],
+                                              [start + timedelta(seconds=second)] * 2)
+        deadline = time.monotonic() + 10
+        while len(bars) < 8 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    # Four closed one-second bars per symbol; the last stays open
+    assert sorted((bar.symbol, bar.close) for bar in bars) == [
+        (symbol, base + second) for symbol, base in (('AAA', 100.0), ('BBB', 50.0)) for second in range(4)]
+
+SYMBOLS = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE', 'FFF']
+
+def feed(analyzer, ticks: int = 60):
+    """Trend each symbol up and then sharply down, so RSI and band alerts fire"""
+    start = datetime(2026, 1, 5, 10)
+    for i in range(ticks):
+        prices = [100.0 * (n + 1) + (i if i < 40 else 40 - 3 * (i - 40)) for n in range(len(SYMBOLS))]
+        analyzer.update_market_data_batch(SYMBOLS, prices, [10 + i % 3] * len(SYMBOLS),
+                                          [start + timedelta(seconds=i)] * len(SYMBOLS))
+
+def alert_keys(alerts):
+    return sorted((alert.symbol, alert.alert_type) for alert in alerts)
+
+def test_analysis_round_trip_and_alert_merge_match_in_process_analyzer():
+    local = MarketAnalyzer(history_size=100, analysis_interval=0)
+    feed(local)
+    with ShardedMarketAnalyzer(shards=3, history_size=100, analysis_interval=0) as analyzer:
+        feed(analyzer)
+        # Requests are answered after the shard drains every tick sent before them
+        for symbol in SYMBOLS:
+            analysis = analyzer.get_market_analysis(symbol)
+            expected = local.get_market_analysis(symbol)
+            assert analysis['price_data'] == expected['price_data']
+            assert analysis['technical_indicators'] == expected['technical_indicators']
+        assert analyzer.get_market_analysis('UNKNOWN') == {}
+        expected_alerts = alert_keys(local.get_alerts())
+        deadline = time.monotonic() + 10
+        while len(analyzer.alerts) < len(expected_alerts) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert expected_alerts
+        assert alert_keys(analyzer.get_alerts()) == expected_alerts
+        assert alert_keys(analyzer.get_alerts(symbol='CCC')) == alert_keys(local.get_alerts(symbol='CCC'))
+        # The symbols really were spread over several workers
+        assert sum(1 for shard in analyzer._shards if shard.symbol_count) > 1
+
+def test_stopped_worker_fails_fast():
+    with ShardedMarketAnalyzer(shards=2, ring_capacity=16, request_timeout=1.0, analysis_interval=0) as analyzer:
+        feed(analyzer, 2)
+        shard = analyzer._shards[analyzer._routes['AAA'][0]]
+        shard.process.terminate()
+        shard.process.join(5)
+        started = time.monotonic()
+        assert analyzer.get_market_analysis('AAA') == {}
+        # More ticks than the ring holds: the rest are dropped instead of waiting on the dead worker
+        for i in range(20):
+            analyzer.update_market_data('AAA', 100.0 + i, 1, datetime(2026, 1, 5, 11, 0, i))
+        analyzer.flush_bars()
+        assert time.monotonic() - started < 1.0
+        assert shard.dropped_ticks > 0
+
+def test_stuck_worker_times_out_and_late_reply_is_skipped():
+    with ShardedMarketAnalyzer(shards=1, analysis_interval=0) as analyzer:
+        feed(analyzer, 30)
+        # The first answer also waits for the worker to start, so it gets the default timeout
+        assert analyzer.get_market_analysis('AAA')['price_data']['current_price'] == 129.0
+        analyzer.request_timeout = 0.5
+        shard = analyzer._shards[0]
+        os.kill(shard.process.pid, signal.SIGSTOP)
+        try:
+            started = time.monotonic()
+            assert analyzer.get_market_analysis('AAA') == {}
+            assert time.monotonic() - started < 2.0
+        finally:
+            os.kill(shard.process.pid, signal.SIGCONT)
+        analyzer.update_market_data('AAA', 500.0, 1, datetime(2026, 1, 5, 11))
+        # The reply to the timed-out request arrives first and is discarded
+        assert analyzer.get_market_analysis('AAA')['price_data']['current_price'] == 500.0
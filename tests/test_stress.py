@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from risk_manager import PositionRisk, RiskManager
+
+def option(symbol: str, multiplier: float = 100.0) -> PositionRisk:
+    # No strike or expiry, so the given Greeks are kept
+    return PositionRisk(symbol=symbol, position_size=500.0, entry_price=2.5, current_price=2.5, stop_loss=2.0,
+                        take_profit=4.0, quantity=2, is_option=True, delta=0.5, gamma=0.02, vega=0.1,
+                        theta=-0.05, implied_vol=0.2, underlying_price=100.0, multiplier=multiplier)
+
+def stock(symbol: str) -> PositionRisk:
+    return PositionRisk(symbol=symbol, position_size=10000.0, entry_price=100.0, current_price=100.0,
+                        stop_loss=95.0, take_profit=110.0, quantity=100, is_option=False)
+
+def test_option_coefficients_use_contract_multiplier():
+    manager = RiskManager()
+    manager.add_position(option('OPT'))
+    manager.add_position(stock('STK'))
+    manager.add_position(option('MINI', multiplier=10.0))
+    coefficients = manager._stress_coefficients()
+    rows = manager.book.index
+    # 2 contracts x 100 shares: delta and gamma on 200 x $100 notional, vega per point, theta per day
+    np.testing.assert_allclose(coefficients[rows['OPT']], [10000.0, 20000.0, 400.0, -10.0])
+    np.testing.assert_allclose(coefficients[rows['STK']], [10000.0, 0.0, 0.0, 0.0])
+    np.testing.assert_allclose(coefficients[rows['MINI']], [1000.0, 2000.0, 40.0, -1.0])
+
+def test_stress_grid_prices_option_like_stock_of_same_notional():
+    manager = RiskManager()
+    manager.add_position(option('OPT'))
+    manager.add_position(stock('STK'))
+    grid = manager.stress_grid(underlying_shocks=[0.1], vol_shocks=[0.0], days=[0])
+    rows = manager.book.index
+    assert grid.shape == (2, 1, 1, 1)
+    # Delta-gamma: 10000 * 0.1 + 20000 * 0.01
+    assert grid[rows['OPT']].item() == pytest.approx(1200.0)
+    assert grid[rows['STK']].item() == pytest.approx(1000.0)
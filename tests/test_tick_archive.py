@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+import json
+import numpy as np
+from market_analyzer import MarketAnalyzer
+from tick_archive import RECORD_DTYPE, TickArchive
+
+def test_records_round_trip_through_a_reopened_archive(tmp_path):
+    archive = TickArchive(tmp_path, flush_every=4)
+    archive.append('AAA', 1.0, 10.0, 100)
+    archive.append_many(['AAA', 'BRK B', 'AAA'], [2.0, 2.0, 3.0], [11.0, 300.0, 12.0], [200, 5, 300])
+    # Four records reached flush_every, so they are on disk already
+    assert TickArchive(tmp_path).read('AAA')['price'].tolist() == [10.0, 11.0, 12.0]
+    archive.append('BRK B', 4.0, 301.0, 6)
+    assert len(TickArchive(tmp_path).read('BRK B')) == 1
+    archive.flush()
+
+    reopened = TickArchive(tmp_path)
+    assert sorted(reopened.symbols) == ['AAA', 'BRK B']
+    records = reopened.read('AAA')
+    assert records.dtype == RECORD_DTYPE
+    assert [tuple(record) for record in records] == [(1.0, 10.0, 100.0), (2.0, 11.0, 200.0), (3.0, 12.0, 300.0)]
+    assert reopened.read('AAA', 2)['timestamp'].tolist() == [2.0, 3.0]
+    assert reopened.read('BRK B')['price'].tolist() == [300.0, 301.0]
+    assert len(reopened.read('UNKNOWN')) == 0
+
+def test_partial_record_from_an_interrupted_write_is_ignored_and_overwritten(tmp_path):
+    archive = TickArchive(tmp_path)
+    archive.append('AAA', 1.0, 10.0, 1)
+    archive.flush()
+    path = tmp_path / archive._files['AAA']
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 5)
+    assert TickArchive(tmp_path).read('AAA')['price'].tolist() == [10.0]
+    archive.append('AAA', 2.0, 11.0, 1)
+    archive.flush()
+    assert path.stat().st_size == 2 * RECORD_DTYPE.itemsize
+    assert TickArchive(tmp_path).read('AAA')['price'].tolist() == [10.0, 11.0]
+
+def test_incompatible_index_is_ignored(tmp_path):
+    archive = TickArchive(tmp_path)
+    archive.append('AAA', 1.0, 10.0, 1)
+    archive.flush()
+    index = json.loads((tmp_path / 'index.json').read_text())
+    (tmp_path / 'index.json').write_text(json.dumps(dict(index, version=index['version'] + 1)))
+    assert TickArchive(tmp_path).symbols == []
+
+START = datetime(2026, 1, 5, 10)
+
+def feed(analyzer: MarketAnalyzer, ticks: range):
+    for i in ticks:
+        prices = [100.0 + np.sin(i / 5) * 5 + i * 0.1, 50.0 + np.cos(i / 3) * 2]
+        analyzer.update_market_data_batch(['AAA', 'BBB'], prices, [10 + i % 7, 20 + i % 3],
+                                          [START + timedelta(seconds=i)] * 2)
+
+def test_warm_start_restores_the_same_analysis(tmp_path):
+    live = MarketAnalyzer(history_size=50, analysis_interval=0, archive=TickArchive(tmp_path))
+    feed(live, range(120))
+    live.archive.flush()
+
+    restarted = MarketAnalyzer(history_size=50, analysis_interval=0, archive=TickArchive(tmp_path))
+    assert restarted.warm_start() == 2
+    for symbol in ('AAA', 'BBB'):
+        # Only the last history_size records are loaded
+        assert len(restarted.price_history[symbol]) == 50
+        restored, expected = restarted.get_market_analysis(symbol), live.get_market_analysis(symbol)
+        assert restored['price_data'] == expected['price_data']
+        assert restored['technical_indicators'] == expected['technical_indicators']
+
+    # Streaming indicator state matches an analyzer fed the restored records live
+    replayed = MarketAnalyzer(history_size=50, analysis_interval=0)
+    feed(replayed, range(70, 130))
+    feed(restarted, range(120, 130))
+    rows = np.array([replayed.store.rows['AAA'], replayed.store.rows['BBB']])
+    np.testing.assert_allclose(restarted.engine.rsi(rows), replayed.engine.rsi(rows))
+    np.testing.assert_allclose(restarted.engine.macd(rows)['macd'], replayed.engine.macd(rows)['macd'])
+    np.testing.assert_allclose(restarted.engine.bollinger_bands(rows)['upper'],
+                               replayed.engine.bollinger_bands(rows)['upper'])
+
+def test_warm_start_without_an_archive_restores_nothing():
+    assert MarketAnalyzer(analysis_interval=0).warm_start() == 0
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from market_analyzer import MarketAnalyzer
+from tick_store import TickStore
+
+def fill(store: TickStore, row: int, values):
+    for i, value in enumerate(values):
+        store.append(row, float(i), float(value), 1.0)
+
+def test_window_after_wraparound_is_contiguous_and_ordered():
+    store = TickStore(capacity=4)
+    row = store.row('AAA')
+    fill(store, row, range(10))
+    np.testing.assert_array_equal(store.prices(row), [6.0, 7.0, 8.0, 9.0])
+    np.testing.assert_array_equal(store.window(row, 'price', 2), [8.0, 9.0])
+    assert store.count(row) == 4 and store.total(row) == 10
+    assert store.last(row, 'price') == 9.0 and store.last(row, 'price', 3) == 6.0
+    with pytest.raises(IndexError):
+        store.last(row, 'price', 4)
+
+def test_windows_are_views_valid_until_next_append():
+    store = TickStore(capacity=4)
+    row = store.row('AAA')
+    fill(store, row, range(4))
+    view = store.prices(row)
+    kept = view.copy()
+    assert not view.flags.writeable
+    for i in range(4):
+        store.append(row, 10.0 + i, 100.0 + i, 1.0)
+    # The view aliases overwritten slots; the copy does not
+    np.testing.assert_array_equal(view, [100.0, 101.0, 102.0, 103.0])
+    np.testing.assert_array_equal(kept, [0.0, 1.0, 2.0, 3.0])
+
+def test_partial_window_before_wraparound():
+    store = TickStore(capacity=5)
+    row = store.row('AAA')
+    fill(store, row, [1, 2, 3])
+    np.testing.assert_array_equal(store.prices(row), [1.0, 2.0, 3.0])
+    np.testing.assert_array_equal(store.prices(row, 10), [1.0, 2.0, 3.0])
+
+def test_load_keeps_last_capacity_values():
+    store = TickStore(capacity=3)
+    row = store.row('AAA')
+    values = np.arange(5, dtype=np.float64)
+    store.load(row, values, values * 10, values)
+    np.testing.assert_array_equal(store.prices(row), [20.0, 30.0, 40.0])
+    store.append(row, 5.0, 50.0, 1.0)
+    np.testing.assert_array_equal(store.prices(row), [30.0, 40.0, 50.0])
+
+def test_history_view_is_a_snapshot():
+    analyzer = MarketAnalyzer(history_size=30, analysis_interval=0)
+    start = datetime(2026, 1, 5, 10)
+    for i in range(30):
+        analyzer.update_market_data('AAA', 100.0 + i, 10, start + timedelta(seconds=i))
+    history = analyzer.price_history['AAA']
+    for i in range(30):
+        analyzer.update_market_data('AAA', 200.0 + i, 10, start + timedelta(seconds=30 + i))
+    assert history['price'].tolist() == [100.0 + i for i in range(30)]
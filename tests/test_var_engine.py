@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from tick_archive import TickArchive
+from var_engine import VaREngine
+
+SYMBOLS = ['AAA', 'BBB', 'CCC']
+
+def known_prices(periods: int = 80, seed: int = 5) -> np.ndarray:
+    returns = np.random.default_rng(seed).normal(0.0, 0.01, (periods, len(SYMBOLS)))
+    return 100.0 * np.cumprod(1 + np.vstack([np.zeros(len(SYMBOLS)), returns]), axis=0)
+
+def fed_engine(prices: np.ndarray, **kwargs) -> VaREngine:
+    engine = VaREngine(**kwargs)
+    for row in prices:
+        engine.add_prices(dict(zip(SYMBOLS, row)))
+    return engine
+
+def test_historical_var_matches_numpy_percentile():
+    prices = known_prices()
+    exposures = np.array([10000.0, -5000.0, 2500.0])
+    engine = fed_engine(prices, window=50, confidence=0.95)
+    # The first period has no previous price, so its returns are zero; the window keeps the last 50
+    returns = (prices[1:] / prices[:-1] - 1)[-50:]
+    pnl = returns @ exposures
+    expected = -np.percentile(pnl, 5)
+    result = engine.value_at_risk(SYMBOLS, exposures, 'historical')
+    assert result['value_at_risk'] == pytest.approx(expected)
+    assert result['conditional_value_at_risk'] == pytest.approx(-pnl[pnl <= -expected].mean())
+    assert result['var_observations'] == 50
+
+def test_monte_carlo_var_matches_numpy_simulation():
+    prices = known_prices()
+    exposures = np.array([10000.0, 4000.0, -3000.0])
+    engine = fed_engine(prices, window=60, simulations=20000, seed=9)
+    returns = (prices[1:] / prices[:-1] - 1)[-60:]
+    factor = np.linalg.cholesky(np.cov(returns, rowvar=False))
+    pnl = np.random.default_rng(9).standard_normal((20000, len(SYMBOLS))) @ (factor.T @ exposures)
+    result = engine.value_at_risk(SYMBOLS, exposures, 'monte_carlo')
+    assert result['value_at_risk'] == pytest.approx(-np.percentile(pnl, 5))
+
+def test_no_var_before_min_observations():
+    engine = fed_engine(known_prices(10), min_observations=30)
+    assert engine.value_at_risk(SYMBOLS, [1.0, 1.0, 1.0]) is None
+
+def stream(engine: VaREngine, prices: np.ndarray, interval: int):
+    """Send each period's prices as a few trades inside one bar of `interval` seconds"""
+    for period, row in enumerate(prices):
+        start = period * interval
+        for offset, scale in ((1, 0.99), (interval // 2, 1.01), (interval - 1, 1.0)):
+            engine.on_market_data(SYMBOLS, row * scale, [1] * len(SYMBOLS), [start + offset] * len(SYMBOLS))
+
+def test_streamed_trades_build_bars_of_the_var_interval():
+    prices = known_prices(60)
+    engine = VaREngine(window=100, bar_interval=60)
+    stream(engine, prices, 60)
+    # The last bars are still open or pending
+    direct = fed_engine(prices[:-engine.pending_periods - 1], window=100)
+    assert engine.observations == direct.observations
+    exposures = np.array([1000.0, 2000.0, 3000.0])
+    assert engine.value_at_risk(SYMBOLS, exposures) == pytest.approx(direct.value_at_risk(SYMBOLS, exposures))
+
+def test_warm_start_restores_history_from_archived_ticks(tmp_path):
+    prices = known_prices(60)
+    archive = TickArchive(tmp_path)
+    for period, row in enumerate(prices):
+        for offset, scale in ((1, 0.99), (59, 1.0)):
+            archive.append_many(SYMBOLS, [period * 60 + offset] * len(SYMBOLS), row * scale, [1] * len(SYMBOLS))
+    archive.flush()
+
+    engine = VaREngine(window=40, bar_interval=60)
+    restored = engine.warm_start([TickArchive(tmp_path)])
+    # Only records recent enough for the window are read, and the newest periods stay pending
+    assert 40 <= restored < len(prices) - engine.pending_periods
+    last = len(prices) - 1 - engine.pending_periods
+    direct = fed_engine(prices[:last + 1], window=40)
+    np.testing.assert_allclose(engine._sample(), direct._sample())
+    exposures = np.array([1000.0, -2000.0, 3000.0])
+    assert engine.value_at_risk(SYMBOLS, exposures) == pytest.approx(direct.value_at_risk(SYMBOLS, exposures))
+
+    # Live trades continue from the restored periods
+    for period in (len(prices), len(prices) + 1):
+        engine.on_market_data(SYMBOLS, prices[-1] * 1.01, [1] * len(SYMBOLS), [period * 60 + 1] * len(SYMBOLS))
+    assert engine.observations == restored + 1
@@ -0,0 +1,113 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import mmap
+import os
+import re
+import zlib
+import numpy as np
+from loguru import logger
+
+RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('price', '<f8'), ('volume', '<f8')])
+ARCHIVE_VERSION = 1
+_DTYPE_DESCR = [list(field) for field in RECORD_DTYPE.descr]
+
+class TickArchive:
+    """Append-only on-disk archive of market data records, one file per symbol.
+
+    Each symbol file is a flat array of fixed-width RECORD_DTYPE records, so the
+    record count follows from the file size and reads are zero-copy memory maps.
+    `index.json` maps symbols to file names. Appends are buffered in memory and
+    written every `flush_every` records or on `flush`.
+    """
+
+    def __init__(self, directory: Path, flush_every: int = 10000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self._index_path = self.directory / "index.json"
+        self._files: Dict[str, str] = {}
+        self._pending: Dict[str, List[Tuple[float, float, float]]] = {}
+        self._pending_count = 0
+        self._load_index()
+
+    def _load_index(self):
+        if not self._index_path.exists():
+            return
+        try:
+            index = json.loads(self._index_path.read_text())
+            if index.get('version') != ARCHIVE_VERSION or index.get('dtype') != _DTYPE_DESCR:
+                logger.warning(f"Ignoring archive index with incompatible format in {self.directory}")
+                return
+            self._files = index['symbols']
+        except (ValueError, KeyError) as e:
+            logger.error(f"Error reading archive index {self._index_path}: {e}")
+
+    def _write_index(self):
+        tmp_path = self._index_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({
+            'version': ARCHIVE_VERSION,
+            'dtype': _DTYPE_DESCR,
+            'symbols': self._files
+        }))
+        os.replace(tmp_path, self._index_path)
+
+    @staticmethod
+    def _file_name(symbol: str) -> str:
+        safe = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return f"{safe}-{zlib.crc32(symbol.encode()):08x}.bin"
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._files)
+
+    def append(self, symbol: str, timestamp: float, price: float, volume: float):
+        """Buffer one record for a symbol"""
+        self._pending.setdefault(symbol, []).append((timestamp, price, volume))
+        self._pending_count += 1
+        if self._pending_count >= self.flush_every:
+            self.flush()
+
+    def append_many(self, symbols: Iterable[str], timestamps, prices, volumes):
+        """Buffer one record per symbol"""
+        for symbol, timestamp, price, volume in zip(symbols, timestamps, prices, volumes):
+            self._pending.setdefault(symbol, []).append((timestamp, price, volume))
+            self._pending_count += 1
+        if self._pending_count >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write buffered records to disk"""
+        new_symbols = False
+        for symbol, records in self._pending.items():
+            name = self._files.get(symbol)
+            if name is None:
+                name = self._files[symbol] = self._file_name(symbol)
+                new_symbols = True
+            with open(self.directory / name, 'ab') as f:
+                # Drop a partial record left by an interrupted write so records stay aligned
+                partial = f.seek(0, os.SEEK_END) % RECORD_DTYPE.itemsize
+                if partial:
+                    f.truncate(f.tell() - partial)
+                np.array(records, dtype=RECORD_DTYPE).tofile(f)
+        self._pending.clear()
+        self._pending_count = 0
+        if new_symbols:
+            self._write_index()
+
+    def read(self, symbol: str, n: Optional[int] = None) -> np.ndarray:
+        """Read-only memory-mapped view of the last n flushed records for a symbol"""
+        name = self._files.get(symbol)
+        path = self.directory / name if name else None
+        if path is None or not path.exists():
+            return np.empty(0, dtype=RECORD_DTYPE)
+        # A crash during a write can leave a partial record at the end; ignore it
+        count = path.stat().st_size // RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        first = 0 if n is None else max(count - n, 0)
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), count * RECORD_DTYPE.itemsize, access=mmap.ACCESS_READ)
+        # The returned array keeps the mapping alive; the file itself can be closed
+        return np.frombuffer(mapped, dtype=RECORD_DTYPE, count=count - first,
+                             offset=first * RECORD_DTYPE.itemsize)
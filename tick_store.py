@@ -0,0 +1,157 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import numpy as np
+
+class TickStore:
+    """Fixed-capacity columnar ring buffers for market data, one row per symbol.
+
+    Each field (timestamp, price, volume) is a ``(symbols, 2 * capacity)`` array.
+    Every value is written twice, at ``slot`` and ``slot + capacity``, so the most
+    recent ``n <= capacity`` values of a row are always one contiguous slice and
+    windows can be handed out as views without copying. A view aliases ring
+    slots that later appends overwrite, so it is only valid until the row's next
+    append or load; callers that keep values longer must copy them.
+    """
+
+    FIELDS = ('timestamp', 'price', 'volume')
+
+    def __init__(self, capacity: int = 1000, initial_symbols: int = 16):
+        if capacity < 2:
+            raise ValueError("TickStore capacity must be at least 2")
+        self.capacity = capacity
+        self.rows: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        size = max(initial_symbols, 1)
+        self._data = {
+            field: np.zeros((size, 2 * capacity), dtype=np.float64)
+            for field in self.FIELDS
+        }
+        # Total number of values ever appended to each row
+        self._total = np.zeros(size, dtype=np.int64)
+        # Per-row version, bumped on every append (used for cache invalidation)
+        self.versions = np.zeros(size, dtype=np.int64)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.rows
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def allocated_rows(self) -> int:
+        return len(self._total)
+
+    def row(self, symbol: str) -> int:
+        """Get the row for a symbol, allocating one if needed"""
+        row = self.rows.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            if row >= self.allocated_rows:
+                self._grow(row + 1)
+            self.rows[symbol] = row
+            self.symbols.append(symbol)
+        return row
+
+    def reserve(self, rows: int):
+        """Preallocate space for at least `rows` symbols"""
+        if rows > self.allocated_rows:
+            self._grow(rows)
+
+    def rows_for(self, symbols: Iterable[str]) -> np.ndarray:
+        """Get rows for many symbols, allocating missing ones"""
+        return np.fromiter((self.row(symbol) for symbol in symbols), dtype=np.int64)
+
+    def _grow(self, min_rows: int):
+        """Double the number of allocated rows until min_rows fit"""
+        size = self.allocated_rows
+        while size < min_rows:
+            size *= 2
+        for field, data in self._data.items():
+            grown = np.zeros((size, data.shape[1]), dtype=data.dtype)
+            grown[:data.shape[0]] = data
+            self._data[field] = grown
+        self._total = np.concatenate([self._total, np.zeros(size - len(self._total), dtype=np.int64)])
+        self.versions = np.concatenate([self.versions, np.zeros(size - len(self.versions), dtype=np.int64)])
+
+    def append(self, row, timestamp, price, volume):
+        """Append one value to a row in O(1); also accepts arrays of distinct rows"""
+        slot = self._total[row] % self.capacity
+        for field, value in (('timestamp', timestamp), ('price', price), ('volume', volume)):
+            data = self._data[field]
+            data[row, slot] = value
+            data[row, slot + self.capacity] = value
+        self._total[row] += 1
+        self.versions[row] += 1
+
+    def load(self, row: int, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+        """Replace a row's contents with the last `capacity` of the given values"""
+        n = min(len(prices), self.capacity)
+        for field, values in (('timestamp', timestamps), ('price', prices), ('volume', volumes)):
+            data = self._data[field]
+            data[row, :n] = values[len(values) - n:]
+            data[row, self.capacity:self.capacity + n] = data[row, :n]
+        self._total[row] = n
+        self.versions[row] += 1
+
+    def count(self, row: int) -> int:
+        """Number of values currently held for a row"""
+        return int(min(self._total[row], self.capacity))
+
+    def totals(self, rows) -> np.ndarray:
+        """Number of values ever appended for an array of rows"""
+        return self._total[rows]
+
+    def counts(self, rows) -> np.ndarray:
+        """Number of values currently held for an array of rows"""
+        return np.minimum(self._total[rows], self.capacity)
+
+    def total(self, row: int) -> int:
+        """Number of values ever appended to a row"""
+        return int(self._total[row])
+
+    def back(self, rows, field: str, back: int):
+        """Value `back` steps before the newest one for one row or an array of rows (unchecked)"""
+        end = (self._total[rows] - 1) % self.capacity + self.capacity
+        return self._data[field][rows, end - back]
+
+    def _bounds(self, row: int, n: Optional[int]) -> Tuple[int, int]:
+        total = self._total[row]
+        held = min(total, self.capacity)
+        n = held if n is None else min(n, held)
+        # The newest value lives at slot + capacity, so the window ends right after it
+        end = int((total - 1) % self.capacity + self.capacity + 1) if total else self.capacity
+        return end - n, end
+
+    def window(self, row: int, field: str, n: Optional[int] = None) -> np.ndarray:
+        """Zero-copy read-only view of the last n values of a field (oldest first), valid until the next append"""
+        start, end = self._bounds(row, n)
+        view = self._data[field][row, start:end]
+        view.flags.writeable = False
+        return view
+
+    def last(self, row: int, field: str, back: int = 0) -> float:
+        """Value `back` steps before the newest one"""
+        start, end = self._bounds(row, None)
+        if back >= end - start:
+            raise IndexError(f"Only {end - start} values held")
+        return float(self._data[field][row, end - 1 - back])
+
+    # Views, like window
+    def timestamps(self, row: int, n: Optional[int] = None) -> np.ndarray:
+        return self.window(row, 'timestamp', n)
+
+    def prices(self, row: int, n: Optional[int] = None) -> np.ndarray:
+        return self.window(row, 'price', n)
+
+    def volumes(self, row: int, n: Optional[int] = None) -> np.ndarray:
+        return self.window(row, 'volume', n)
+
+_EPOCH = datetime(1970, 1, 1)
+
+def to_epoch_seconds(timestamp) -> float:
+    """Convert a datetime (naive datetimes keep their wall-clock time) or number to float seconds"""
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is not None:
+            return timestamp.timestamp()
+        return (timestamp - _EPOCH).total_seconds()
+    return float(timestamp)
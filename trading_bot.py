@@ -1,40 +1,162 @@
 from ibapi.client import EClient
 from ibapi.wrapper import EWrapper
-from ibapi.contract import Contract
+from ibapi.contract import Contract, ContractDetails
+from ibapi.execution import Execution
 from ibapi.order import Order
+from ibapi.order_state import OrderState
+from ibapi.common import TickAttrib
+from concurrent.futures import Future
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 from loguru import logger
+import itertools
 import threading
 import time
-from config import IB_PORT, IB_HOST, IB_CLIENT_ID, LOG_FILE, LOG_LEVEL
+import numpy as np
+from account_data import AccountManager
+from contract_cache import ContractCache, contract_key
+from market_data import MarketDataManager
+from order_scheduler import OrderScheduler, CANCEL, STOP, ORDER, DATA
+from strategy import TradeSignal
+from config import (IB_PORT, IB_HOST, IB_CLIENT_ID, IB_CONNECT_TIMEOUT, IB_MAX_MESSAGES_PER_SECOND,
+                    IB_RECONNECT, IB_RECONNECT_MAX_DELAY,
+                    CONTRACT_CACHE_FILE, CONTRACT_CACHE_TTL_DAYS, CONTRACT_FAILURE_TTL_MINUTES,
+                    MARKET_DATA_LINES, MARKET_DATA_BATCH_INTERVAL,
+                    LOG_FILE, LOG_LEVEL)
 from datetime import datetime, timedelta
 
 # Configure logging
 logger.add(LOG_FILE, rotation="1 day", level=LOG_LEVEL)
 
+SUBMITTED_STATUSES = {'PreSubmitted', 'Submitted'}
+FINAL_STATUSES = {'Filled', 'Cancelled', 'ApiCancelled', 'Inactive', 'Rejected'}
+# Data request IDs start far above order IDs so errors route unambiguously
+REQUEST_ID_START = 1 << 30
+RESYNC_STEPS = ('open_orders', 'positions', 'account')
+
+@dataclass
+class OrderUpdate:
+    order_id: int
+    status: str  # IB order status, or 'Rejected' for orders refused with an error
+    filled: float = 0.0
+    avg_fill_price: float = 0.0
+    latency: float = 0.0  # Seconds from placement to this status
+    message: str = ''
+
+@dataclass
+class ResyncSnapshot:
+    """Broker state downloaded after a (re)connect"""
+    open_orders: Dict[int, Tuple[Contract, Order, str]] = field(default_factory=dict)  # Order ID -> (contract, order, status)
+    positions: Dict[str, Tuple[float, float]] = field(default_factory=dict)  # Symbol -> (quantity, average cost)
+    market_prices: Dict[str, float] = field(default_factory=dict)  # Symbol -> portfolio mark price
+    account_values: Dict[str, str] = field(default_factory=dict)
+    complete: bool = False  # Every download finished before the timeout
+    elapsed: float = 0.0  # Seconds the resync took
+
+@dataclass
+class _PendingOrder:
+    contract: Contract
+    order: Order
+    future: Future
+    wait_for: str
+    sent_at: float
+    acknowledged: bool = False
+
 class TradingBot(EWrapper, EClient):
-    def __init__(self):
+    """Interactive Brokers client.
+
+    Connecting waits for the nextValidId handshake instead of a fixed delay.
+    Orders placed through submit_order are tracked until they are filled,
+    cancelled or rejected; each returns a Future that resolves with an
+    OrderUpdate once the order reaches the requested stage (orderStatus, openOrder,
+    execDetails and order errors all feed it), so callers can place many orders
+    without blocking. Acknowledgement and fill latencies are recorded. Order IDs
+    are allocated under a lock, so any thread may place orders. Once connected,
+    outgoing orders and cancels go through a paced priority queue (`scheduler`)
+    that keeps the client under the TWS message-rate limit.
+
+    Contracts are resolved to a conId once through reqContractDetails and kept in
+    a persistent ContractCache; create_stock_contract and create_option_contract
+    return the cached contract when there is one.
+
+    Streaming market data subscriptions and their tick callbacks are handled by
+    `market_data`, which hands conflated trade batches to its listeners off the
+    reader thread. Account summary values and P&L stream into
+    `account_summary` through `account_data`, which also pushes net liquidation
+    changes to its listeners.
+
+    After an unexpected disconnect a supervisor thread reconnects with
+    exponential backoff and then resyncs: open orders, positions and account
+    updates are requested together, tracked orders IB no longer knows are
+    marked Inactive, market data lines are re-requested in one burst, and the
+    resulting ResyncSnapshot goes to `resync_listeners` (see reconcile_state).
+    The time from the start of reconnecting to trading-ready is recorded.
+    """
+
+    def __init__(self, contract_cache: Optional[ContractCache] = None):
         EClient.__init__(self, self)
         self.next_order_id = None
         self.connected = False
         self.account_summary = {}
+        self._ready = threading.Event()
+        self._id_lock = threading.Lock()
+        self.scheduler = OrderScheduler(rate=IB_MAX_MESSAGES_PER_SECOND)
+        self._orders_lock = threading.Lock()
+        self._pending_orders: Dict[int, _PendingOrder] = {}
+        # Seconds from placement to the first status, and to the fill
+        self.ack_latencies: Deque[float] = deque(maxlen=1000)
+        self.fill_latencies: Deque[float] = deque(maxlen=1000)
+        self.contract_cache = (contract_cache if contract_cache is not None
+                               else ContractCache(CONTRACT_CACHE_FILE, CONTRACT_CACHE_TTL_DAYS, CONTRACT_FAILURE_TTL_MINUTES))
+        self._request_ids = itertools.count(REQUEST_ID_START)
+        # Request ID -> (spec, matching contracts so far, future)
+        self._contract_requests: Dict[int, Tuple[Contract, List[Contract], Future]] = {}
+        self._resolving: Dict[tuple, Future] = {}  # In-flight lookups by contract key
+        self.market_data = MarketDataManager(self, max_lines=MARKET_DATA_LINES,
+                                             batch_interval=MARKET_DATA_BATCH_INTERVAL)
+        self.accounts: List[str] = []
+        self.account_data = AccountManager(self)
+        self.auto_reconnect = IB_RECONNECT
+        self.reconnect_delay = 0.5  # Seconds before the second attempt; doubles per failure
+        self.max_reconnect_delay = IB_RECONNECT_MAX_DELAY
+        self.reconnects = 0
+        self.time_to_ready: Deque[float] = deque(maxlen=100)  # Seconds from connection loss handling to resynced
+        self.resync_listeners: List[Callable[[ResyncSnapshot], None]] = []
+        self._reader: Optional[threading.Thread] = None
+        self._supervisor: Optional[threading.Thread] = None
+        self._closing = threading.Event()  # Set by close() so an intentional shutdown is not retried
+        self._resync: Optional[ResyncSnapshot] = None
+        self._resync_steps: Dict[str, threading.Event] = {}
         
-    def connect_to_ib(self):
+    def connect_to_ib(self, timeout: float = IB_CONNECT_TIMEOUT):
         """Connect to Interactive Brokers TWS or IB Gateway"""
+        self._closing.clear()
+        return self._connect_session(timeout)
+
+    def _connect_session(self, timeout: float = IB_CONNECT_TIMEOUT) -> bool:
         try:
+            self._ready.clear()
             self.connect(IB_HOST, IB_PORT, IB_CLIENT_ID)
             logger.info(f"Connecting to IB on {IB_HOST}:{IB_PORT} with client ID {IB_CLIENT_ID}")
+            if not self.isConnected():
+                logger.error("Failed to connect to Interactive Brokers: socket connection refused")
+                return False
             
             # Start the connection in a separate thread
-            thread = threading.Thread(target=self.run)
-            thread.start()
+            self._reader = threading.Thread(target=self.run)
+            self._reader.start()
             
-            # Wait for connection
-            time.sleep(1)
-            if self.connected:
+            # The handshake is complete once IB sends the next valid order ID
+            if self._ready.wait(timeout):
                 logger.info("Successfully connected to Interactive Brokers")
+                self.scheduler.start()
+                self.market_data.start()
+                self.account_data.subscribe()
                 return True
             else:
-                logger.error("Failed to connect to Interactive Brokers")
+                logger.error(f"Failed to connect to Interactive Brokers: no handshake within {timeout}s")
+                EClient.disconnect(self)
                 return False
                 
         except Exception as e:
@@ -44,17 +166,285 @@ class TradingBot(EWrapper, EClient):
     def nextValidId(self, orderId: int):
         """Callback when the next valid order ID is received"""
         super().nextValidId(orderId)
-        self.next_order_id = orderId
+        with self._id_lock:
+            # Never hand out an ID twice if IB resends a lower one
+            self.next_order_id = orderId if self.next_order_id is None else max(self.next_order_id, orderId)
+        self.connected = True
+        self._ready.set()
         logger.info(f"Next valid order ID: {orderId}")
 
     def error(self, reqId, errorCode, errorString):
         """Callback for error messages"""
         logger.error(f"Error {errorCode}: {errorString}")
+        if reqId in self._contract_requests:
+            # 200: no security definition matches the spec
+            self._finish_contract_request(reqId, failed=errorCode == 200)
+            return
+        if self.account_data.owns(reqId):
+            if not 2100 <= errorCode < 2200:
+                self.account_data.on_error(reqId, errorCode)
+            return
+        if self.market_data.owns(reqId):
+            # 10167: delayed data is shown instead of live data, which still streams
+            if errorCode != 10167 and not 2100 <= errorCode < 2200:
+                self.market_data.on_error(reqId, errorCode)
+            return
+        # Errors for a tracked order reject it, apart from warnings and informational codes
+        if reqId in self._pending_orders and errorCode != 399 and not 2100 <= errorCode < 2200:
+            self._update_order(reqId, 'Cancelled' if errorCode == 202 else 'Rejected',
+                               message=f"Error {errorCode}: {errorString}")
 
     def connectionClosed(self):
         """Callback when the connection is closed"""
         logger.info("Connection closed")
+        was_connected = self.connected
         self.connected = False
+        self._ready.clear()
+        # Queued messages wait for the next session instead of going to a closed socket
+        self.scheduler.pause()
+        # Only a lost session is retried, not a failed first connect or a close() call
+        if was_connected and self.auto_reconnect and not self._closing.is_set():
+            if self._supervisor is None or not self._supervisor.is_alive():
+                self._supervisor = threading.Thread(target=self._reconnect_loop, daemon=True)
+                self._supervisor.start()
+
+    def _reconnect_loop(self):
+        """Reconnect with exponential backoff, then resync"""
+        started = time.monotonic()
+        delay = self.reconnect_delay
+        attempt = 0
+        while not self._closing.is_set():
+            # The old reader thread resets the client after connectionClosed returns
+            if self._reader is not None and self._reader is not threading.current_thread():
+                self._reader.join(IB_CONNECT_TIMEOUT)
+            attempt += 1
+            if self._connect_session():
+                snapshot = self.resync()
+                elapsed = time.monotonic() - started
+                self.reconnects += 1
+                self.time_to_ready.append(elapsed)
+                logger.info(f"Reconnected after {attempt} attempt(s); trading-ready in {elapsed:.3f}s "
+                            f"(resync {snapshot.elapsed:.3f}s)")
+                return
+            logger.warning(f"Reconnect attempt {attempt} failed, retrying in {delay:.1f}s")
+            if self._closing.wait(delay):
+                return
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def resync(self, timeout: float = IB_CONNECT_TIMEOUT) -> ResyncSnapshot:
+        """Download open orders, positions and account values and restore market data.
+
+        The three downloads are in flight at once and the market data lines are
+        re-requested in the same burst. Tracked orders that were sent before the
+        resync and are not open any more are marked Inactive. The snapshot is
+        passed to every resync listener.
+        """
+        started = time.monotonic()
+        snapshot = self._resync = ResyncSnapshot()
+        self._resync_steps = {step: threading.Event() for step in RESYNC_STEPS}
+        account = self.accounts[0] if self.accounts else ''
+        for send in (self.reqOpenOrders, self.reqPositions, lambda: self.reqAccountUpdates(True, account)):
+            self.scheduler.submit(send, DATA)
+        resubscribed = self.market_data.resubscribe()
+        deadline = started + timeout
+        snapshot.complete = all(self._resync_steps[step].wait(max(deadline - time.monotonic(), 0.0))
+                                for step in RESYNC_STEPS)
+        self._resync = None
+        # Positions and account values were only needed for the snapshot
+        self.scheduler.submit(self.cancelPositions, DATA)
+        self.scheduler.submit(lambda: self.reqAccountUpdates(False, account), DATA)
+        if snapshot.complete:
+            with self._orders_lock:
+                missing = [order_id for order_id, pending in self._pending_orders.items()
+                           if pending.sent_at < started and order_id not in snapshot.open_orders]
+            for order_id in missing:
+                self._update_order(order_id, 'Inactive', message='Not open after reconnect')
+        else:
+            logger.error(f"Resync incomplete after {timeout}s; orders and positions not reconciled")
+        snapshot.elapsed = time.monotonic() - started
+        logger.info(f"Resynced {len(snapshot.open_orders)} open orders, {len(snapshot.positions)} positions "
+                    f"and {resubscribed} market data lines in {snapshot.elapsed:.3f}s")
+        for listener in self.resync_listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Error in resync listener: {e}")
+        return snapshot
+
+    def _resync_step_done(self, step: str):
+        event = self._resync_steps.get(step)
+        if event is not None:
+            event.set()
+
+    def connection_metrics(self) -> Dict[str, float]:
+        """Reconnect count and the last and worst time to trading-ready in seconds"""
+        return {
+            'connected': self.connected,
+            'reconnects': self.reconnects,
+            'last_time_to_ready': self.time_to_ready[-1] if self.time_to_ready else 0.0,
+            'max_time_to_ready': max(self.time_to_ready, default=0.0)
+        }
+
+    def managedAccounts(self, accountsList: str):
+        """Callback with the accounts this login can trade, sent on connect"""
+        self.accounts = [account for account in accountsList.split(',') if account]
+        self.account_data.on_accounts(self.accounts)
+
+    def orderStatus(self, orderId: int, status: str, filled: float, remaining: float, avgFillPrice: float,
+                    permId: int, parentId: int, lastFillPrice: float, clientId: int, whyHeld: str,
+                    mktCapPrice: float):
+        """Callback for order status changes"""
+        self._update_order(orderId, status, float(filled), float(avgFillPrice))
+
+    def openOrder(self, orderId: int, contract: Contract, order: Order, orderState: OrderState):
+        """Callback for open orders, sent when an order is accepted and on request"""
+        snapshot = self._resync
+        if snapshot is not None:
+            snapshot.open_orders[orderId] = (contract, order, orderState.status)
+        self._update_order(orderId, orderState.status)
+
+    def openOrderEnd(self):
+        """Callback after the last open order of a reqOpenOrders download"""
+        self._resync_step_done('open_orders')
+
+    def position(self, account: str, contract: Contract, position: float, avgCost: float):
+        """Callback with one position of a reqPositions download"""
+        snapshot = self._resync
+        if snapshot is not None:
+            snapshot.positions[contract.symbol] = (float(position), float(avgCost))
+
+    def positionEnd(self):
+        """Callback after the last position of a reqPositions download"""
+        self._resync_step_done('positions')
+
+    def updatePortfolio(self, contract: Contract, position: float, marketPrice: float, marketValue: float,
+                        averageCost: float, unrealizedPNL: float, realizedPNL: float, accountName: str):
+        """Callback with a portfolio position's mark price from reqAccountUpdates"""
+        snapshot = self._resync
+        if snapshot is not None and marketPrice > 0:
+            snapshot.market_prices[contract.symbol] = float(marketPrice)
+
+    def updateAccountValue(self, key: str, val: str, currency: str, accountName: str):
+        """Callback with an account value from reqAccountUpdates"""
+        snapshot = self._resync
+        if snapshot is not None:
+            snapshot.account_values[key] = val
+
+    def accountSummary(self, reqId: int, account: str, tag: str, value: str, currency: str):
+        """Callback with an account summary value, streamed on every change"""
+        self.account_data.on_account_summary(reqId, account, tag, value, currency)
+
+    def pnl(self, reqId: int, dailyPnL: float, unrealizedPnL: float, realizedPnL: float):
+        """Callback with the account's daily, unrealized and realized P&L"""
+        self.account_data.on_pnl(reqId, dailyPnL, unrealizedPnL, realizedPnL)
+
+    def accountDownloadEnd(self, accountName: str):
+        """Callback after the account and portfolio values of reqAccountUpdates"""
+        self._resync_step_done('account')
+
+    def execDetails(self, reqId: int, contract: Contract, execution: Execution):
+        """Callback for executions; the last one of an order completes its fill"""
+        pending = self._pending_orders.get(execution.orderId)
+        if pending is not None and float(execution.cumQty) >= float(pending.order.totalQuantity):
+            self._update_order(execution.orderId, 'Filled', float(execution.cumQty), float(execution.avgPrice))
+
+    def _update_order(self, order_id: int, status: str, filled: float = 0.0, avg_fill_price: float = 0.0,
+                      message: str = ''):
+        """Record a status for a tracked order and resolve its future when it reaches the awaited stage"""
+        with self._orders_lock:
+            pending = self._pending_orders.get(order_id)
+            if pending is None or status not in SUBMITTED_STATUSES | FINAL_STATUSES:
+                return
+            latency = time.monotonic() - pending.sent_at
+            if not pending.acknowledged:
+                pending.acknowledged = True
+                self.ack_latencies.append(latency)
+            if status in FINAL_STATUSES:
+                del self._pending_orders[order_id]
+                if status == 'Filled':
+                    self.fill_latencies.append(latency)
+        if not pending.future.done() and (status in FINAL_STATUSES or pending.wait_for == 'submitted'):
+            pending.future.set_result(OrderUpdate(order_id, status, filled, avg_fill_price, latency, message))
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Count, p50 and p99 in milliseconds of order acknowledgement and fill latencies"""
+        stats = {}
+        for name, latencies in (('ack', self.ack_latencies), ('fill', self.fill_latencies)):
+            values = np.array(latencies) * 1000
+            stats[name] = {
+                'count': len(values),
+                'p50_ms': float(np.percentile(values, 50)) if len(values) else 0.0,
+                'p99_ms': float(np.percentile(values, 99)) if len(values) else 0.0
+            }
+        return stats
+
+    def tickPrice(self, reqId: int, tickType: int, price: float, attrib: TickAttrib):
+        """Callback for price ticks of market data subscriptions"""
+        self.market_data.on_tick_price(reqId, tickType, price)
+
+    def tickSize(self, reqId: int, tickType: int, size: int):
+        """Callback for size ticks of market data subscriptions"""
+        self.market_data.on_tick_size(reqId, tickType, size)
+
+    def contractDetails(self, reqId: int, contractDetails: ContractDetails):
+        """Callback with one contract matching a contract details request"""
+        request = self._contract_requests.get(reqId)
+        if request is not None:
+            request[1].append(contractDetails.contract)
+
+    def contractDetailsEnd(self, reqId: int):
+        """Callback after the last contract matching a contract details request"""
+        self._finish_contract_request(reqId)
+
+    def _finish_contract_request(self, request_id: int, failed: bool = True):
+        """Resolve a lookup's future; with `failed`, a lookup without exactly one match is cached as a failure"""
+        request = self._contract_requests.pop(request_id, None)
+        if request is None:
+            return
+        spec, matches, future = request
+        self._resolving.pop(contract_key(spec), None)
+        if len(matches) == 1:
+            self.contract_cache.put(spec, matches[0])
+            future.set_result(matches[0])
+            return
+        if failed or matches:
+            reason = f"ambiguous contract ({len(matches)} matches)" if matches else "no contract found"
+            logger.error(f"Contract {contract_key(spec)}: {reason}")
+            self.contract_cache.put_failure(spec, reason)
+        future.set_result(None)
+
+    def _request_contract_details(self, spec: Contract) -> Future:
+        key = contract_key(spec)
+        future = self._resolving.get(key)
+        if future is not None:
+            return future
+        future = self._resolving[key] = Future()
+        request_id = next(self._request_ids)
+        self._contract_requests[request_id] = (spec, [], future)
+        self.scheduler.submit(lambda: self.reqContractDetails(request_id, spec), DATA,
+                              on_drop=lambda: self._finish_contract_request(request_id, failed=False))
+        return future
+
+    def resolve_contract(self, spec: Contract) -> Future:
+        """Future of the unique contract (with conId) matching a spec, or None if none or several match.
+
+        Specs that recently failed to resolve are answered with None without a lookup.
+        """
+        cached = self.contract_cache.get(spec)
+        if cached is not None or not self.connected or self.contract_cache.failure(spec) is not None:
+            future: Future = Future()
+            future.set_result(cached)
+            return future
+        return self._request_contract_details(spec)
+
+    def _cached_contract(self, spec: Contract) -> Contract:
+        """Cached resolution of a spec; unknown specs are returned as is and resolved in the background"""
+        cached = self.contract_cache.get(spec)
+        if cached is not None:
+            return cached
+        if self.connected and self.contract_cache.failure(spec) is None:
+            self._request_contract_details(spec)
+        return spec
 
     def create_option_contract(self, 
                              symbol: str, 
@@ -73,7 +463,7 @@ class TradingBot(EWrapper, EClient):
         contract.strike = strike
         contract.right = right
         contract.multiplier = "100"  # Standard options multiplier
-        return contract
+        return self._cached_contract(contract)
 
     def create_stock_contract(self, symbol: str, exchange: str = "SMART", currency: str = "USD") -> Contract:
         """Create a stock contract object"""
@@ -82,7 +472,7 @@ class TradingBot(EWrapper, EClient):
         contract.secType = "STK"
         contract.exchange = exchange
         contract.currency = currency
-        return contract
+        return self._cached_contract(contract)
 
     def create_order(self, action: str, quantity: int, order_type: str, price: float = None) -> Order:
         """Create an order object"""
@@ -91,26 +481,190 @@ class TradingBot(EWrapper, EClient):
         order.totalQuantity = quantity
         order.orderType = order_type
         if price:
-            order.lmtPrice = price
+            if order_type == 'STP':
+                order.auxPrice = price  # IB takes the stop trigger price in auxPrice
+            else:
+                order.lmtPrice = price
         return order
 
-    def place_order(self, contract: Contract, order: Order):
-        """Place an order with Interactive Brokers"""
-        if not self.connected or not self.next_order_id:
-            logger.error("Not connected to IB or no valid order ID")
-            return False
-            
+    def create_contract(self, signal: TradeSignal) -> Contract:
+        """Create the stock or option contract a trade signal refers to"""
+        if signal.is_option:
+            return self.create_option_contract(symbol=signal.symbol, strike=signal.strike,
+                                               right=signal.option_type, expiry=signal.expiry)
+        return self.create_stock_contract(symbol=signal.symbol)
+
+    def allocate_order_ids(self, count: int = 1) -> Optional[int]:
+        """Reserve `count` consecutive order IDs and return the first (None before the handshake)"""
+        with self._id_lock:
+            if not self.next_order_id:
+                return None
+            first = self.next_order_id
+            self.next_order_id += count
+            return first
+
+    def submit_order(self, contract: Contract, order: Order, wait_for: str = 'submitted') -> Future:
+        """Place an order and return a Future of its OrderUpdate.
+
+        The future resolves when IB reports the order submitted (wait_for
+        'submitted') or filled (wait_for 'filled'), and in either case as soon as
+        it is rejected or cancelled. Use asyncio.wrap_future to await it.
+        """
+        order_id = self.allocate_order_ids() if self.connected else None
+        if order_id is None:
+            return self._not_connected()
+        return self._send_order(order_id, contract, order, wait_for)
+
+    def _not_connected(self) -> Future:
+        logger.error("Not connected to IB or no valid order ID")
+        future: Future = Future()
+        future.set_result(OrderUpdate(-1, 'Rejected', message='Not connected'))
+        return future
+
+    def _track_order(self, order_id: int, contract: Contract, order: Order, wait_for: str) -> Future:
+        future: Future = Future()
+        # Tracked before sending: the first status can arrive before placeOrder returns
+        with self._orders_lock:
+            self._pending_orders[order_id] = _PendingOrder(contract, order, future, wait_for, time.monotonic())
+        return future
+
+    def _transmit_order(self, order_id: int, contract: Contract, order: Order):
         try:
-            self.placeOrder(self.next_order_id, contract, order)
-            logger.info(f"Placed order: {order.action} {order.totalQuantity} {contract.symbol} {contract.secType}")
-            self.next_order_id += 1
-            return True
+            self.placeOrder(order_id, contract, order)
+            logger.info(f"Placed order {order_id}: {order.action} {order.totalQuantity} {contract.symbol} {contract.secType}")
         except Exception as e:
             logger.error(f"Error placing order: {e}")
-            return False
+            self._update_order(order_id, 'Rejected', message=str(e))
+
+    def _send_order(self, order_id: int, contract: Contract, order: Order, wait_for: str) -> Future:
+        future = self._track_order(order_id, contract, order, wait_for)
+
+        def send(resolved: Contract):
+            # Stops protect open positions, so they jump ahead of new entries
+            self.scheduler.submit(lambda: self._transmit_order(order_id, resolved, order),
+                                  STOP if order.orderType == 'STP' else ORDER,
+                                  on_drop=lambda: self._drop_orders([order_id]))
+
+        self._when_resolved(contract, [order_id], send)
+        return future
+
+    def _when_resolved(self, contract: Contract, order_ids: List[int], send: Callable[[Contract], None]):
+        """Call `send` with the resolved contract once known, or reject the orders if it does not resolve.
+
+        A contract with a conId is sent as is. Specs known to match no contract
+        or several are rejected at once, without a round trip to IB.
+        """
+        if contract.conId:
+            send(contract)
+            return
+        reason = self.contract_cache.failure(contract)
+        if reason is not None:
+            self._reject_orders(order_ids, f"Not sent: {reason}")
+            return
+
+        def resolved(future: Future):
+            result = future.result()
+            if result is None:
+                self._reject_orders(order_ids, f"Not sent: {self.contract_cache.failure(contract) or 'contract not resolved'}")
+                return
+            with self._orders_lock:
+                for order_id in order_ids:
+                    pending = self._pending_orders.get(order_id)
+                    if pending is not None:
+                        pending.contract = result
+            send(result)
+
+        self.resolve_contract(contract).add_done_callback(resolved)
+
+    def _drop_orders(self, order_ids: List[int]):
+        """Reject tracked orders whose placement was never sent"""
+        self._reject_orders(order_ids, 'Not sent: order queue stopped')
+
+    def _reject_orders(self, order_ids: List[int], message: str):
+        for order_id in order_ids:
+            self._update_order(order_id, 'Rejected', message=message)
+
+    def cancel_order(self, order_id: int):
+        """Cancel an order; cancels are sent ahead of every other queued message"""
+        self.scheduler.submit(lambda: self.cancelOrder(order_id), CANCEL)
+
+    def place_bracket(self, signal: TradeSignal, wait_for: str = 'submitted') -> List[Future]:
+        """Place a signal's entry, take-profit and stop as one linked bracket.
+
+        The three IDs are reserved together and the legs are sent back to back:
+        the take-profit and stop are children of the entry (parentId) in one OCA
+        group, and only the last leg transmits, so IB activates the bracket
+        atomically and the children cancel each other. Returns the futures of
+        the entry, take-profit and stop orders.
+        """
+        parent_id = self.allocate_order_ids(3) if self.connected else None
+        if parent_id is None:
+            return [self._not_connected() for _ in range(3)]
+        contract = self.create_contract(signal)
+        exit_action = 'SELL' if signal.direction == 'BUY' else 'BUY'
+        entry = self.create_order(signal.direction, signal.quantity, 'LMT', signal.entry_price)
+        take_profit = self.create_order(exit_action, signal.quantity, 'LMT', signal.take_profit)
+        stop = self.create_order(exit_action, signal.quantity, 'STP', signal.stop_loss)
+        for child in (take_profit, stop):
+            child.parentId = parent_id
+            child.ocaGroup = f"bracket-{parent_id}"
+            child.ocaType = 1  # Cancel the other leg on fill
+        entry.transmit = take_profit.transmit = False
+        stop.transmit = True
+        legs = [(parent_id + i, order) for i, order in enumerate((entry, take_profit, stop))]
+        futures = [self._track_order(order_id, contract, order, wait_for) for order_id, order in legs]
+        order_ids = [order_id for order_id, _ in legs]
+
+        def send(resolved: Contract):
+            def send_legs():
+                for order_id, order in legs:
+                    self._transmit_order(order_id, resolved, order)
+
+            # One queue entry, so the legs go out together, parent first
+            self.scheduler.submit(send_legs, ORDER, cost=len(legs), on_drop=lambda: self._drop_orders(order_ids))
+
+        self._when_resolved(contract, order_ids, send)
+        return futures
+
+    def place_order(self, contract: Contract, order: Order):
+        """Place an order with Interactive Brokers"""
+        future = self.submit_order(contract, order)
+        return not (future.done() and future.result().status == 'Rejected')
+
+    def close(self):
+        """Shut down: stop reconnecting, stop the sender and market data threads and disconnect.
+
+        EClient calls disconnect() itself whenever a connection fails or drops,
+        so shutdown lives here and disconnect() keeps EClient's behaviour.
+        """
+        self._closing.set()
+        self.scheduler.stop()
+        self.market_data.stop()
+        self.contract_cache.save()
+        if self.isConnected():
+            self.disconnect()
+            logger.info("Disconnected from Interactive Brokers")
+
+def reconcile_state(snapshot: ResyncSnapshot, strategy, risk_manager) -> Dict[str, List[str]]:
+    """Align a TradingStrategy and RiskManager with a resync snapshot.
 
-    def disconnect(self):
-        """Disconnect from Interactive Brokers"""
-        if self.connected:
-            super().disconnect()
-            logger.info("Disconnected from Interactive Brokers") 
\ No newline at end of file
+    Risk positions IB no longer holds are removed, as are active trades with
+    neither a position nor an open order; held positions are repriced at IB's
+    mark. Positions IB holds that are not tracked locally are only reported.
+    """
+    if not snapshot.complete:
+        return {}
+    held = {symbol for symbol, (quantity, _) in snapshot.positions.items() if quantity != 0}
+    working = {contract.symbol for contract, _, _ in snapshot.open_orders.values()}
+    closed_positions = [symbol for symbol in list(risk_manager.positions) if symbol not in held]
+    for symbol in closed_positions:
+        risk_manager.remove_position(symbol)
+    closed_trades = [symbol for symbol in list(strategy.active_trades) if symbol not in held | working]
+    for symbol in closed_trades:
+        strategy.remove_active_trade(symbol)
+    risk_manager.update_prices({symbol: price for symbol, price in snapshot.market_prices.items() if symbol in held})
+    untracked = sorted(held - set(risk_manager.positions))
+    if closed_positions or closed_trades or untracked:
+        logger.warning(f"Reconciled with IB: removed positions {closed_positions}, closed trades {closed_trades}, "
+                       f"untracked IB positions {untracked}")
+    return {'closed_positions': closed_positions, 'closed_trades': closed_trades, 'untracked_positions': untracked}
@@ -0,0 +1,228 @@
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+from loguru import logger
+from bar_builder import Bar, BarBuilder
+from tick_archive import TickArchive
+
+class VaREngine:
+    """Portfolio Value at Risk and Conditional VaR from price history.
+
+    Observations are cross-sections of closing prices, one per period (e.g. one
+    bar). With a `bar_interval` the engine builds its own bars of that length from
+    streamed trades (on_market_data), independent of how the market analyzer
+    aggregates; otherwise it is fed closed bars through on_bars. Simple returns for the last `window` periods are kept in a ring,
+    together with running sums of returns and of their cross products, so the
+    covariance matrix is updated in O(n^2) per period instead of being rebuilt from
+    the whole window. A symbol without a price in a period, or before its first
+    price, has a zero return for it.
+
+    `value_at_risk` supports historical simulation (portfolio P&L replayed over the
+    stored returns) and Monte Carlo (correlated normal returns from the covariance,
+    drawn with a fixed seed). Monte Carlo draws and the Cholesky factor are cached
+    until the data changes.
+    """
+
+    METHODS = ('historical', 'monte_carlo')
+
+    def __init__(self, window: int = 250, confidence: float = 0.95, horizon: int = 1,
+                 simulations: int = 10000, seed: int = 42, min_observations: int = 30,
+                 pending_periods: int = 2, bar_interval: int = 0):
+        self.window = window
+        self.confidence = confidence
+        self.horizon = horizon
+        self.simulations = simulations
+        self.seed = seed
+        self.min_observations = min_observations
+        self.pending_periods = pending_periods
+        self.bar_interval = bar_interval
+        self.bar_builder = BarBuilder((bar_interval,)) if bar_interval else None
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.version = 0
+        self.observations = 0
+        self._returns = np.zeros((window, 0))
+        self._last_price = np.zeros(0)
+        self._sum = np.zeros(0)
+        self._cross = np.zeros((0, 0))
+        self._since_resync = 0
+        self._pending: Dict[float, Dict[str, float]] = {}  # Period start -> closes seen so far
+        self._finalized_until = float('-inf')
+        self._normals: Dict[int, np.ndarray] = {}  # Standard normal draws per number of symbols
+        self._cholesky: Dict[Tuple[int, Tuple[int, ...]], np.ndarray] = {}
+
+    def _row(self, symbol: str) -> int:
+        row = self.index.get(symbol)
+        if row is None:
+            row = self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            if row == len(self._last_price):
+                size = max(2 * row, 16)
+                self._returns = np.pad(self._returns, ((0, 0), (0, size - row)))
+                self._last_price = np.pad(self._last_price, (0, size - row), constant_values=np.nan)
+                self._sum = np.pad(self._sum, (0, size - row))
+                self._cross = np.pad(self._cross, ((0, size - row), (0, size - row)))
+        return row
+
+    def add_prices(self, prices: Mapping[str, float]):
+        """Add one period of closing prices"""
+        rows = np.fromiter((self._row(symbol) for symbol in prices), dtype=np.int64, count=len(prices))
+        closes = np.fromiter(prices.values(), dtype=np.float64, count=len(prices))
+        returns = np.zeros(len(self._last_price))
+        previous = self._last_price[rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[rows] = np.where(np.isnan(previous) | (previous == 0), 0.0, closes / previous - 1)
+        self._last_price[rows] = closes
+
+        slot = self.observations % self.window
+        evicted = self._returns[slot]
+        if self.observations >= self.window:
+            self._sum -= evicted
+            self._cross -= np.outer(evicted, evicted)
+        self._returns[slot] = returns
+        self._sum += returns
+        self._cross += np.outer(returns, returns)
+        self.observations += 1
+        self.version += 1
+
+        # Recompute the sums exactly once per window to bound float drift
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            sample = self._sample()
+            self._sum = sample.sum(axis=0)
+            self._cross = sample.T @ sample
+            self._since_resync = 0
+
+    def on_bars(self, bars: Sequence[Bar]):
+        """Collect closed bars into periods by start time and add completed periods.
+
+        A period is complete once bars from `pending_periods` later periods have
+        arrived; bars for periods already added are ignored.
+        """
+        for bar in bars:
+            self._add_close(bar.symbol, bar.start, bar.close)
+        self._complete_periods()
+
+    def _add_close(self, symbol: str, start: float, close: float):
+        if start > self._finalized_until:
+            self._pending.setdefault(start, {})[symbol] = close
+
+    def _complete_periods(self):
+        while len(self._pending) > self.pending_periods:
+            start = min(self._pending)
+            self.add_prices(self._pending.pop(start))
+            self._finalized_until = start
+
+    def on_market_data(self, symbols: Sequence[str], prices, volumes, timestamps):
+        """Market data listener: aggregate streamed trades into bars of `bar_interval`"""
+        bars = []
+        for symbol, price, volume, timestamp in zip(symbols, prices, volumes, timestamps):
+            bars.extend(self.bar_builder.add_tick(symbol, timestamp, price, volume))
+        if bars:
+            self.on_bars(bars)
+
+    def flush_bars(self, now=None):
+        """Close bars whose interval has elapsed by clock time"""
+        if self.bar_builder is not None:
+            self.on_bars(self.bar_builder.flush(now))
+
+    def warm_start(self, archives: Iterable[TickArchive]) -> int:
+        """Rebuild the return history from archived ticks or bars.
+
+        Only records recent enough to fall in the window are read. Each record
+        counts as a trade at its timestamp, so archived analysis bars give one
+        close per bar. Returns the number of periods added.
+        """
+        periods = self.window + self.pending_periods + 1
+        observations = self.observations
+        for archive in archives:
+            for symbol in archive.symbols:
+                # Without a bar interval every record is a period of its own
+                records = archive.read(symbol, None if self.bar_interval else periods)
+                if len(records) == 0:
+                    continue
+                timestamps, prices = records['timestamp'], records['price']
+                starts = timestamps
+                if self.bar_interval:
+                    recent = timestamps >= timestamps[-1] - periods * self.bar_interval
+                    timestamps, prices = timestamps[recent], prices[recent]
+                    starts = timestamps - timestamps % self.bar_interval
+                # Last record of each period is its close
+                last = np.flatnonzero(np.r_[starts[1:] != starts[:-1], True])
+                for start, close in zip(starts[last].tolist(), prices[last].tolist()):
+                    self._add_close(symbol, start, close)
+        self._complete_periods()
+        restored = self.observations - observations
+        logger.info(f"Restored {restored} periods of VaR price history")
+        return restored
+
+    def _sample(self) -> np.ndarray:
+        """Stored returns, one row per period (oldest rows first once the ring wraps)"""
+        count = min(self.observations, self.window)
+        if self.observations <= self.window:
+            return self._returns[:count]
+        slot = self.observations % self.window
+        return np.concatenate([self._returns[slot:], self._returns[:slot]])
+
+    def covariance(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Sample covariance of returns for rows (all symbols by default)"""
+        m = min(self.observations, self.window)
+        if rows is None:
+            rows = np.arange(len(self.symbols))
+        if m < 2:
+            return np.zeros((len(rows), len(rows)))
+        mean = self._sum[rows] / m
+        return (self._cross[np.ix_(rows, rows)] - m * np.outer(mean, mean)) / (m - 1)
+
+    def _cholesky_factor(self, rows: np.ndarray) -> np.ndarray:
+        key = (self.version, tuple(rows.tolist()))
+        factor = self._cholesky.get(key)
+        if factor is None:
+            covariance = self.covariance(rows)
+            try:
+                factor = np.linalg.cholesky(covariance)
+            except np.linalg.LinAlgError:
+                # Singular (e.g. symbols without price moves): factor via eigenvalues instead
+                values, vectors = np.linalg.eigh(covariance)
+                factor = vectors * np.sqrt(np.maximum(values, 0.0))
+            self._cholesky = {key: factor}
+        return factor
+
+    def _standard_normals(self, n: int) -> np.ndarray:
+        draws = self._normals.get(n)
+        if draws is None:
+            draws = np.random.default_rng(self.seed).standard_normal((self.simulations, n))
+            self._normals = {n: draws}
+        return draws
+
+    def value_at_risk(self, symbols: Sequence[str], exposures, method: str = 'historical') -> Optional[Dict[str, float]]:
+        """VaR and CVaR (positive losses) of a portfolio of per-symbol exposures.
+
+        Returns None until `min_observations` periods have been added.
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown VaR method {method}, expected one of {self.METHODS}")
+        if self.observations < self.min_observations:
+            return None
+        exposures = np.asarray(exposures, dtype=np.float64)
+
+        # Symbols without history carry no modeled risk
+        known = np.fromiter((symbol in self.index for symbol in symbols), dtype=bool, count=len(symbols))
+        rows = np.fromiter((self.index[symbol] for symbol, ok in zip(symbols, known) if ok), dtype=np.int64)
+        weights = exposures[known]
+        if len(rows) == 0:
+            pnl = np.zeros(1)
+        elif method == 'historical':
+            pnl = self._sample()[:, rows] @ weights
+        else:
+            factor = self._cholesky_factor(rows)
+            pnl = self._standard_normals(len(rows)) @ (factor.T @ weights)
+        pnl = pnl * np.sqrt(self.horizon)
+
+        var = max(-float(np.percentile(pnl, (1 - self.confidence) * 100)), 0.0)
+        tail = pnl[pnl <= -var]
+        return {
+            'value_at_risk': var,
+            'conditional_value_at_risk': max(-float(tail.mean()), 0.0) if len(tail) else var,
+            'var_method': method,
+            'var_observations': min(self.observations, self.window)
+        }